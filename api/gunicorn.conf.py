@@ -0,0 +1,30 @@
+"""Production serving of the API, a pre-forked gunicorn server.
+
+    gunicorn -c api/gunicorn.conf.py api.routes:app
+
+The application and OR-Tools are imported once before forking, and every
+worker solves a warmup request before taking any. Workers serve requests from
+threads: CP-SAT releases the GIL while it searches, so /health, /echo and the
+job polling stay responsive while solves run.
+"""
+import os
+
+from api.warmup import warmup
+
+bind = os.environ.get("SCHEDULE_BIND", "0.0.0.0:8000")
+# Jobs, plans without SCHEDULE_STORE and metrics live in the memory of a
+# worker, so a single one by default
+workers = int(os.environ.get("SCHEDULE_WORKERS", 1))
+worker_class = "gthread"
+threads = int(os.environ.get("SCHEDULE_THREADS", 4))
+preload_app = True
+# Longest solve a client may ask for, and some margin
+timeout = 90
+
+# Every worker has its own core budget: share the cores between them
+cores = int(os.environ.get("SCHEDULE_CORES", 0)) or os.cpu_count() or 1
+os.environ["SCHEDULE_CORES"] = str(max(1, cores // workers))
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s warmed up in %.3fs", worker.pid, warmup())
@@ -0,0 +1,278 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, Optional
+
+from model import metrics
+from model.cache import ModelCache
+from model.decomposition import solve_decomposed
+from model.feasibility import diagnose_infeasibility
+from model.options import SolverOptions
+from model.solver import STOP_INFEASIBLE, solve_shift_scheduling
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Default limits
+MAX_WORKERS = 2
+MAX_PENDING = 16
+MAX_FINISHED = 256
+
+# Progress messages from the worker processes and the cache of each worker
+# process, set by _init_worker
+_progress = None
+_cache = None
+
+
+class QueueFull(Exception):
+    pass
+
+
+class CoreBudget:
+    """Number of cores shared by the solves running at the same time.
+    A solve acquires as many cores as it has search workers and gives them
+    back once done, so that concurrent solves share the machine instead of
+    each of them using every core.
+    """
+
+    def __init__(self, cores: Optional[int] = None, solves: int = MAX_WORKERS):
+        self.cores = cores or os.cpu_count() or 1
+        # Cores of a solve leaving the number of workers to CP-SAT
+        self.share = max(1, self.cores // solves)
+        self.available = self.cores
+        self.condition = threading.Condition()
+
+    def clamp(self, workers: int):
+        """Number of cores a solve asking for workers may use, 0 for a share."""
+        if workers <= 0:
+            workers = self.share
+        return max(1, min(workers, self.cores))
+
+    def acquire(self, cores: int):
+        with self.condition:
+            while self.available < cores:
+                self.condition.wait()
+            self.available -= cores
+
+    def release(self, cores: int):
+        with self.condition:
+            self.available += cores
+            self.condition.notify_all()
+
+    def limit(self, options: Optional[SolverOptions]):
+        """Options with the number of search workers fitting the budget."""
+        options = options or SolverOptions()
+        return replace(
+            options, num_search_workers=self.clamp(options.num_search_workers)
+        )
+
+
+def _init_worker(progress, cache_dir):
+    global _progress, _cache
+    _progress = progress
+    _cache = ModelCache(directory=cache_dir)
+    # Metrics are kept by the parent process, which serves them
+    metrics.set_sink(lambda observation: progress.put((None, "metrics", observation)))
+
+
+def _run_job(job_id: str, request: Dict, options: SolverOptions):
+    """Runs a single solve in a worker process.
+    Reports the start of the job and every improving solution to the parent
+    process through the progress queue.
+    """
+    _progress.put((job_id, RUNNING, None))
+
+    def on_solution(solution):
+        _progress.put((job_id, "solution", solution))
+
+    return solve_request(
+        request, on_solution=on_solution, cache=_cache, options=options
+    )
+
+
+def solve_request(request: Dict, options: SolverOptions, **kwargs):
+    """Solves a parsed request, by parts if it has a "decomposition".
+    A decomposed solve runs one part per core of its search workers, and
+    doesn't report intermediate solutions or use the cache. Without a
+    solution to a request in whole hours the solver proved infeasible, res
+    holds the "reasons" of the infeasibility if any is found.
+    """
+    request = dict(request)
+    decomposition = request.pop("decomposition", None)
+    if decomposition is None:
+        success, res = solve_shift_scheduling(**request, options=options, **kwargs)
+    else:
+        request.pop("hint", None)
+        request.pop("stability", None)
+        success, res = solve_decomposed(**request, **decomposition, options=options)
+
+    if (
+        not success
+        and "slot_minutes" not in request
+        and res["termination"]["reason"] == STOP_INFEASIBLE
+    ):
+        # Tell why, rather than searching again after a too short time limit
+        reasons = diagnose_infeasibility(
+            request["employees"],
+            request["days"],
+            request["constraints"],
+            request["customer_bookings"],
+            skill_bookings=request.get("skill_bookings"),
+        )
+        if reasons:
+            res = {"reasons": reasons}
+    return success, res
+
+
+class Job:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.state = QUEUED
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.best = None  # best solution reported so far
+        self.solutions = 0
+        self.success = None
+        self.result = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "solutions": self.solutions,
+        }
+
+
+class JobQueue:
+    """Runs solver jobs on a bounded pool of worker processes.
+    At most max_workers jobs run at the same time and at most max_pending jobs
+    wait for a worker. Submitting more raises QueueFull so that the API can
+    push back on the client instead of piling up work. A job is only handed
+    to a worker once the core budget has room for its search workers. Every
+    worker keeps its own model cache, shared through cache_dir if given.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        max_pending: int = MAX_PENDING,
+        max_finished: int = MAX_FINISHED,
+        cache_dir: Optional[str] = None,
+        budget: Optional[CoreBudget] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.budget = budget or CoreBudget(solves=max_workers)
+        self.jobs: Dict[str, Job] = OrderedDict()
+        self.pending = deque()
+        self.running = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        context = multiprocessing.get_context("spawn")
+        self.progress = context.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.progress, cache_dir),
+        )
+        self.listener = threading.Thread(target=self._listen, daemon=True)
+        self.listener.start()
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def outstanding(self):
+        return sum(1 for job in self.jobs.values() if job.state in (QUEUED, RUNNING))
+
+    def submit(self, request: Dict, options: Optional[SolverOptions] = None) -> str:
+        options = self.budget.limit(options)
+        with self.lock:
+            if self.outstanding() >= self.max_workers + self.max_pending:
+                raise QueueFull("Job queue is full: try again later")
+            job = Job(uuid.uuid4().hex)
+            self.jobs[job.id] = job
+            self._evict()
+            self.pending.append((job, request, options))
+            self.changed.notify_all()
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self):
+        with self.lock:
+            self.pending.append(None)
+            self.changed.notify_all()
+        self.dispatcher.join()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.progress.put(None)
+        self.listener.join()
+
+    def _dispatch(self):
+        while True:
+            with self.lock:
+                while not self.pending or self.running >= self.max_workers:
+                    self.changed.wait()
+                item = self.pending.popleft()
+                if item is None:
+                    return
+                self.running += 1
+            job, request, options = item
+            cores = options.num_search_workers
+            self.budget.acquire(cores)
+            future = self.executor.submit(_run_job, job.id, request, options)
+            future.add_done_callback(lambda f, j=job, c=cores: self._finish(j, f, c))
+
+    def _finish(self, job: Job, future, cores: int):
+        self.budget.release(cores)
+        with self.lock:
+            self.running -= 1
+            self.changed.notify_all()
+            job.finished = time.time()
+            try:
+                job.success, job.result = future.result()
+                job.state = DONE
+            except Exception as e:
+                job.error = str(e)
+                job.state = FAILED
+
+    def _listen(self):
+        while True:
+            message = self.progress.get()
+            if message is None:
+                return
+            job_id, kind, payload = message
+            if kind == "metrics":
+                metrics.record(payload)
+                continue
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None or job.state in (DONE, FAILED):
+                    continue
+                if kind == RUNNING:
+                    job.state = RUNNING
+                    job.started = time.time()
+                else:
+                    job.best = payload
+                    job.solutions += 1
+
+    def _evict(self):
+        # Forget the oldest finished jobs once there are too many of them
+        finished = [j for j in self.jobs.values() if j.state in (DONE, FAILED)]
+        for job in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job.id]
@@ -1,10 +1,111 @@
-from flask import Flask, request, jsonify
-from model.solver import solve_shift_scheduling
+import json
+import os
+import queue
+import threading
+
+from flask import Flask, Response, request, jsonify
+from model.arrays import NPZ_MIMETYPE, get_request_from_arrays, load_npz
+from model import metrics
+from model.batch import apply_delta, solve_batch
+from model.cache import ModelCache
+from model.draft import get_draft
+from model.objectives import Objectives
+from model.options import SolverOptions
+from model.slots import HOUR, SLOT_MINUTES
+from model.feasibility import check_request
+from model.horizon import (
+    WEEK_LENGTH,
+    ScheduleStore,
+    UnknownPlan,
+    advance,
+    get_advanced_plan,
+    get_plan_schedule,
+    get_window,
+    get_window_request,
+    solve_window,
+    start_plan,
+)
 from flask_cors import CORS
 
+from .jobs import DONE, FAILED, CoreBudget, JobQueue, QueueFull, solve_request
+from .warmup import is_warm
+
 app = Flask(__name__)
 CORS(app)
 
+# Seconds a client should wait before resubmitting to a full job queue
+RETRY_AFTER = 5
+
+# Directory persisting cached results and models, if set
+CACHE_DIR = os.environ.get("SCHEDULE_CACHE_DIR")
+
+# Cores shared by all the solves of the service, every core if not set
+CORES = int(os.environ.get("SCHEDULE_CORES", 0)) or None
+
+# Longest time limit a client may ask for, in seconds
+MAX_TIME_LIMIT = 60
+
+# Settings of a decomposed solve a client may give
+DECOMPOSITION_KEYS = ("window", "group_by", "polish_iterations", "polish_time_limit")
+
+# SQLite file persisting the rolling horizon plans, in memory if not set
+STORE_PATH = os.environ.get("SCHEDULE_STORE", ":memory:")
+
+cache = ModelCache(directory=CACHE_DIR)
+budget = CoreBudget(CORES)
+_job_queue = None
+_store = None
+_store_lock = threading.Lock()
+
+
+class InvalidRequest(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@app.errorhandler(InvalidRequest)
+def invalid_request(e):
+    return jsonify({"status": e.status, "message": str(e)}), e.status
+
+
+def get_job_queue():
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(cache_dir=CACHE_DIR, budget=budget)
+    return _job_queue
+
+
+def get_store():
+    # Opened on first use, after the workers of a pre-forked server are forked
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ScheduleStore(STORE_PATH)
+    return _store
+
+
+@app.after_request
+def count_request(response):
+    metrics.increment(
+        "schedule_requests_total",
+        route=str(request.endpoint),
+        status=response.status_code,
+    )
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Metrics of the service in the Prometheus text format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Liveness of the process, answered without touching the solver."""
+    return jsonify({"status": 200, "message": "OK", "warm": is_warm()})
+
 
 @app.route("/echo", methods=["POST"])
 def echo():
@@ -14,32 +115,549 @@ def echo():
 
 @app.route("/endpoint", methods=["POST"])
 def endpoint():
+    kwargs, options = read_request()
+
+    if kwargs is None:
+        return jsonify({"error": "No JSON data received"})
+
+    rejected = check(kwargs)
+    if rejected is not None:
+        return rejected
+    use_draft(kwargs)
+
+    options = budget.limit(options)
+    budget.acquire(options.num_search_workers)
+    try:
+        success, res = solve_request(kwargs, options, cache=cache)
+    finally:
+        budget.release(options.num_search_workers)
+
+    if success is False:
+        return failure_response(res)
+
+    return jsonify({"status": 200, "message": "OK", "res": res})
+
+
+@app.route("/stream", methods=["POST"])
+def stream():
+    """Solves a request like /endpoint, as Server-Sent Events.
+    Every improving solution is sent as a "solution" event with its
+    objective, bound, elapsed time and res, and the final result as a "result"
+    event. A request asking for a "draft" gets it first as a "draft" event.
+    Closing the connection stops the search.
+    """
+    kwargs, options = read_request()
+
+    if kwargs is None:
+        return jsonify({"error": "No JSON data received"})
+
+    # Parts of a decomposed solve have no intermediate solutions to stream
+    kwargs.pop("decomposition", None)
+    rejected = check(kwargs)
+    if rejected is not None:
+        return rejected
+
+    options = budget.limit(options)
+    events = queue.Queue()
+    stop = threading.Event()
+    draft = use_draft(kwargs)
+    if draft is not None:
+        events.put(("draft", draft))
+
+    def solve():
+        budget.acquire(options.num_search_workers)
+        try:
+            success, res = solve_request(
+                kwargs,
+                options,
+                cache=cache,
+                on_solution=lambda solution: events.put(("solution", solution)),
+                stop=stop,
+            )
+            if success is False:
+                result = failure(res)
+            else:
+                result = {"status": 200, "message": "OK", "res": res}
+            events.put(("result", result))
+        except Exception as e:
+            events.put(("error", {"status": 500, "message": str(e)}))
+        finally:
+            budget.release(options.num_search_workers)
+            events.put(None)
+
+    def generate():
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    return
+                yield format_event(*event)
+        finally:
+            # Also reached when the client goes away
+            stop.set()
+
+    threading.Thread(target=solve, daemon=True).start()
+    return Response(generate(), mimetype="text/event-stream")
+
+
+def format_event(name: str, payload):
+    return "event: %s\ndata: %s\n\n" % (name, json.dumps(payload))
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """Solves a base request and what-if variants of it.
+    Every object of "scenarios" changes the base by its optional "name",
+    "num_employees", "employee_constraints" ({employee index: constraints}),
+    "bookings" (replacing the bookings of their hours) and "booking_factor"
+    ({day: factor}).
+    """
     data = request.json
 
     if not data:
         return jsonify({"error": "No JSON data received"})
 
-    num_employees = data.get("num_employees")
-    days = data.get("days")
-    constraints = data.get("employee_constraints")
-    customer_bookings_input = data.get("bookings")
+    kwargs = parse_request(data)
+    kwargs.pop("decomposition", None)
+    kwargs.pop("draft", None)
+    rejected = check(kwargs)
+    if rejected is not None:
+        return rejected
+
+    deltas = [parse_delta(scenario) for scenario in data.get("scenarios") or []]
+    for delta in deltas:
+        try:
+            apply_delta(kwargs, delta)
+        except ValueError as e:
+            raise InvalidRequest("Invalid scenario: %s" % e)
+    options = budget.limit(parse_options(data))
+    budget.acquire(options.num_search_workers)
+    try:
+        results = solve_batch(kwargs, deltas, options=options)
+    finally:
+        budget.release(options.num_search_workers)
+
+    return jsonify(
+        {
+            "status": 200,
+            "message": "OK",
+            "base": format_scenario(results["base"]),
+            "scenarios": [format_scenario(r) for r in results["scenarios"]],
+        }
+    )
+
+
+def format_scenario(result):
+    if result["success"] is False:
+        body = failure(result["res"])
+    else:
+        body = {"status": 200, "message": "OK", "res": result["res"]}
+    body["name"] = result["name"]
+    body["objective"] = result["objective"]
+    body["time"] = result["time"]
+    return body
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    kwargs, options = read_request()
+
+    if kwargs is None:
+        return jsonify({"error": "No JSON data received"})
+
+    rejected = check(kwargs)
+    if rejected is not None:
+        return rejected
+    draft = use_draft(kwargs)
+
+    try:
+        job_id = get_job_queue().submit(kwargs, options)
+    except QueueFull as e:
+        response = jsonify({"status": 503, "message": str(e)})
+        response.headers["Retry-After"] = str(RETRY_AFTER)
+        return response, 503
+
+    body = {"status": 202, "message": "Accepted", "job_id": job_id}
+    if draft is not None:
+        body["draft"] = draft
+    return jsonify(body), 202
+
 
-    print(customer_bookings_input)
-    customer_bookings = list(map(map_function, customer_bookings_input))
-    print(customer_bookings)
-    success, res = solve_shift_scheduling(
-        num_employees, days, constraints, customer_bookings
+@app.route("/draft", methods=["POST"])
+def draft_schedule():
+    """Greedy draft schedule of a request, in milliseconds, without the
+    solver. Answered 422 with the hours and employees left short if the
+    heuristic finds none.
+    """
+    kwargs, _ = read_request()
+
+    if kwargs is None:
+        return jsonify({"error": "No JSON data received"})
+
+    rejected = check(kwargs)
+    if rejected is not None:
+        return rejected
+
+    success, res = get_request_draft(kwargs)
+    if success is False:
+        return jsonify({"status": 422, **res}), 422
+    return jsonify({"status": 200, "message": "OK", "res": res})
+
+
+def get_request_draft(kwargs):
+    """(success, res) of get_draft for parsed keyword arguments."""
+    return get_draft(
+        kwargs["employees"],
+        kwargs["days"],
+        kwargs["constraints"],
+        kwargs["customer_bookings"],
+        skill_bookings=kwargs.get("skill_bookings"),
+        slot_minutes=kwargs.get("slot_minutes", HOUR),
+    )
+
+
+def use_draft(kwargs):
+    """Draft of a request asking for one with "draft", which becomes the hint
+    of its solve unless it has a hint of its own. None if the request doesn't
+    ask for a draft or the heuristic finds none.
+    """
+    if not kwargs.pop("draft", False):
+        return None
+    success, res = get_request_draft(kwargs)
+    if not success:
+        return None
+    if kwargs.get("hint") is None:
+        kwargs["hint"] = res["days"]
+    return res
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"status": 404, "message": "Unknown job"}), 404
+    return jsonify({"status": 200, "message": "OK", "job": job.to_dict()})
+
+
+@app.route("/jobs/<job_id>/solution", methods=["GET"])
+def job_solution(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"status": 404, "message": "Unknown job"}), 404
+    if job.state == DONE and job.success:
+        return jsonify({"status": 200, "message": "OK", "res": job.result})
+    if job.best is None:
+        return jsonify({"status": 202, "message": "No solution yet"}), 202
+    return jsonify(
+        {
+            "status": 200,
+            "message": "OK",
+            "objective": job.best["objective"],
+            "res": job.best["res"],
+        }
     )
 
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"status": 404, "message": "Unknown job"}), 404
+    if job.state == FAILED:
+        return jsonify({"status": 500, "message": job.error}), 500
+    if job.state != DONE:
+        return jsonify({"status": 202, "message": "Job is " + job.state}), 202
+    if job.success is False:
+        return failure_response(job.result)
+    return jsonify({"status": 200, "message": "OK", "res": job.result})
+
+
+@app.route("/plans", methods=["POST"])
+def create_plan():
+    """Creates a rolling horizon plan from a request and solves its first
+    window, the days up to the end of the first week. "week_length" sets the
+    days of a week (7) and "stability" the cost of changing the schedule of
+    an open day when it's solved again (1).
+    """
+    data = request.json
+
+    if not data:
+        return jsonify({"error": "No JSON data received"})
+
+    kwargs = parse_request(data)
+    if "slot_minutes" in kwargs or "decomposition" in kwargs:
+        raise InvalidRequest("Plans only schedule whole hours without decomposition")
+    if "skill_bookings" in kwargs:
+        raise InvalidRequest("Plans don't book skills")
+    kwargs.pop("draft", None)
+    if "objectives" in kwargs:
+        raise InvalidRequest("Plans only minimize the penalties")
+    plan = {
+        "employees": kwargs["employees"],
+        "days": kwargs["days"],
+        "constraints": kwargs["constraints"],
+        "customer_bookings": kwargs["customer_bookings"],
+        "week_length": data.get("week_length", WEEK_LENGTH),
+        "stability": data.get("stability", 1),
+        "frozen": 0,
+    }
+    if not isinstance(plan["week_length"], int) or plan["week_length"] < 1:
+        raise InvalidRequest("week_length must be a positive integer")
+    rejected = check_plan(plan, {})
+    if rejected is not None:
+        return rejected
+
+    return solve_plan(
+        None,
+        lambda options: start_plan(get_store(), plan, options, solve=solve_request),
+        data,
+    )
+
+
+@app.route("/plans/<plan_id>", methods=["GET"])
+def get_plan(plan_id):
+    """Schedule of the whole horizon of a plan."""
+    try:
+        plan = get_store().get_plan(plan_id)
+    except UnknownPlan:
+        return jsonify({"status": 404, "message": "Unknown plan"}), 404
+    res = get_plan_schedule(plan, get_store().get_assignments(plan_id))
+    return jsonify({"status": 200, "message": "OK", "plan_id": plan_id, "res": res})
+
+
+@app.route("/plans/<plan_id>/advance", methods=["POST"])
+def advance_plan(plan_id):
+    """Commits the first "days" (1) open days of a plan and solves the next
+    window. "bookings" replace the bookings of the days still open, and
+    "append_days" extend the horizon.
+    """
+    data = request.get_json(silent=True) or {}
+    days = data.get("days", 1)
+    if not isinstance(days, int) or days < 1:
+        raise InvalidRequest("days must be a positive integer")
+    customer_bookings = None
+    if "bookings" in data:
+        if any("skill" in obj for obj in data["bookings"]):
+            raise InvalidRequest("Plans don't book skills")
+        customer_bookings = list(map(map_function, data["bookings"]))
+    if not isinstance(data.get("append_days", []), list):
+        raise InvalidRequest("append_days must be a list of days")
+
+    store = get_store()
+    try:
+        plan = store.get_plan(plan_id)
+        plan = get_advanced_plan(plan, days, customer_bookings, data.get("append_days"))
+    except UnknownPlan:
+        return jsonify({"status": 404, "message": "Unknown plan"}), 404
+    except ValueError as e:
+        raise InvalidRequest(str(e), 409)
+    if get_window(plan):
+        rejected = check_plan(plan, store.get_assignments(plan_id))
+        if rejected is not None:
+            return rejected
+
+    def solve(options):
+        return advance(
+            get_store(),
+            plan_id,
+            days=days,
+            customer_bookings=customer_bookings,
+            new_days=data.get("append_days"),
+            options=options,
+            solve=solve_request,
+        )
+
+    return solve_plan(plan_id, solve, data)
+
+
+def solve_plan(plan_id, solve, data: dict):
+    """Response of a solve of the window of a plan, with the solver options of
+    the parsed request data. A new plan has no plan_id until its res has one.
+    """
+    options = budget.limit(parse_options(data))
+    budget.acquire(options.num_search_workers)
+    try:
+        success, res = solve(options)
+    except UnknownPlan:
+        return jsonify({"status": 404, "message": "Unknown plan"}), 404
+    except ValueError as e:
+        raise InvalidRequest(str(e), 409)
+    finally:
+        budget.release(options.num_search_workers)
+
     if success is False:
-        return jsonify(
-            {
-                "status": 400,
-                "message": "Processing the request took too long: check parameters",
-            }
+        if "message" in res:
+            raise InvalidRequest(res["message"], 409)
+        return failure_response(res)
+
+    plan_id = res.pop("plan_id", plan_id)
+    return jsonify({"status": 200, "message": "OK", "plan_id": plan_id, "res": res})
+
+
+def failure(res):
+    """Response body of a request without a solution."""
+    if "reasons" in res:
+        return {
+            "status": 422,
+            "message": "The request is infeasible",
+            "reasons": res["reasons"],
+        }
+    return {
+        "status": 400,
+        "message": "Processing the request took too long: check parameters",
+    }
+
+
+def failure_response(res):
+    body = failure(res)
+    if body["status"] == 422:
+        return jsonify(body), 422
+    return jsonify(body)
+
+
+def check_plan(plan, assignments):
+    """Response rejecting a plan failing the feasibility checks, if any: its
+    open window, with the hours carried from assignments, and every week
+    after it.
+    """
+    start = plan["frozen"]
+    week_length = plan["week_length"]
+    starts = [start] + list(
+        range((start // week_length + 1) * week_length, len(plan["days"]), week_length)
+    )
+    for start in starts:
+        week = get_window_request(dict(plan, frozen=start), assignments)
+        rejected = check(week, start)
+        if rejected is not None:
+            return rejected
+    return None
+
+
+def check(request, first_day: int = 0):
+    """Response rejecting a request failing the feasibility checks, if any.
+    first_day is the number of the first day of the request in a plan: the
+    days of the reasons are numbered in the plan, their messages in the week.
+    """
+    reasons = check_request(
+        request["employees"],
+        request["days"],
+        request["constraints"],
+        request["customer_bookings"],
+        request.get("skill_bookings"),
+    )
+    for reason in reasons if first_day else []:
+        reason["message"] = "Week from day %i: %s" % (first_day, reason["message"])
+        if "day" in reason:
+            reason["day"] += first_day
+    if reasons:
+        return failure_response({"reasons": reasons})
+    return None
+
+
+def read_request():
+    """Keyword arguments of solve_shift_scheduling and solver options of the
+    body of a request, JSON or columnar .npz arrays by its Content-Type.
+    Returns (None, None) without a body.
+    """
+    with metrics.timer("schedule_phase_seconds", phase="parse"):
+        return parse_body()
+
+
+def parse_body():
+    if request.mimetype == NPZ_MIMETYPE:
+        try:
+            kwargs, solver = get_request_from_arrays(load_npz(request.get_data()))
+        except (ValueError, OSError) as e:
+            raise InvalidRequest("Invalid arrays: %s" % e)
+        return kwargs, parse_options({"solver": solver})
+    if not request.is_json:
+        raise InvalidRequest(
+            "Unsupported Content-Type, use application/json or " + NPZ_MIMETYPE, 415
         )
+    data = request.get_json()
+    if not data:
+        return None, None
+    return parse_request(data), parse_options(data)
 
-    return jsonify({"status": 200, "message": "OK", "res": res})
+
+def parse_request(data):
+    """Keyword arguments of solve_shift_scheduling for a request.
+    Bookings with a "skill" are skill bookings, needing employees with that
+    skill in the "skills" of their constraints.
+    """
+    customer_bookings_input = data.get("bookings")
+    customer_bookings = [
+        map_function(obj) for obj in customer_bookings_input if "skill" not in obj
+    ]
+    skill_bookings = [
+        map_function(obj) + (obj["skill"],)
+        for obj in customer_bookings_input
+        if "skill" in obj
+    ]
+    request = {
+        "employees": data.get("num_employees"),
+        "days": data.get("days"),
+        "constraints": data.get("employee_constraints"),
+        "customer_bookings": customer_bookings,
+        "hint": data.get("hint"),
+        "stability": data.get("stability", 0),
+    }
+    slot_minutes = data.get("slot_minutes", HOUR)
+    if slot_minutes not in SLOT_MINUTES:
+        raise InvalidRequest("slot_minutes must be one of %s" % (SLOT_MINUTES,))
+    if slot_minutes != HOUR:
+        request["slot_minutes"] = slot_minutes
+    if skill_bookings:
+        request["skill_bookings"] = skill_bookings
+    if data.get("draft"):
+        request["draft"] = True
+    if data.get("objectives") is not None:
+        try:
+            request["objectives"] = Objectives.from_dict(data["objectives"])
+        except (ValueError, AttributeError, TypeError) as e:
+            raise InvalidRequest("Invalid objectives: %s" % e)
+    decomposition = data.get("decomposition")
+    if decomposition is not None:
+        if slot_minutes != HOUR:
+            raise InvalidRequest("Decomposed solves only schedule whole hours")
+        if skill_bookings:
+            raise InvalidRequest("Decomposed solves don't book skills")
+        if "objectives" in request:
+            raise InvalidRequest("Decomposed solves only minimize the penalties")
+        request["decomposition"] = {
+            k: v for k, v in decomposition.items() if k in DECOMPOSITION_KEYS
+        }
+    return request
+
+
+def parse_delta(data):
+    """Changes of a batch scenario, in the format of apply_delta."""
+    delta = {}
+    if "name" in data:
+        delta["name"] = data["name"]
+    if "num_employees" in data:
+        delta["employees"] = data["num_employees"]
+    if "employee_constraints" in data:
+        delta["constraints"] = data["employee_constraints"]
+    if "bookings" in data:
+        delta["customer_bookings"] = list(map(map_function, data["bookings"]))
+    if "booking_factor" in data:
+        delta["booking_factor"] = data["booking_factor"]
+    return delta
+
+
+def parse_options(data):
+    """Solver options of a request, from its optional "solver" object.
+    Clients can't write logs on the server and their time limit is capped.
+    """
+    try:
+        options = SolverOptions.from_dict(data.get("solver"))
+    except ValueError as e:
+        raise InvalidRequest("Invalid solver options: %s" % e)
+    options.log_path = None
+    options.print_solutions = False
+    options.time_limit = min(options.time_limit, MAX_TIME_LIMIT)
+    return options
 
 
 def map_function(obj):
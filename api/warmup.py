@@ -0,0 +1,40 @@
+"""Warmup of a serving process.
+The first solve of a process pays for loading the OR-Tools libraries and for
+the first calls into them. warmup solves a tiny request at startup, e.g. in
+every worker of a pre-forked server, so that no client request does.
+"""
+import time
+
+from model import metrics
+from model.options import SolverOptions
+from model.solver import solve_shift_scheduling
+
+WARMUP_REQUEST = {
+    "employees": 2,
+    "days": [{"hours": 8, "minutes": 0}],
+    "constraints": [
+        {"weekly": {"hard_min": 6, "soft_min": 6, "soft_max": 8, "hard_max": 8}},
+        {"weekly": {"hard_min": 0, "soft_min": 0, "soft_max": 8, "hard_max": 8}},
+    ],
+    "customer_bookings": [(0, 0, 1)],
+}
+
+_warm = False
+
+
+def warmup():
+    """Solves WARMUP_REQUEST, without caching it.
+    Returns:
+      the seconds it took.
+    """
+    global _warm
+    start = time.perf_counter()
+    options = SolverOptions(time_limit=5, num_search_workers=1)
+    with metrics.timer("schedule_phase_seconds", phase="warmup"):
+        solve_shift_scheduling(**WARMUP_REQUEST, options=options)
+    _warm = True
+    return time.perf_counter() - start
+
+
+def is_warm():
+    return _warm
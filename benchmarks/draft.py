@@ -0,0 +1,72 @@
+"""Compares draft schedules with the solver.
+Drafts generated rosters with the greedy heuristic of model/draft.py, then
+solves them without a hint and with the draft as hint, reporting the time and
+objective of the draft, of the first solution and of the best one found.
+
+    python3 -m benchmarks.draft
+"""
+import time
+
+from model.draft import get_draft
+from model.options import SolverOptions
+from model.solver import solve_shift_scheduling
+
+from .generator import generate_request, to_arguments
+
+# (employees, days, booking density)
+SIZES = [(6, 5, 0.5), (12, 7, 0.3), (30, 7, 0.3), (60, 14, 0.3)]
+SEEDS = range(3)
+TIME_LIMIT = 5
+
+
+def solve(request, hint=None):
+    """Time and objective of the first and of the best solution."""
+    solutions = []
+    options = SolverOptions(time_limit=TIME_LIMIT, stop_at_lower_bound=False)
+    solve_shift_scheduling(
+        **request, hint=hint, options=options, on_solution=solutions.append
+    )
+    if not solutions:
+        return (None, None, None)
+    return (solutions[0]["time"], solutions[0]["objective"], solutions[-1]["objective"])
+
+
+def format_solve(result):
+    first, objective, best = result
+    if first is None:
+        return "no solution"
+    return "%.2fs %g %g" % (first, objective, best)
+
+
+def main():
+    print(
+        "%-10s %4s %9s %9s   %-26s %-26s"
+        % ("size", "seed", "draft ms", "objective", "cold (first, obj, best)", "hinted")
+    )
+    for employees, days, density in SIZES:
+        for seed in SEEDS:
+            request = to_arguments(
+                generate_request(seed, employees, days, booking_density=density)
+            )
+            start = time.perf_counter()
+            success, draft = get_draft(**request)
+            elapsed = (time.perf_counter() - start) * 1000
+            objective = draft["termination"]["objective"] if success else None
+            cold = solve(request)
+            hinted = solve(request, draft["days"]) if success else (None,) * 3
+            cold, hinted = format_solve(cold), format_solve(hinted)
+            print(
+                "%-10s %4i %9.1f %9s   %-26s %-26s"
+                % (
+                    "%ix%i" % (employees, days),
+                    seed,
+                    elapsed,
+                    objective,
+                    cold,
+                    hinted,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Seeded generator of synthetic scheduling requests.
+The requests have the shape of sample_request.json, so they can be sent to
+the API as well as solved directly with to_arguments.
+"""
+import random
+from typing import Dict
+
+
+def generate_request(
+    seed: int,
+    employees: int,
+    days: int,
+    hours: int = 12,
+    constraint_density: float = 0.2,
+    booking_density: float = 0.1,
+) -> Dict:
+    """Random request with the given size.
+    Args:
+      seed: the same seed always gives the same request.
+      employees: number of employees.
+      days: number of days.
+      hours: opening hours of every day.
+      constraint_density: probability for an employee to have weekly limits of
+        their own, and for every employee-day to have daily limits (a third
+        of them being days off).
+      booking_density: probability for every hour of every day to be booked
+        by 2 or 3 employees.
+    """
+    rng = random.Random(seed)
+    employee_constraints = []
+    for _ in range(employees):
+        # Weekly limits scale with the length of the horizon
+        target = days * rng.randint(5, 7)
+        weekly = {
+            "hard_min": max(0, target - 12),
+            "soft_min": max(0, target - 4),
+            "soft_max": target + 4,
+            "hard_max": target + 12,
+        }
+        if rng.random() >= constraint_density:
+            weekly = {k: v for k, v in weekly.items() if k.startswith("soft")}
+            weekly["hard_min"] = max(0, target - 20)
+            weekly["hard_max"] = target + 20
+        daily = {}
+        for d in range(days):
+            if rng.random() >= constraint_density:
+                continue
+            if rng.random() < 1 / 3:
+                daily[str(d)] = {"hard_max": 0}
+            else:
+                hard_min = rng.randint(4, 6)
+                daily[str(d)] = {"hard_min": hard_min, "hard_max": hard_min + 3}
+        employee_constraints.append({"weekly": weekly, "daily": daily})
+
+    bookings = []
+    for d in range(days):
+        for h in range(hours):
+            if rng.random() < booking_density:
+                bookings.append({"day": d, "hour": h, "bookings": rng.randint(2, 3)})
+
+    return {
+        "num_employees": employees,
+        "days": [{"hours": hours, "minutes": 0} for _ in range(days)],
+        "employee_constraints": employee_constraints,
+        "bookings": bookings,
+    }
+
+
+def to_arguments(request: Dict) -> Dict:
+    """Keyword arguments of solve_shift_scheduling for a request."""
+    return {
+        "employees": request["num_employees"],
+        "days": request["days"],
+        "constraints": request["employee_constraints"],
+        "customer_bookings": [
+            (b["day"], b["hour"], b["bookings"]) for b in request["bookings"]
+        ],
+    }
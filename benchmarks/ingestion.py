@@ -0,0 +1,79 @@
+"""Compares the ingestion of JSON and columnar .npz requests.
+Generates rosters of growing size, encodes each of them in both formats and
+reports the body size, the time to parse the body and resolve the bounds of
+every employee-day, and the time to get the keyword arguments of
+solve_shift_scheduling from the body.
+
+    python3 -m benchmarks.ingestion
+"""
+import json
+import time
+
+from api.routes import parse_request
+from model.arrays import (
+    get_arrays_from_request,
+    get_request_from_arrays,
+    load_npz,
+    normalize_arrays,
+    save_npz,
+)
+from model.constraints import (
+    get_daily_hour_constraints,
+    get_weekly_constraints_for_employee,
+)
+
+from .generator import generate_request, to_arguments
+
+SIZES = [(50, 28), (200, 28), (500, 91)]
+HOURS = 24
+REPEATS = 5
+
+
+def resolve_json(body: bytes):
+    request = parse_request(json.loads(body))
+    for employee_constraints in request["constraints"]:
+        get_daily_hour_constraints(employee_constraints.get("daily"), request["days"])
+        get_weekly_constraints_for_employee(employee_constraints)
+
+
+def measure(parse, body: bytes):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        parse(body)
+    return (time.perf_counter() - start) / REPEATS
+
+
+def main():
+    header = "%9s %4s %9s %9s %13s %13s %13s"
+    print(
+        header
+        % (
+            "employees",
+            "days",
+            "json size",
+            "npz size",
+            "json resolve",
+            "npz resolve",
+            "npz request",
+        )
+    )
+    for employees, days in SIZES:
+        request = generate_request(0, employees, days, HOURS, 0.5, 0.3)
+        json_body = json.dumps(request).encode()
+        npz_body = save_npz(get_arrays_from_request(**to_arguments(request)))
+        print(
+            "%9i %4i %8iB %8iB %12.4fs %12.4fs %12.4fs"
+            % (
+                employees,
+                days,
+                len(json_body),
+                len(npz_body),
+                measure(resolve_json, json_body),
+                measure(lambda b: normalize_arrays(load_npz(b)), npz_body),
+                measure(lambda b: get_request_from_arrays(load_npz(b)), npz_body),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Measures the latency of /endpoint in fresh and in warm processes.
+cold: the first request of a new process, without and with the warmup a
+worker of the gunicorn server does at startup, and the startup time.
+warm: requests of a process which already served some.
+health: /health while a long solve runs in another thread.
+Latencies are in seconds, through the Flask test client, so without the
+network.
+
+    python3 -m benchmarks.latency
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .generator import generate_request
+
+COLD_RUNS = 10
+WARM_RUNS = 50
+HEALTH_RUNS = 200
+EMPLOYEES = 5
+DAYS = 3
+SOLVER = {"time_limit": 2, "num_search_workers": 1}
+
+COLD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from api.routes import app
+from api.warmup import warmup
+if sys.argv[1] == "1":
+    warmup()
+ready = time.perf_counter()
+app.test_client().post("/endpoint", json=json.loads(sys.argv[2]))
+print(json.dumps([ready - start, time.perf_counter() - ready]))
+"""
+
+
+def get_request(seed: int):
+    return dict(generate_request(seed, EMPLOYEES, DAYS), solver=SOLVER)
+
+
+def percentiles(latencies):
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def measure_cold(warm: bool):
+    env = dict(os.environ, SCHEDULE_LOG_LEVEL="WARNING")
+    startups, latencies = [], []
+    for seed in range(COLD_RUNS):
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                COLD_SCRIPT,
+                "1" if warm else "0",
+                json.dumps(get_request(seed)),
+            ],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        startup, latency = json.loads(output.strip().splitlines()[-1])
+        startups.append(startup)
+        latencies.append(latency)
+    return startups, latencies
+
+
+def measure_warm(client):
+    latencies = []
+    for seed in range(WARM_RUNS):
+        # Distinct requests, so that none of them is answered from the cache
+        request = get_request(1000 + seed)
+        start = time.perf_counter()
+        client.post("/endpoint", json=request)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def measure_health(client):
+    request = dict(generate_request(2000, 40, 14), solver={"time_limit": 10})
+    solve = threading.Thread(
+        target=client.post, args=("/endpoint",), kwargs={"json": request}
+    )
+    solve.start()
+    time.sleep(1)
+    latencies = []
+    for _ in range(HEALTH_RUNS):
+        start = time.perf_counter()
+        client.get("/health")
+        latencies.append(time.perf_counter() - start)
+    solve.join()
+    return latencies
+
+
+def main():
+    os.environ["SCHEDULE_LOG_LEVEL"] = "WARNING"
+    from api.routes import app
+    from api.warmup import warmup
+
+    print("%-22s %9s %9s %9s" % ("", "startup", "p50", "p99"))
+    for warm in (False, True):
+        startups, latencies = measure_cold(warm)
+        name = "cold, warmed up" if warm else "cold"
+        print(
+            "%-22s %9.3f %9.3f %9.3f"
+            % ((name, np.median(startups)) + percentiles(latencies))
+        )
+    warmup()
+    client = app.test_client()
+    print("%-22s %9s %9.3f %9.3f" % (("warm", "") + percentiles(measure_warm(client))))
+    print(
+        "%-22s %9s %9.4f %9.4f"
+        % (("health during solve", "") + percentiles(measure_health(client)))
+    )
+
+
+if __name__ == "__main__":
+    main()
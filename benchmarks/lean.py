@@ -0,0 +1,69 @@
+"""Measures the lean build mode of build_model.
+Builds generated rosters of 12 hour days with and without the lean mode, and
+reports the build time, the peak memory traced while building again (tracing
+slows the build down), the size of the proto and the time and memory the lean
+mode saves.
+
+    python3 -m benchmarks.lean
+"""
+import gc
+import time
+import tracemalloc
+
+from benchmarks.generator import generate_request, to_arguments
+from model.solver import build_model, get_demand
+
+# (employees, days)
+SIZES = [(50, 7), (100, 14), (200, 28)]
+SEED = 0
+
+
+def run(lean: bool, employees: int, num_days: int):
+    request = to_arguments(generate_request(SEED, employees, num_days))
+    demand = get_demand(request["days"], request["customer_bookings"])
+    args = (employees, request["days"], request["constraints"], demand)
+    gc.collect()
+    start = time.perf_counter()
+    model, _, _ = build_model(*args, lean=lean)
+    build = time.perf_counter() - start
+    del model
+    gc.collect()
+    tracemalloc.start()
+    model, _, _ = build_model(*args, lean=lean)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"build": build, "peak": peak / 2**20, "proto": model.Proto().ByteSize()}
+
+
+def main():
+    header = "%-5s %9s %4s %8s %9s %9s"
+    row = "%-5s %9i %4i %8.2f %9.1f %9.1f"
+    print(header % ("lean", "employees", "days", "build", "peak MiB", "proto MiB"))
+    for employees, num_days in SIZES:
+        results = {}
+        for lean in (False, True):
+            r = results[lean] = run(lean, employees, num_days)
+            print(
+                row
+                % (
+                    "on" if lean else "off",
+                    employees,
+                    num_days,
+                    r["build"],
+                    r["peak"],
+                    r["proto"] / 2**20,
+                )
+            )
+        print(
+            "saved %.2fs (%.0f%%) and %.1f MiB (%.0f%%) of peak memory"
+            % (
+                results[False]["build"] - results[True]["build"],
+                100 * (1 - results[True]["build"] / results[False]["build"]),
+                results[False]["peak"] - results[True]["peak"],
+                100 * (1 - results[True]["peak"] / results[False]["peak"]),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
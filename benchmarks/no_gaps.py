@@ -0,0 +1,87 @@
+"""Compares the encodings of the no gaps constraint.
+Builds a day of coverage for a growing number of hours and employees, with
+every employee working a single shift of 4 to 8 hours, and reports the model
+size and solve time of each encoding.
+
+    python3 -m benchmarks.no_gaps
+"""
+import time
+
+from ortools.sat.python import cp_model
+
+from model.solver import add_compact_no_gaps_constraint, add_no_gaps_constraint
+
+ENCODINGS = {
+    "quadratic": add_no_gaps_constraint,
+    "linear": add_compact_no_gaps_constraint,
+}
+HOURS = [8, 12, 24]
+EMPLOYEES = [4, 8, 16]
+TIME_LIMIT = 10
+
+
+def run(add_constraint, employees: int, hours: int):
+    start = time.perf_counter()
+    model = cp_model.CpModel()
+    work = [
+        [model.NewBoolVar("work%i_%i" % (e, h)) for h in range(hours)]
+        for e in range(employees)
+    ]
+    for e in range(employees):
+        add_constraint(model, work[e])
+        model.AddLinearConstraint(sum(work[e]), 4, 8)
+    for h in range(hours):
+        model.AddAtLeastOne([work[e][h] for e in range(employees)])
+    model.Minimize(sum(sum(row) for row in work))
+    build_time = time.perf_counter() - start
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = TIME_LIMIT
+    status = solver.Solve(model)
+    proto = model.Proto()
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "build": build_time,
+        "solve": solver.WallTime(),
+        "status": solver.StatusName(status),
+    }
+
+
+def main():
+    header = "%-10s %5s %9s %9s %11s %8s %8s %s"
+    row = "%-10s %5i %9i %9i %11i %8.3f %8.3f %s"
+    print(
+        header
+        % (
+            "encoding",
+            "hours",
+            "employees",
+            "variables",
+            "constraints",
+            "build",
+            "solve",
+            "status",
+        )
+    )
+    for hours in HOURS:
+        for employees in EMPLOYEES:
+            for name, add_constraint in ENCODINGS.items():
+                r = run(add_constraint, employees, hours)
+                print(
+                    row
+                    % (
+                        name,
+                        hours,
+                        employees,
+                        r["variables"],
+                        r["constraints"],
+                        r["build"],
+                        r["solve"],
+                        r["status"],
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
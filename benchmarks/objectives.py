@@ -0,0 +1,81 @@
+"""Compares a weighted objective with a lexicographic solve.
+Generated rosters, where some employees ask for their weekends off, are
+solved with the penalty, fairness and preference terms in a single weighted
+objective, and in two stages: the penalty first, then fairness and
+preferences. Reports the time and the value of both in the weighted
+objective.
+
+    python3 -m benchmarks.objectives
+"""
+import time
+
+from model.objectives import Objectives
+from model.options import SolverOptions
+from model.solver import solve_shift_scheduling
+
+from .generator import generate_request, to_arguments
+
+# (employees, days, booking density)
+SIZES = [(6, 7, 0.5), (8, 7, 0.4), (12, 7, 0.3)]
+SEEDS = range(3)
+TIME_LIMIT = 10
+
+WEIGHTED = {"stages": [{"weights": {"penalty": 10, "fairness": 1, "preferences": 1}}]}
+LEXICOGRAPHIC = {
+    "stages": [
+        {"weights": {"penalty": 1}},
+        {"weights": {"fairness": 1, "preferences": 1}},
+    ]
+}
+
+
+def get_request(seed: int, employees: int, days: int, density: float):
+    request = to_arguments(
+        generate_request(seed, employees, days, booking_density=density)
+    )
+    for e, employee_constraints in enumerate(request["constraints"]):
+        employee_constraints.pop("weekly", None)
+        if e % 3 == 0:
+            employee_constraints["preferences"] = {"days_off": [5, 6]}
+    return request
+
+
+def get_weighted_value(res):
+    """Value of a solve in the weighted objective, to compare both modes."""
+    stages = res["stages"]
+    if len(stages) == 1:
+        return stages[0]["objective"]
+    weight = WEIGHTED["stages"][0]["weights"]["penalty"]
+    return weight * stages[0]["objective"] + stages[1]["objective"]
+
+
+def main():
+    print("%-8s %4s %-14s %7s %9s" % ("size", "seed", "mode", "time", "weighted"))
+    for employees, days, density in SIZES:
+        for seed in SEEDS:
+            request = get_request(seed, employees, days, density)
+            for name, spec in (
+                ("weighted", WEIGHTED),
+                ("lexicographic", LEXICOGRAPHIC),
+            ):
+                start = time.perf_counter()
+                success, res = solve_shift_scheduling(
+                    **request,
+                    options=SolverOptions(time_limit=TIME_LIMIT),
+                    objectives=Objectives.from_dict(spec)
+                )
+                elapsed = time.perf_counter() - start
+                print(
+                    "%-8s %4i %-14s %7.2f %9s"
+                    % (
+                        "%ix%i" % (employees, days),
+                        seed,
+                        name,
+                        elapsed,
+                        get_weighted_value(res) if success else None,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
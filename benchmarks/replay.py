@@ -0,0 +1,203 @@
+"""Replays captured solves under other solver parameters and encodings.
+Every capture of model/capture.py is solved again from its model as captured,
+and rebuilt from its request with every encoding asked for, with every number
+of search workers and set of CP-SAT parameters, reporting the build and solve
+time, status and objective next to the ones of the capture.
+
+    python3 -m benchmarks.replay captures/ --workers 1,8
+    python3 -m benchmarks.replay captures/20260101T120000-0a1b2c3d \
+        --encodings captured,sequence,interval \
+        --parameters "" --parameters "linearization_level: 2"
+"""
+import argparse
+import time
+from typing import Dict, List, Optional
+
+from google.protobuf import text_format
+from ortools.sat.python import cp_model
+
+from model.capture import find_captures, load_capture
+from model.options import SolverOptions
+from model.slots import HOUR, get_slot_bookings, get_slot_request
+from model.solver import (
+    NO_GAPS_LINEAR,
+    NO_GAPS_QUADRATIC,
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    build_model,
+    get_demand,
+)
+
+from .runner import write_results
+
+# The model as captured, hints and stability penalty included
+CAPTURED = "captured"
+# Encodings a request can be rebuilt with: (shift_model, no_gaps)
+ENCODINGS = {
+    SHIFT_MODEL_SEQUENCE: (SHIFT_MODEL_SEQUENCE, NO_GAPS_LINEAR),
+    "sequence_quadratic": (SHIFT_MODEL_SEQUENCE, NO_GAPS_QUADRATIC),
+    SHIFT_MODEL_INTERVAL: (SHIFT_MODEL_INTERVAL, NO_GAPS_LINEAR),
+}
+
+
+def build_captured(request: Dict, encoding: str):
+    """Model of a captured request, rebuilt with an encoding, without its
+    hint. Its objective is the penalty, the first stage of a lexicographic
+    solve.
+    """
+    shift_model, no_gaps = ENCODINGS[encoding]
+    employees = request["employees"]
+    days = request["days"]
+    constraints = request["constraints"]
+    customer_bookings = request["customer_bookings"]
+    skill_bookings = request.get("skill_bookings")
+    slot_minutes = request.get("slot_minutes", HOUR)
+    if slot_minutes != HOUR:
+        days, constraints, customer_bookings = get_slot_request(
+            employees, days, constraints, customer_bookings, slot_minutes
+        )
+        if skill_bookings:
+            skill_bookings = get_slot_bookings(skill_bookings, slot_minutes)
+    demand = get_demand(days, customer_bookings, skill_bookings)
+    symmetry = slot_minutes == HOUR
+    model, _, _ = build_model(
+        employees, days, constraints, demand, no_gaps, shift_model, symmetry
+    )
+    return model
+
+
+def solve(model, options: SolverOptions, parameters: str):
+    solver = cp_model.CpSolver()
+    with options.applied(solver):
+        text_format.Merge(parameters, solver.parameters)
+        status = solver.Solve(model)
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        "solve": solver.WallTime(),
+        "status": solver.StatusName(status),
+        "objective": solver.ObjectiveValue() if found else None,
+        "bound": solver.BestObjectiveBound() if found else None,
+    }
+
+
+def replay_capture(
+    path: str,
+    encodings: List[str],
+    workers: List[int],
+    parameters: List[str],
+    time_limit: Optional[float] = None,
+):
+    """Results of solving a capture again with every encoding, number of
+    workers and set of parameters.
+    """
+    request, proto, meta = load_capture(path)
+    options = SolverOptions.from_dict(meta["options"])
+    options.log_path = None
+    if time_limit is not None:
+        options.time_limit = time_limit
+
+    results = []
+    for encoding in encodings:
+        start = time.perf_counter()
+        if encoding == CAPTURED:
+            model = cp_model.CpModel()
+            model.Proto().CopyFrom(proto)
+        else:
+            model = build_captured(request, encoding)
+        build = time.perf_counter() - start
+        for num_workers in workers:
+            options.num_search_workers = num_workers
+            for text in parameters:
+                r = solve(model, options, text)
+                r.update(
+                    capture=path,
+                    encoding=encoding,
+                    workers=num_workers,
+                    parameters=text,
+                    build=build,
+                )
+                results.append(r)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("paths", nargs="+", help="captures or directories of them")
+    parser.add_argument(
+        "--encodings",
+        default=CAPTURED,
+        help="comma separated, among %s" % ", ".join([CAPTURED] + list(ENCODINGS)),
+    )
+    parser.add_argument(
+        "--workers", default="0", help="comma separated search workers, 0 for all"
+    )
+    parser.add_argument(
+        "--parameters",
+        action="append",
+        help="CP-SAT parameters in text format, once per set to try",
+    )
+    parser.add_argument("--time_limit", type=float, help="instead of the captured")
+    parser.add_argument("--output", help="write the results to a .json or .csv")
+    args = parser.parse_args()
+
+    encodings = args.encodings.split(",")
+    for encoding in encodings:
+        if encoding != CAPTURED and encoding not in ENCODINGS:
+            parser.error("unknown encoding %s" % encoding)
+    workers = [int(w) for w in args.workers.split(",")]
+    parameters = args.parameters or [""]
+
+    print(
+        "%-28s %-18s %7s %-24s %8s %8s %-10s %9s"
+        % (
+            "capture",
+            "encoding",
+            "workers",
+            "parameters",
+            "build",
+            "solve",
+            "status",
+            "objective",
+        )
+    )
+    results = []
+    for path in find_captures(args.paths):
+        _, _, meta = load_capture(path)
+        timings, outcome = meta["timings"], meta["outcome"]
+        print(
+            "%-28s %-18s %7s %-24s %8.3f %8.3f %-10s %9s"
+            % (
+                path[-28:],
+                "(as captured)",
+                meta["options"]["num_search_workers"],
+                "",
+                timings["build"],
+                timings["solve"],
+                outcome["status"],
+                outcome["objective"],
+            )
+        )
+        for r in replay_capture(
+            path, encodings, workers, parameters, time_limit=args.time_limit
+        ):
+            print(
+                "%-28s %-18s %7i %-24s %8.3f %8.3f %-10s %9s"
+                % (
+                    path[-28:],
+                    r["encoding"],
+                    r["workers"],
+                    r["parameters"][:24],
+                    r["build"],
+                    r["solve"],
+                    r["status"],
+                    r["objective"],
+                )
+            )
+            results.append(r)
+
+    if args.output:
+        write_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Scaling benchmarks of the model build and solve.
+Runs every scenario of a suite end to end through solve_shift_scheduling, and
+every constraint builder of model/constraints.py on its own, then writes the
+results as JSON or CSV (by the extension of the output). Results of two
+commits can be compared with --compare.
+
+    python3 -m benchmarks.runner --suite small --output results.json
+    python3 -m benchmarks.runner --suite small --compare results.json
+"""
+import argparse
+import csv
+import json
+import time
+from typing import Dict, List
+
+from ortools.sat.python import cp_model
+
+from model.constraints import (
+    DEFAULT_DAY_CONSTRAINTS,
+    DEFAULT_WEEK_CONSTRAINTS,
+    add_daily_hour_constraints,
+    add_daily_shift_constraints,
+    add_weekly_constraint,
+)
+from model.options import SolverOptions
+from model.solver import (
+    add_compact_no_gaps_constraint,
+    add_no_gaps_constraint,
+    build_model,
+    get_demand,
+    solve_shift_scheduling,
+)
+
+from .generator import generate_request, to_arguments
+
+# (employees, days, hours, constraint density, booking density) of the suites
+SUITES = {
+    "small": [
+        (5, 5, 8, 0.2, 0.1),
+        (10, 7, 12, 0.2, 0.1),
+    ],
+    "medium": [
+        (10, 7, 12, 0.2, 0.1),
+        (25, 7, 12, 0.2, 0.1),
+        (25, 7, 24, 0.2, 0.1),
+        (25, 14, 12, 0.5, 0.3),
+    ],
+    "large": [
+        (50, 7, 12, 0.2, 0.1),
+        (50, 28, 12, 0.2, 0.1),
+        (100, 28, 24, 0.2, 0.1),
+    ],
+}
+SEED = 0
+TIME_LIMIT = 10
+
+# Builders of model/constraints.py and model/solver.py, each adding the
+# constraints of a single employee-day, or of a whole horizon for the weekly
+# constraint
+BUILDERS = {
+    "add_daily_hour_constraints": lambda m, w: add_daily_hour_constraints(
+        m, w, DEFAULT_DAY_CONSTRAINTS, 0, 0
+    ),
+    "add_daily_shift_constraints": lambda m, w: add_daily_shift_constraints(
+        m, w, DEFAULT_DAY_CONSTRAINTS, 0, 0
+    ),
+    "add_weekly_constraint": lambda m, w: add_weekly_constraint(
+        m, DEFAULT_WEEK_CONSTRAINTS, w, 0
+    ),
+    "add_no_gaps_constraint": add_no_gaps_constraint,
+    "add_compact_no_gaps_constraint": add_compact_no_gaps_constraint,
+}
+BUILDER_HOURS = [8, 12, 24, 96]
+BUILDER_REPEATS = 20
+
+# Metrics compared between two runs
+COMPARED = ["build", "proto_bytes", "constraints", "first_solution", "objective"]
+
+
+def run_scenario(
+    employees: int,
+    days: int,
+    hours: int,
+    constraint_density: float,
+    booking_density: float,
+    seed: int = SEED,
+    time_limit: float = TIME_LIMIT,
+) -> Dict:
+    request = generate_request(
+        seed, employees, days, hours, constraint_density, booking_density
+    )
+    arguments = to_arguments(request)
+    result = {
+        "name": "e%i_d%i_h%i_c%g_b%g_s%i"
+        % (employees, days, hours, constraint_density, booking_density, seed),
+        "employees": employees,
+        "days": days,
+        "hours": hours,
+        "constraint_density": constraint_density,
+        "booking_density": booking_density,
+        "seed": seed,
+    }
+
+    # Model size
+    start = time.perf_counter()
+    demand = get_demand(arguments["days"], arguments["customer_bookings"])
+    model, _, _ = build_model(
+        employees, arguments["days"], arguments["constraints"], demand
+    )
+    result["build"] = time.perf_counter() - start
+    proto = model.Proto()
+    result["proto_bytes"] = proto.ByteSize()
+    result["variables"] = len(proto.variables)
+    result["constraints"] = len(proto.constraints)
+
+    # End to end
+    solutions = []
+    options = SolverOptions(time_limit=time_limit)
+    start = time.perf_counter()
+    success, _ = solve_shift_scheduling(
+        **arguments, options=options, on_solution=solutions.append
+    )
+    result["wall"] = time.perf_counter() - start
+    result["first_solution"] = solutions[0]["time"] if solutions else None
+    result["solutions"] = len(solutions)
+    if not success:
+        result["objective"] = None
+        result["bound"] = None
+        result["status"] = "NO_SOLUTION"
+    else:
+        last = solutions[-1]
+        result["objective"] = last["objective"]
+        result["bound"] = last["bound"]
+        optimal = last["bound"] >= last["objective"]
+        result["status"] = "OPTIMAL" if optimal else "FEASIBLE"
+    return result
+
+
+def run_builder(name: str, hours: int, repeats: int = BUILDER_REPEATS) -> Dict:
+    add_constraint = BUILDERS[name]
+    model = cp_model.CpModel()
+    works = [
+        [model.NewBoolVar("work%i_%i" % (r, h)) for h in range(hours)]
+        for r in range(repeats)
+    ]
+    variables = len(model.Proto().variables)
+    start = time.perf_counter()
+    for r in range(repeats):
+        add_constraint(model, works[r])
+    elapsed = time.perf_counter() - start
+    proto = model.Proto()
+    return {
+        "name": "%s_h%i" % (name, hours),
+        "builder": name,
+        "hours": hours,
+        "build": elapsed / repeats,
+        "variables": (len(proto.variables) - variables) / repeats,
+        "constraints": len(proto.constraints) / repeats,
+    }
+
+
+def write_results(results: List[Dict], path: str):
+    if path.endswith(".csv"):
+        keys = []
+        for r in results:
+            keys.extend(k for k in r if k not in keys)
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=keys)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def compare_results(results: List[Dict], baseline: List[Dict]):
+    """Prints the ratio of every compared metric to the baseline."""
+    previous = {r["name"]: r for r in baseline}
+    for r in results:
+        old = previous.get(r["name"])
+        if old is None:
+            continue
+        ratios = []
+        for key in COMPARED:
+            if r.get(key) is None or not old.get(key):
+                continue
+            ratios.append("%s %.2fx" % (key, r[key] / old[key]))
+        print("%-40s %s" % (r["name"], ", ".join(ratios)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--suite", choices=sorted(SUITES), default="small")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--time_limit", type=float, default=TIME_LIMIT)
+    parser.add_argument("--output", help="write the results to a .json or .csv")
+    parser.add_argument("--compare", help="compare to the results of a .json")
+    parser.add_argument(
+        "--skip_builders", action="store_true", help="only run the scenarios"
+    )
+    args = parser.parse_args()
+
+    results = []
+    for scenario in SUITES[args.suite]:
+        r = run_scenario(*scenario, seed=args.seed, time_limit=args.time_limit)
+        print(
+            "%-40s build %.3fs, %i vars, %i constraints, first solution %s, "
+            "objective %s, %s"
+            % (
+                r["name"],
+                r["build"],
+                r["variables"],
+                r["constraints"],
+                r["first_solution"],
+                r["objective"],
+                r["status"],
+            )
+        )
+        results.append(r)
+    if not args.skip_builders:
+        for name in BUILDERS:
+            for hours in BUILDER_HOURS:
+                r = run_builder(name, hours)
+                print(
+                    "%-40s build %.6fs, %.1f vars, %.1f constraints"
+                    % (r["name"], r["build"], r["variables"], r["constraints"])
+                )
+                results.append(r)
+
+    if args.output:
+        write_results(results, args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compares the formulations of the daily shifts.
+Builds and solves rosters of 12 hour days with default constraints for a
+growing number of employees and days, and reports the model size, build time,
+solve time and objective of each formulation.
+
+    python3 -m benchmarks.shift_model
+"""
+import time
+
+from ortools.sat.python import cp_model
+
+from model.solver import (
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    build_model,
+    get_demand,
+)
+
+SIZES = [(10, 7), (25, 7), (50, 7), (50, 28)]
+HOURS = 12
+TIME_LIMIT = 10
+
+
+def run(shift_model: str, employees: int, num_days: int):
+    days = [{"hours": HOURS, "minutes": 0} for _ in range(num_days)]
+    constraints = [{"weekly": {}, "daily": {}} for _ in range(employees)]
+    start = time.perf_counter()
+    model, _, _ = build_model(
+        employees, days, constraints, get_demand(days, []), shift_model=shift_model
+    )
+    build_time = time.perf_counter() - start
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = TIME_LIMIT
+    status = solver.Solve(model)
+    proto = model.Proto()
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "build": build_time,
+        "solve": solver.WallTime(),
+        "objective": solver.ObjectiveValue() if found else float("nan"),
+        "status": solver.StatusName(status),
+    }
+
+
+def main():
+    header = "%-8s %9s %4s %9s %11s %8s %8s %9s %s"
+    row = "%-8s %9i %4i %9i %11i %8.3f %8.3f %9.1f %s"
+    print(
+        header
+        % (
+            "model",
+            "employees",
+            "days",
+            "variables",
+            "constraints",
+            "build",
+            "solve",
+            "objective",
+            "status",
+        )
+    )
+    for employees, num_days in SIZES:
+        for shift_model in (SHIFT_MODEL_SEQUENCE, SHIFT_MODEL_INTERVAL):
+            r = run(shift_model, employees, num_days)
+            print(
+                row
+                % (
+                    shift_model,
+                    employees,
+                    num_days,
+                    r["variables"],
+                    r["constraints"],
+                    r["build"],
+                    r["solve"],
+                    r["objective"],
+                    r["status"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compares the formulations of the daily shifts by slot size.
+Builds and solves the same roster, 12 hour days with default constraints and
+a few bookings, scheduled by the hour, half hour and quarter hour, and reports
+the model size, build time, solve time and objective of each formulation.
+The sequence model enumerates the spans of a day, so its size grows with the
+square of the slots, while the interval model grows linearly. Like
+solve_shift_scheduling, symmetry breaking is only used for whole hours.
+
+    python3 -m benchmarks.slots
+"""
+import time
+
+from ortools.sat.python import cp_model
+
+from model.slots import HOUR, SLOT_MINUTES, get_slot_request
+from model.solver import (
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    build_model,
+    get_demand,
+)
+
+EMPLOYEES = 10
+DAYS = 7
+HOURS = 12
+BOOKINGS = [(d, h, 3) for d in range(DAYS) for h in (3, 4, 8)]
+TIME_LIMIT = 10
+
+
+def run(shift_model: str, slot_minutes: int):
+    days = [{"hours": HOURS, "minutes": 0} for _ in range(DAYS)]
+    constraints = [{"weekly": {}, "daily": {}} for _ in range(EMPLOYEES)]
+    start = time.perf_counter()
+    days, constraints, bookings = get_slot_request(
+        EMPLOYEES, days, constraints, BOOKINGS, slot_minutes
+    )
+    model, _, _ = build_model(
+        EMPLOYEES,
+        days,
+        constraints,
+        get_demand(days, bookings),
+        shift_model=shift_model,
+        symmetry=slot_minutes == HOUR,
+    )
+    build_time = time.perf_counter() - start
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = TIME_LIMIT
+    status = solver.Solve(model)
+    proto = model.Proto()
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        "variables": len(proto.variables),
+        "constraints": len(proto.constraints),
+        "build": build_time,
+        "solve": solver.WallTime(),
+        "objective": solver.ObjectiveValue() if found else float("nan"),
+        "status": solver.StatusName(status),
+    }
+
+
+def main():
+    header = "%-8s %5s %9s %11s %8s %8s %9s %s"
+    row = "%-8s %5i %9i %11i %8.3f %8.3f %9.1f %s"
+    print(
+        header
+        % (
+            "model",
+            "slot",
+            "variables",
+            "constraints",
+            "build",
+            "solve",
+            "objective",
+            "status",
+        )
+    )
+    for slot_minutes in reversed(SLOT_MINUTES):
+        for shift_model in (SHIFT_MODEL_SEQUENCE, SHIFT_MODEL_INTERVAL):
+            r = run(shift_model, slot_minutes)
+            print(
+                row
+                % (
+                    shift_model,
+                    slot_minutes,
+                    r["variables"],
+                    r["constraints"],
+                    r["build"],
+                    r["solve"],
+                    r["objective"],
+                    r["status"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
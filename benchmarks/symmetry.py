@@ -0,0 +1,73 @@
+"""Measures the symmetry breaking between interchangeable employees.
+Solves rosters of 12 hour days where every employee has the default
+constraints, with random bookings, with and without the lexicographic ordering
+of the schedules, and reports the solve time, objective, bound and status.
+
+    python3 -m benchmarks.symmetry
+"""
+import random
+
+from ortools.sat.python import cp_model
+
+from model.solver import build_model, get_demand
+
+# (employees, days, booking density, booking range)
+SIZES = [(12, 7, 0.3, (4, 7)), (20, 7, 0.35, (7, 11)), (20, 7, 0.3, (7, 11))]
+HOURS = 12
+TIME_LIMIT = 20
+NUM_SEARCH_WORKERS = 8
+SEED = 1
+
+
+def run(symmetry: bool, employees: int, num_days: int, density, booking_range):
+    rng = random.Random(SEED)
+    days = [{"hours": HOURS, "minutes": 0} for _ in range(num_days)]
+    constraints = [{"weekly": {}, "daily": {}} for _ in range(employees)]
+    bookings = [
+        (d, h, rng.randint(*booking_range))
+        for d in range(num_days)
+        for h in range(HOURS)
+        if rng.random() < density
+    ]
+    demand = get_demand(days, bookings)
+    model, _, _ = build_model(employees, days, constraints, demand, symmetry=symmetry)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = TIME_LIMIT
+    solver.parameters.num_search_workers = NUM_SEARCH_WORKERS
+    status = solver.Solve(model)
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    return {
+        "solve": solver.WallTime(),
+        "objective": solver.ObjectiveValue() if found else float("nan"),
+        "bound": solver.BestObjectiveBound() if found else float("nan"),
+        "status": solver.StatusName(status),
+    }
+
+
+def main():
+    header = "%-8s %9s %4s %8s %9s %7s %s"
+    row = "%-8s %9i %4i %8.3f %9.1f %7.1f %s"
+    print(
+        header
+        % ("symmetry", "employees", "days", "solve", "objective", "bound", "status")
+    )
+    for employees, num_days, density, booking_range in SIZES:
+        for symmetry in (False, True):
+            r = run(symmetry, employees, num_days, density, booking_range)
+            print(
+                row
+                % (
+                    "on" if symmetry else "off",
+                    employees,
+                    num_days,
+                    r["solve"],
+                    r["objective"],
+                    r["bound"],
+                    r["status"],
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compares the termination policies of a search.
+Solves generated rosters with the time limit only, then stopping at the
+lower bound, after a second without improvement, at a 5% relative gap, and
+with all of them, and reports the median and worst solve time, the mean
+objective and the reasons the searches ended.
+
+    python3 -m benchmarks.termination
+"""
+import statistics
+import time
+from collections import Counter
+
+from model.options import SolverOptions
+from model.solver import solve_shift_scheduling
+
+from .generator import generate_request, to_arguments
+
+# (employees, days, booking density)
+SIZES = [(5, 3, 0.3), (6, 5, 0.5), (8, 7, 0.4), (12, 7, 0.3)]
+SEEDS = range(3)
+TIME_LIMIT = 5
+
+POLICIES = [
+    ("time limit", {"stop_at_lower_bound": False}),
+    ("lower bound", {}),
+    ("no improvement", {"stop_at_lower_bound": False, "no_improvement_time": 1}),
+    ("gap", {"stop_at_lower_bound": False, "relative_gap_limit": 0.05}),
+    ("all", {"no_improvement_time": 1, "relative_gap_limit": 0.05}),
+]
+
+
+def get_requests():
+    requests = []
+    for employees, days, density in SIZES:
+        for seed in SEEDS:
+            request = to_arguments(
+                generate_request(seed, employees, days, booking_density=density)
+            )
+            # Without weekly limits of their own, the defaults of a week apply
+            for employee_constraints in request["constraints"]:
+                employee_constraints.pop("weekly", None)
+            requests.append(request)
+    return requests
+
+
+def main():
+    requests = get_requests()
+    print(
+        "%-15s %8s %8s %10s  %s" % ("policy", "median", "max", "objective", "reasons")
+    )
+    for name, settings in POLICIES:
+        options = SolverOptions(time_limit=TIME_LIMIT, **settings)
+        times, objectives, reasons = [], [], Counter()
+        for request in requests:
+            start = time.perf_counter()
+            success, res = solve_shift_scheduling(**request, options=options)
+            times.append(time.perf_counter() - start)
+            if success:
+                objectives.append(res["termination"]["objective"])
+                reasons[res["termination"]["reason"]] += 1
+            else:
+                reasons["no solution"] += 1
+        print(
+            "%-15s %8.2f %8.2f %10.1f  %s"
+            % (
+                name,
+                statistics.median(times),
+                max(times),
+                statistics.mean(objectives) if objectives else float("nan"),
+                ", ".join("%s %i" % item for item in sorted(reasons.items())),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Columnar request format, as NumPy arrays in an .npz archive.
+
+    hours        (days,) opening hours of every day, required
+    minutes      (days,) minutes of every day, 0 if missing
+    demand       (days, hours) employees booked on every hour, 0 for none
+    daily_min    (employees, days) daily hard_min, -1 for the default
+    daily_max    (employees, days) daily hard_max, -1 for the default
+    weekly       (employees, 4) weekly hard_min, soft_min, soft_max and
+                 hard_max, -1 for the default
+    num_employees  number of employees, if there are no per-employee arrays
+    solver       JSON text of the solver options
+
+Arrays are read without pickling and normalised at once, and only the
+constraints which differ from the defaults become Python objects.
+"""
+import io
+import json
+from typing import Dict
+
+import numpy as np
+
+from .constraints import (
+    DAY_HARD_MAX,
+    DAY_HARD_MIN,
+    WEEK_HARD_MAX,
+    WEEK_HARD_MIN,
+    WEEK_SOFT_MAX,
+    WEEK_SOFT_MIN,
+)
+
+# Content type of the format
+NPZ_MIMETYPE = "application/x-npz"
+
+# Columns of weekly and their defaults
+WEEKLY_KEYS = ("hard_min", "soft_min", "soft_max", "hard_max")
+WEEKLY_DEFAULTS = (WEEK_HARD_MIN, WEEK_SOFT_MIN, WEEK_SOFT_MAX, WEEK_HARD_MAX)
+
+
+def load_npz(data: bytes):
+    """Arrays of an .npz archive, as a dict."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        return {key: archive[key] for key in archive.files}
+
+
+def save_npz(arrays: Dict):
+    """.npz archive of arrays, as bytes."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def get_int_array(arrays: Dict, key: str, shape: tuple, minimum: int = -1):
+    array = np.asarray(arrays[key])
+    if not np.issubdtype(array.dtype, np.integer):
+        raise ValueError("%s must be an integer array" % key)
+    if array.shape != shape:
+        raise ValueError("%s must have shape %s, not %s" % (key, shape, array.shape))
+    if (array < minimum).any():
+        raise ValueError("%s can't be below %i" % (key, minimum))
+    return array.astype(np.int64)
+
+
+def normalize_arrays(arrays: Dict):
+    """Validates the arrays of a request and resolves the constraints.
+    Missing arrays get their defaults, and the daily and weekly bounds set
+    for an employee are completed and clamped the way
+    get_daily_hour_constraints and get_weekly_constraints_for_employee do.
+    Returns:
+      a dict with the hours, minutes and demand arrays, the number of
+      employees, the (employees, days) daily_min, daily_max and daily_set
+      arrays, the latter telling which bounds were given, and the
+      (employees, 4) weekly and weekly_set arrays.
+    Raises:
+      ValueError: if an array is missing, has the wrong type or shape.
+    """
+    if "hours" not in arrays:
+        raise ValueError("hours is required")
+    hours = np.asarray(arrays["hours"])
+    if hours.ndim != 1:
+        raise ValueError("hours must be one dimensional")
+    num_days = len(hours)
+    hours = get_int_array(arrays, "hours", (num_days,), 0)
+    minutes = np.zeros(num_days, np.int64)
+    if "minutes" in arrays:
+        minutes = get_int_array(arrays, "minutes", (num_days,), 0)
+
+    employees = None
+    for key in ("daily_min", "daily_max", "weekly"):
+        if key in arrays and np.ndim(arrays[key]) > 0:
+            employees = len(arrays[key])
+            break
+    if "num_employees" in arrays:
+        employees = int(arrays["num_employees"])
+    if employees is None:
+        raise ValueError("num_employees is required without per-employee arrays")
+
+    demand = np.zeros((num_days, hours.max(initial=0)), np.int64)
+    if "demand" in arrays:
+        given = np.asarray(arrays["demand"])
+        if given.ndim != 2:
+            raise ValueError("demand must be two dimensional")
+        demand = get_int_array(arrays, "demand", (num_days, given.shape[1]), 0)
+
+    unset = np.full((employees, num_days), -1, np.int64)
+    daily_min = unset
+    daily_max = unset
+    if "daily_min" in arrays:
+        daily_min = get_int_array(arrays, "daily_min", (employees, num_days))
+    if "daily_max" in arrays:
+        daily_max = get_int_array(arrays, "daily_max", (employees, num_days))
+    daily_set = (daily_min >= 0) | (daily_max >= 0)
+    # hard_max can't be greater than the day, nor hard_min than hard_max
+    daily_max = np.where(daily_max >= 0, daily_max, DAY_HARD_MAX)
+    daily_max = np.minimum(daily_max, hours[None, :])
+    daily_min = np.where(daily_min >= 0, daily_min, DAY_HARD_MIN)
+    daily_min = np.minimum(daily_min, daily_max)
+
+    weekly = np.full((employees, 4), -1, np.int64)
+    if "weekly" in arrays:
+        weekly = get_int_array(arrays, "weekly", (employees, 4))
+    weekly_set = (weekly >= 0).any(axis=1)
+    weekly = np.where(weekly >= 0, weekly, np.array(WEEKLY_DEFAULTS))
+    # hard_min can't be greater than hard_max
+    weekly[:, 0] = np.minimum(weekly[:, 0], weekly[:, 3])
+
+    return {
+        "employees": employees,
+        "hours": hours,
+        "minutes": minutes,
+        "demand": demand,
+        "daily_min": daily_min,
+        "daily_max": daily_max,
+        "daily_set": daily_set,
+        "weekly": weekly,
+        "weekly_set": weekly_set,
+    }
+
+
+def get_request_from_arrays(arrays: Dict):
+    """Keyword arguments of solve_shift_scheduling for a columnar request,
+    and its solver options as a dict.
+    """
+    normalized = normalize_arrays(arrays)
+    employees = normalized["employees"]
+    days = [
+        {"hours": h, "minutes": m}
+        for h, m in zip(normalized["hours"].tolist(), normalized["minutes"].tolist())
+    ]
+
+    constraints = [{"daily": {}} for _ in range(employees)]
+    for e, row in zip(
+        np.flatnonzero(normalized["weekly_set"]).tolist(),
+        normalized["weekly"][normalized["weekly_set"]].tolist(),
+    ):
+        constraints[e]["weekly"] = dict(zip(WEEKLY_KEYS, row))
+    daily_set = normalized["daily_set"]
+    for e, d, hard_min, hard_max in zip(
+        *(a.tolist() for a in np.nonzero(daily_set)),
+        normalized["daily_min"][daily_set].tolist(),
+        normalized["daily_max"][daily_set].tolist(),
+    ):
+        constraints[e]["daily"][str(d)] = {"hard_min": hard_min, "hard_max": hard_max}
+
+    demand = normalized["demand"]
+    booked = np.nonzero(demand)
+    customer_bookings = list(
+        zip(*(a.tolist() for a in booked), demand[booked].tolist())
+    )
+
+    options = None
+    if "solver" in arrays:
+        options = json.loads(str(arrays["solver"]))
+    request = {
+        "employees": employees,
+        "days": days,
+        "constraints": constraints,
+        "customer_bookings": customer_bookings,
+    }
+    return request, options
+
+
+def get_arrays_from_request(
+    employees: int, days, constraints, customer_bookings, **kwargs
+):
+    """Columnar form of the keyword arguments of solve_shift_scheduling, e.g.
+    to send a request as .npz. Personal daily defaults are written out for
+    every day.
+    """
+    hours = np.array([d["hours"] for d in days], np.int64)
+    demand = np.zeros((len(days), hours.max(initial=0)), np.int64)
+    for d, h, n in customer_bookings:
+        demand[d, h] = max(demand[d, h], n)
+    daily_min = np.full((employees, len(days)), -1, np.int64)
+    daily_max = np.full((employees, len(days)), -1, np.int64)
+    weekly = np.full((employees, 4), -1, np.int64)
+    for e in range(employees):
+        daily = constraints[e].get("daily") or {}
+        for d in range(len(days)):
+            ct = daily.get(str(d), daily.get("defaults"))
+            if ct is None:
+                continue
+            for bounds, key in ((daily_min, "hard_min"), (daily_max, "hard_max")):
+                if ct.get(key) is not None:
+                    bounds[e, d] = ct[key]
+        for k, key in enumerate(WEEKLY_KEYS):
+            value = (constraints[e].get("weekly") or {}).get(key)
+            if value is not None:
+                weekly[e, k] = value
+    return {
+        "hours": hours,
+        "minutes": np.array([d.get("minutes", 0) for d in days], np.int64),
+        "demand": demand,
+        "daily_min": daily_min,
+        "daily_max": daily_max,
+        "weekly": weekly,
+    }
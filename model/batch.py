@@ -0,0 +1,175 @@
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from .cache import ModelCache
+from .feasibility import check_request
+from .options import SolverOptions
+from .solver import solve_shift_scheduling
+
+# Cache of the worker processes, seeded with the compiled models of the
+# parent by _init_worker
+_cache = None
+
+
+def apply_delta(request: Dict, delta: Dict):
+    """Variant of a request, as keyword arguments of solve_shift_scheduling.
+    Args:
+      request: keyword arguments of solve_shift_scheduling of the base.
+      delta: changes to the base, all optional:
+        "employees": the new number of employees. Added employees without
+          constraints of their own get the default constraints.
+        "constraints": {employee index: constraints} replacing the
+          constraints of these employees.
+        "customer_bookings": (day, hour, bookings) tuples replacing the
+          bookings of these hours.
+        "booking_factor": {day: factor} multiplying the bookings of these
+          days, rounded up.
+        "hint", "stability": like solve_shift_scheduling.
+    Raises:
+      ValueError: if the number of employees isn't a positive integer or the
+        constraints are of employees outside of it.
+    """
+    variant = dict(request)
+    employees = delta.get("employees", request["employees"])
+    if not isinstance(employees, int) or employees < 1:
+        raise ValueError("employees must be a positive integer")
+    constraints = list(request["constraints"][:employees])
+    constraints += [{} for _ in range(employees - len(constraints))]
+    for e, employee_constraints in (delta.get("constraints") or {}).items():
+        if not str(e).isdigit() or int(e) >= employees:
+            raise ValueError("No employee %s among %i" % (e, employees))
+        constraints[int(e)] = employee_constraints
+
+    bookings = {(d, h): n for d, h, n in request["customer_bookings"]}
+    for d, h, n in delta.get("customer_bookings") or []:
+        bookings[d, h] = n
+    factors = {int(d): f for d, f in (delta.get("booking_factor") or {}).items()}
+    customer_bookings = [
+        (d, h, math.ceil(n * factors.get(d, 1))) for (d, h), n in bookings.items()
+    ]
+
+    variant["employees"] = employees
+    variant["constraints"] = constraints
+    variant["customer_bookings"] = customer_bookings
+    for key in ("hint", "stability"):
+        if key in delta:
+            variant[key] = delta[key]
+    return variant
+
+
+def _init_worker(models: Dict):
+    global _cache
+    _cache = ModelCache()
+    for key, compiled in models.items():
+        _cache.put_compiled(key, compiled)
+
+
+def _solve_scenario(name: str, request: Dict, options: SolverOptions):
+    return solve_scenario(name, request, options, _cache)
+
+
+def solve_scenario(
+    name: str,
+    request: Dict,
+    options: SolverOptions,
+    cache: Optional[ModelCache] = None,
+):
+    """Solves a single scenario of a batch.
+    Returns:
+      a dict with the name, success, res, objective and solve time in seconds
+      of the scenario. A scenario failing the feasibility checks isn't solved
+      and its res holds the "reasons".
+    """
+    start = time.perf_counter()
+    reasons = check_request(
+        request["employees"],
+        request["days"],
+        request["constraints"],
+        request["customer_bookings"],
+        request.get("skill_bookings"),
+    )
+    if reasons:
+        success, res, objective = False, {"reasons": reasons}, None
+    else:
+        success, res = solve_shift_scheduling(**request, options=options, cache=cache)
+        objective = res["termination"]["objective"] if success else None
+    return {
+        "name": name,
+        "success": success,
+        "res": res,
+        "objective": objective,
+        "time": time.perf_counter() - start,
+    }
+
+
+def solve_batch(
+    request: Dict,
+    deltas: List[Dict],
+    processes: Optional[int] = None,
+    options: Optional[SolverOptions] = None,
+):
+    """Solves a base request and variants of it (what-if scenarios).
+    The base is solved first, with all the search workers of options. The
+    variants built by apply_delta from every delta are then solved in
+    parallel worker processes, the search workers being shared between them.
+    Every worker starts with the compiled model of the base, so that variants
+    differing from it only by their bookings skip the model build, and the
+    schedule of the base hints the search of every variant without a hint
+    of its own.
+    Args:
+      request: keyword arguments of solve_shift_scheduling of the base.
+      deltas: changes of every variant, see apply_delta. An optional "name"
+        identifies the variant in the results.
+      processes: number of worker processes, by default as many as the
+        search workers of options allow, one per variant at most.
+    Returns:
+      a dict with the "base" result and the results of the "scenarios", in
+      the order of the deltas, as returned by solve_scenario.
+    """
+    if options is None:
+        options = SolverOptions()
+    cores = options.num_search_workers or os.cpu_count() or 1
+    processes = processes or max(1, min(len(deltas), cores))
+
+    cache = ModelCache()
+    base = solve_scenario("base", request, options, cache)
+    hint = base["res"]["days"] if base["success"] else None
+
+    variants = []
+    for k, delta in enumerate(deltas):
+        variant = apply_delta(request, delta)
+        if hint is not None and "hint" not in delta:
+            variant["hint"] = hint
+            variant["stability"] = 0
+        variants.append((delta.get("name", "scenario %i" % k), variant))
+
+    # The variants share the cores of the batch
+    scenario_options = replace(
+        options,
+        num_search_workers=max(1, cores // processes),
+        print_solutions=False,
+    )
+    if processes == 1 or len(variants) <= 1:
+        scenarios = [
+            solve_scenario(name, variant, scenario_options, cache)
+            for name, variant in variants
+        ]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            processes,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(dict(cache.models),),
+        ) as executor:
+            futures = [
+                executor.submit(_solve_scenario, name, variant, scenario_options)
+                for name, variant in variants
+            ]
+            scenarios = [f.result() for f in futures]
+    return {"base": base, "scenarios": scenarios}
@@ -0,0 +1,100 @@
+"""Lower bound of the objective, from a relaxation of the soft constraints.
+Every employee is relaxed on its own: the cheapest way to work a total of x
+hours over the week is found from the penalties of the daily shift lengths
+and of the weekly sum, ignoring which hours of the day are worked. The
+employees are then combined so that they work at least the total demand of
+the week. Any schedule pays at least this much, so a solution reaching it is
+optimal.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .constraints import (
+    get_daily_hour_constraints,
+    get_daily_max,
+    get_weekly_constraints_for_employee,
+)
+from .utils import get_hours
+
+
+def get_shift_costs(ct, hours: int):
+    """Penalty of every shift length of a day, inf for forbidden lengths.
+    Returns:
+      an array indexed by the length, 0 being a day off.
+    """
+    hard_min, soft_min, min_cost, soft_max, _, max_cost = ct
+    longest = get_daily_max(ct, hours)
+    lengths = np.arange(longest + 1)
+    costs = min_cost * np.maximum(0, soft_min - lengths) + max_cost * np.maximum(
+        0, lengths - soft_max
+    )
+    costs = costs.astype(float)
+    costs[1 : max(hard_min, 1)] = np.inf
+    costs[0] = 0
+    return costs
+
+
+def get_employee_costs(daily_cts, weekly_ct):
+    """Least penalty of an employee working every weekly total.
+    Returns:
+      an array indexed by the total hours, inf for unreachable totals.
+    """
+    costs = np.zeros(1)
+    for _, day, ct in daily_cts:
+        shifts = get_shift_costs(ct, get_hours(day))
+        # Min-plus convolution with the shift lengths of the day
+        combined = np.full(len(costs) + len(shifts) - 1, np.inf)
+        for length, cost in enumerate(shifts):
+            if np.isfinite(cost):
+                combined[length : length + len(costs)] = np.minimum(
+                    combined[length : length + len(costs)], costs + cost
+                )
+        costs = combined
+    hard_min, soft_min, min_cost, soft_max, hard_max, max_cost = weekly_ct
+    totals = np.arange(len(costs))
+    costs = (
+        costs
+        + min_cost * np.maximum(0, soft_min - totals)
+        + max_cost * np.maximum(0, totals - soft_max)
+    )
+    costs[(totals < hard_min) | (totals > hard_max)] = np.inf
+    return costs
+
+
+def get_lower_bound(
+    employees: int, days: List[Dict], constraints: List[Dict], demand: Dict
+) -> Optional[int]:
+    """Lower bound of the objective of a request.
+    Args:
+      demand: the number of employees needed on every (day, hour). The
+        (day, hour, skill) keys are left out, the demand of their hour
+        already covering them.
+    Returns:
+      the bound, or None if the relaxation is already infeasible.
+    """
+    needed = sum(n for key, n in demand.items() if len(key) == 2)
+    # least cost of the employees so far by hours worked, capped at needed
+    total = np.full(needed + 1, np.inf)
+    total[0] = 0
+    for e in range(employees):
+        costs = get_employee_costs(
+            get_daily_hour_constraints(constraints[e].get("daily"), days),
+            get_weekly_constraints_for_employee(constraints[e]),
+        )
+        combined = np.full(needed + 1, np.inf)
+        for hours, cost in enumerate(costs):
+            if not np.isfinite(cost):
+                continue
+            shifted = total + cost
+            if hours >= needed:
+                combined[needed] = min(combined[needed], shifted.min())
+                continue
+            combined[hours:] = np.minimum(
+                combined[hours:], shifted[: needed + 1 - hours]
+            )
+            combined[needed] = min(combined[needed], shifted[needed - hours :].min())
+        total = combined
+    if not np.isfinite(total[needed]):
+        return None
+    return int(total[needed])
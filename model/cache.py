@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+from .constraints import (
+    get_daily_hour_constraints,
+    get_employee_skills,
+    get_weekly_constraints_for_employee,
+)
+from .utils import get_hours
+
+# Default cache sizes
+MAX_RESULTS = 256
+MAX_MODELS = 32
+
+
+def canonical_request(
+    employees: int, days: List[Dict], constraints: List[Dict], demand, **options
+):
+    """Normal form of a scheduling request.
+    Constraints are replaced by the bound tuples they resolve to, so that
+    requests spelling the same constraints differently (missing keys, empty
+    dicts, per-day values equal to the defaults...) share the same form.
+    Bookings are replaced by the demand of every hour, and the booked
+    (day, hour, skill) cells, which get constraints of their own, are part of
+    the structure. Options are the keyword arguments changing how the model
+    is built.
+    """
+    daily = []
+    weekly = []
+    for e in range(employees):
+        employee_constraints = constraints[e]
+        cts = get_daily_hour_constraints(employee_constraints.get("daily"), days)
+        # A shift can't be longer than its day, whatever the hard_max
+        daily.append(
+            [
+                list(ct[:4]) + [min(ct[4], get_hours(day))] + list(ct[5:])
+                for _, day, ct in cts
+            ]
+        )
+        weekly.append(list(get_weekly_constraints_for_employee(employee_constraints)))
+    canonical = {
+        "employees": employees,
+        "hours": [get_hours(d) for d in days],
+        "daily": daily,
+        "weekly": weekly,
+        "demand": [
+            list(key) + [n]
+            for key, n in sorted(demand.items())
+            if len(key) == 3 or n != 1
+        ],
+        "options": options,
+    }
+    skills = [list(get_employee_skills(constraints[e])) for e in range(employees)]
+    if any(skills):
+        canonical["skills"] = skills
+    cells = sorted(list(key) for key in demand if len(key) == 3)
+    if cells:
+        canonical["skill_cells"] = cells
+    return canonical
+
+
+def _hash(obj):
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def request_hash(canonical: Dict):
+    """Key of the result of a request."""
+    return _hash(canonical)
+
+
+# Parts of a request not changing how the model is built
+RESULT_ONLY_KEYS = ("demand", "hint", "stability", "objectives", "preferences")
+
+
+def structure_hash(canonical: Dict):
+    """Key of the model of a request: everything except the bookings, the
+    previous schedule and the objectives added to the model once built.
+    """
+    return _hash({k: v for k, v in canonical.items() if k not in RESULT_ONLY_KEYS})
+
+
+def load_model(compiled: Dict):
+    """Rebuilds (model, work, coverage) from a cached model."""
+    model = cp_model.CpModel()
+    model.Proto().ParseFromString(compiled["proto"])
+    work = {
+        key: model.GetBoolVarFromProtoIndex(index)
+        for key, index in compiled["work"].items()
+    }
+    return model, work, dict(compiled["coverage"])
+
+
+class ModelCache:
+    """Bounded LRU cache of solved results and compiled models.
+    Models are kept as serialized protos together with the index of the work
+    variables and of the coverage constraints, so that a request differing
+    only by its bookings can skip the model build. If directory is given,
+    entries are also written there and survive restarts.
+    """
+
+    def __init__(
+        self,
+        max_results: int = MAX_RESULTS,
+        max_models: int = MAX_MODELS,
+        directory: Optional[str] = None,
+    ):
+        self.max_results = max_results
+        self.max_models = max_models
+        self.directory = directory
+        self.results = OrderedDict()
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_result(self, key: str):
+        return self._get(self.results, self.max_results, "result", key)
+
+    def put_result(self, key: str, res: Dict):
+        self._put(self.results, self.max_results, "result", key, res)
+
+    def get_model(self, key: str):
+        return self._get(self.models, self.max_models, "model", key)
+
+    def put_model(self, key: str, model, work: Dict, coverage: Dict):
+        compiled = {
+            "proto": model.Proto().SerializeToString(),
+            "work": {k: v.Index() for k, v in work.items()},
+            "coverage": coverage,
+        }
+        self.put_compiled(key, compiled)
+
+    def put_compiled(self, key: str, compiled: Dict):
+        """Adds a model compiled by put_model, e.g. by another cache."""
+        self._put(self.models, self.max_models, "model", key, compiled)
+
+    def _path(self, kind: str, key: str):
+        return os.path.join(self.directory, "%s-%s.pickle" % (kind, key))
+
+    def _get(self, entries: OrderedDict, size: int, kind: str, key: str):
+        with self.lock:
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(kind, key), "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            entries[key] = value
+            self._evict(entries, size)
+        return value
+
+    def _put(self, entries: OrderedDict, size: int, kind: str, key: str, value):
+        with self.lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            self._evict(entries, size)
+        if self.directory is not None:
+            # Write to a temporary file first so that readers never see a
+            # partially written entry
+            path = self._path(kind, key)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(value, f)
+            os.replace(path + ".tmp", path)
+
+    def _evict(self, entries: OrderedDict, size: int):
+        while len(entries) > size:
+            entries.popitem(last=False)
@@ -0,0 +1,157 @@
+"""Capture of solved models, to replay slow production requests offline.
+A capture is a directory holding the request as given to
+solve_shift_scheduling (request.json), the CpModel proto exactly as solved,
+hints included (model.pb), and the options, timings and outcome of the solve
+(meta.json). Solves are captured at random with sample_rate, or when they
+take at least slow_seconds. benchmarks/replay.py solves captures again.
+
+Setting SCHEDULE_CAPTURE_DIR captures the solves of every process, e.g. the
+job workers, with SCHEDULE_CAPTURE_RATE and SCHEDULE_CAPTURE_SLOW.
+"""
+import json
+import os
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from ortools.sat import cp_model_pb2
+
+from .logs import get_logger
+from .objectives import Objectives
+from .options import SolverOptions
+
+logger = get_logger(__name__)
+
+REQUEST_FILE = "request.json"
+MODEL_FILE = "model.pb"
+META_FILE = "meta.json"
+
+# Reasons a solve is captured
+SAMPLED = "sample"
+SLOW = "slow"
+
+
+class Capture:
+    """Writes captures of the solves picked by sampling or slowness."""
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        slow_seconds: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.random = random.Random(seed)
+
+    def get_trigger(self, seconds: float) -> Optional[str]:
+        """Reason to capture a solve which took seconds, None to skip it."""
+        if self.slow_seconds is not None and seconds >= self.slow_seconds:
+            return SLOW
+        if self.sample_rate > 0 and self.random.random() < self.sample_rate:
+            return SAMPLED
+        return None
+
+    def record(
+        self,
+        request: Dict,
+        model,
+        options: SolverOptions,
+        timings: Dict,
+        outcome: Dict,
+    ) -> Optional[str]:
+        """Captures a solve if it is picked.
+        Args:
+          request: the keyword arguments of solve_shift_scheduling.
+          model: the CpModel as solved.
+          timings: the seconds spent in the "build" and "solve" phases.
+          outcome: the status, reason and objective of the solve.
+        Returns:
+          the directory of the capture, None if it isn't picked.
+        """
+        trigger = self.get_trigger(sum(timings.values()))
+        if trigger is None:
+            return None
+        path = os.path.join(
+            self.directory,
+            "%s-%s" % (time.strftime("%Y%m%dT%H%M%S"), uuid.uuid4().hex[:8]),
+        )
+        try:
+            os.makedirs(path)
+            with open(os.path.join(path, REQUEST_FILE), "w") as f:
+                json.dump(request, f)
+            with open(os.path.join(path, MODEL_FILE), "wb") as f:
+                f.write(model.Proto().SerializeToString())
+            meta = {
+                "trigger": trigger,
+                "options": options.to_dict(),
+                "timings": timings,
+                "outcome": outcome,
+            }
+            with open(os.path.join(path, META_FILE), "w") as f:
+                json.dump(meta, f)
+        except OSError:
+            # A capture must never fail the solve it describes
+            logger.exception("capture", extra={"fields": {"path": path}})
+            return None
+        logger.info("capture", extra={"fields": {"path": path, "trigger": trigger}})
+        return path
+
+
+_default = None
+
+
+def get_default_capture() -> Optional[Capture]:
+    """Capture configured by the environment, None if SCHEDULE_CAPTURE_DIR
+    isn't set.
+    """
+    global _default
+    directory = os.environ.get("SCHEDULE_CAPTURE_DIR")
+    if not directory:
+        return None
+    if _default is None or _default.directory != directory:
+        slow = os.environ.get("SCHEDULE_CAPTURE_SLOW")
+        _default = Capture(
+            directory,
+            sample_rate=float(os.environ.get("SCHEDULE_CAPTURE_RATE", 0)),
+            slow_seconds=float(slow) if slow else None,
+        )
+    return _default
+
+
+def load_capture(path: str):
+    """Request, model proto and metadata of a capture.
+    Returns:
+      a tuple (request, proto, meta), request being the keyword arguments of
+      solve_shift_scheduling with the bookings as tuples and the objectives
+      as Objectives again.
+    """
+    with open(os.path.join(path, REQUEST_FILE)) as f:
+        request = json.load(f)
+    request["customer_bookings"] = [tuple(b) for b in request["customer_bookings"]]
+    if request.get("skill_bookings"):
+        request["skill_bookings"] = [tuple(b) for b in request["skill_bookings"]]
+    if request.get("objectives") is not None:
+        request["objectives"] = Objectives.from_dict(request["objectives"])
+    proto = cp_model_pb2.CpModelProto()
+    with open(os.path.join(path, MODEL_FILE), "rb") as f:
+        proto.ParseFromString(f.read())
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    return request, proto, meta
+
+
+def find_captures(paths: List[str]):
+    """Capture directories among paths and their subdirectories."""
+    captures = []
+    for path in paths:
+        if os.path.exists(os.path.join(path, MODEL_FILE)):
+            captures.append(path)
+            continue
+        for name in sorted(os.listdir(path)):
+            if os.path.exists(os.path.join(path, name, MODEL_FILE)):
+                captures.append(os.path.join(path, name))
+    return captures
@@ -1,4 +1,6 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
 
 from .utils import get_hours
 
@@ -24,8 +26,22 @@ Day = Dict[str, int]
 Constraint = Dict[str, int]
 
 
-def add_weekly_constraint(model, ct, totalHours, employee: int):
+def add_weekly_constraint(
+    model,
+    ct,
+    totalHours,
+    employee: int,
+    available: Optional[int] = None,
+    lean: bool = False,
+):
+    """Weekly hour constraints of an employee.
+    available is the most hours the daily constraints allow over the week,
+    which bounds the sum more tightly than hard_max if given. With lean,
+    totalHours are literal indexes and the variables are unnamed.
+    """
     hard_min, soft_min, min_cost, soft_max, hard_max, max_cost = ct
+    if available is not None:
+        hard_max = max(hard_min, min(hard_max, available))
     variables, coeffs = add_soft_sum_constraint(
         model,
         totalHours,
@@ -35,7 +51,7 @@ def add_weekly_constraint(model, ct, totalHours, employee: int):
         soft_max,
         hard_max,
         max_cost,
-        "weekly_sum_constraint(employee %i)" % employee,
+        None if lean else "weekly_sum_constraint(employee %i)" % employee,
     )
     return variables, coeffs
 
@@ -97,32 +113,47 @@ def add_soft_sum_constraint(
         hard_max.
       max_cost: the coefficient of the linear penalty if the sum is more than
         soft_max.
-      prefix: a base name for penalty variables.
+      prefix: a base name for penalty variables, None in the lean build mode,
+        where works are literal indexes and the variables are unnamed.
     Returns:
       a tuple (variables_list, coefficient_list) containing the different
       penalties created by the sequence constraint.
     """
     cost_variables = []
     cost_coefficients = []
-    sum_var = model.NewIntVar(hard_min, hard_max, "")
+    # The sum can't exceed the number of variables, but an unreachable
+    # hard_min is kept so that the model stays infeasible.
+    lower = max(hard_min, 0)
+    upper = max(lower, min(hard_max, len(works)))
+    sum_var = model.NewIntVar(lower, upper, "")
     # This adds the hard constraints on the sum.
-    model.Add(sum_var == sum(works))
+    if prefix is None:
+        add_linear(
+            model, list(works) + [sum_var.Index()], [-1] * len(works) + [1], 0, 0
+        )
+    else:
+        model.Add(sum_var == sum(works))
 
     # Penalize sums below the soft_min target.
-    if soft_min > hard_min and min_cost > 0:
-        delta = model.NewIntVar(-len(works), len(works), "")
+    if soft_min > lower and min_cost > 0:
+        delta = model.NewIntVar(soft_min - upper, soft_min - lower, "")
         model.Add(delta == soft_min - sum_var)
-        # TODO(user): Compare efficiency with only excess >= soft_min - sum_var.
-        excess = model.NewIntVar(0, 7, prefix + ": under_sum")
+        excess = model.NewIntVar(
+            max(0, soft_min - upper),
+            soft_min - lower,
+            get_name(prefix, ": under_sum"),
+        )
         model.AddMaxEquality(excess, [delta, 0])
         cost_variables.append(excess)
         cost_coefficients.append(min_cost)
 
     #  # Penalize sums above the soft_max target.
-    if soft_max < hard_max and max_cost > 0:
-        delta = model.NewIntVar(-len(works), len(works), "")
+    if soft_max < upper and max_cost > 0:
+        delta = model.NewIntVar(lower - soft_max, upper - soft_max, "")
         model.Add(delta == sum_var - soft_max)
-        excess = model.NewIntVar(0, 7, prefix + ": over_sum")
+        excess = model.NewIntVar(
+            max(0, lower - soft_max), upper - soft_max, get_name(prefix, ": over_sum")
+        )
         model.AddMaxEquality(excess, [delta, 0])
         cost_variables.append(excess)
         cost_coefficients.append(max_cost)
@@ -147,9 +178,15 @@ DEFAULT_DAY_CONSTRAINTS = (
     DAY_HARD_MAX,
     DAY_MAX_COST,
 )
+# Keys of the daily soft bounds of the constraints in slots written by
+# get_slot_constraints. Requests in hours always get the default soft bounds.
+SLOT_SOFT_MIN = "_slot_soft_min"
+SLOT_SOFT_MAX = "_slot_soft_max"
 
 
 def get_daily_hour_constraints(daily_constraints, days):
+    if daily_constraints is None:
+        daily_constraints = {}
     cts = []
     for d, day in enumerate(days):
         ct = daily_constraints.get(str(d))  # Day specific hour constraints
@@ -173,12 +210,14 @@ def get_daily_hour_constraints(daily_constraints, days):
             hard_max = (
                 hard_min if hard_max < hard_min else hard_max
             )  # hard max can't be smaller than hard min
+            soft_min = ct.get(SLOT_SOFT_MIN, DAY_SOFT_MIN)
+            soft_max = ct.get(SLOT_SOFT_MAX, DAY_SOFT_MAX)
             # (hard_min, soft_min, min_cost, soft_max, hard_max, max_cost)
             daily_hour_constraints = (
                 hard_min,
-                DAY_SOFT_MIN,
+                soft_min,
                 DAY_MIN_COST,
-                DAY_SOFT_MAX,
+                soft_max,
                 hard_max,
                 DAY_MAX_COST,
             )
@@ -186,7 +225,10 @@ def get_daily_hour_constraints(daily_constraints, days):
     return cts
 
 
-def add_daily_hour_constraints(model, works, ct, employee, d):
+def add_daily_hour_constraints(model, works, ct, employee, d, lean=False):
+    """Daily hour constraints of an employee on day d. With lean, works are
+    literal indexes and the variables are unnamed.
+    """
     hard_min, soft_min, min_cost, soft_max, hard_max, max_cost = ct
     variables, coeffs = add_soft_sequence_constraint(
         model,
@@ -197,17 +239,129 @@ def add_daily_hour_constraints(model, works, ct, employee, d):
         soft_max,
         hard_max,
         max_cost,
-        "shift_constraint(employee %i, day %i)" % (employee, d),
+        None if lean else "shift_constraint(employee %i, day %i)" % (employee, d),
     )
     return variables, coeffs
 
 
+def add_daily_shift_constraints(model, works, ct, employee, d, lean=False):
+    """Daily hour constraints on a single shift given by its start and length.
+    Alternative to add_daily_hour_constraints which doesn't enumerate the
+    spans of the day: the shift of the employee is the block of hours
+    [start, start + length), present if length > 0, and the soft bounds are
+    penalized on the length directly. The block is contiguous by construction,
+    so no separate no gaps constraint is needed. With lean, the variables
+    are unnamed.
+    Returns:
+      a tuple (variables_list, coefficient_list) containing the integer
+      penalties on the shift length.
+    """
+    hard_min, soft_min, min_cost, soft_max, hard_max, max_cost = ct
+    hours = len(works)
+    hard_max = min(hard_max, hours)
+    prefix = None if lean else "shift(employee %i, day %i)" % (employee, d)
+
+    start = model.NewIntVar(0, hours, get_name(prefix, ": start"))
+    if max(hard_min, 1) <= hard_max:
+        domain = cp_model.Domain.FromIntervals([[0], [max(hard_min, 1), hard_max]])
+    else:
+        domain = cp_model.Domain(0, 0)
+    length = model.NewIntVarFromDomain(domain, get_name(prefix, ": length"))
+    present = model.NewBoolVar(get_name(prefix, ": present"))
+    model.Add(length > 0).OnlyEnforceIf(present)
+    model.Add(length == 0).OnlyEnforceIf(present.Not())
+    model.Add(start + length <= hours)
+
+    # Exactly the hours of [start, start + length) are worked
+    model.Add(sum(works) == length)
+    for h, work in enumerate(works):
+        model.Add(start <= h).OnlyEnforceIf(work)
+        model.Add(start + length > h).OnlyEnforceIf(work)
+
+    cost_variables = []
+    cost_coefficients = []
+
+    # Penalize shifts shorter than the soft limit.
+    if min_cost > 0 and soft_min > max(hard_min, 1):
+        under = model.NewIntVar(
+            0, soft_min - max(hard_min, 1), get_name(prefix, ": under")
+        )
+        model.Add(under >= soft_min - length).OnlyEnforceIf(present)
+        cost_variables.append(under)
+        cost_coefficients.append(min_cost)
+
+    # Penalize shifts longer than the soft limit.
+    if max_cost > 0 and soft_max < hard_max:
+        over = model.NewIntVar(0, hard_max - soft_max, get_name(prefix, ": over"))
+        model.Add(over >= length - soft_max)
+        cost_variables.append(over)
+        cost_coefficients.append(max_cost)
+
+    return cost_variables, cost_coefficients
+
+
+def get_daily_max(ct, hours: int):
+    """Longest shift allowed by daily hour constraints, 0 for a day off."""
+    hard_min, _, _, _, hard_max, _ = ct
+    hard_max = min(hard_max, hours)
+    return hard_max if max(hard_min, 1) <= hard_max else 0
+
+
+def get_employee_skills(employee_constraints):
+    """Skills of an employee, e.g. ("LPN", "RN"), from the optional "skills"
+    list of their constraints.
+    """
+    return tuple(sorted(set(employee_constraints.get("skills") or ())))
+
+
+def get_identical_employees(constraints: List[Dict], days: List[Day]):
+    """Groups of employees with the same constraints and skills.
+    Constraints are compared by the bounds they resolve to, so that spelling
+    them differently doesn't matter. The employees of a group are
+    interchangeable in any schedule.
+    Returns:
+      a list of groups of at least two employee indexes, in increasing order.
+    """
+    groups = {}
+    for e, employee_constraints in enumerate(constraints):
+        cts = get_daily_hour_constraints(employee_constraints.get("daily"), days)
+        key = (
+            get_weekly_constraints_for_employee(employee_constraints),
+            tuple(
+                ct[:4] + (min(ct[4], get_hours(day)),) + ct[5:] for _, day, ct in cts
+            ),
+            get_employee_skills(employee_constraints),
+        )
+        groups.setdefault(key, []).append(e)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def add_lexicographic_constraint(model, first, second):
+    """Forces the Boolean variables of first to be lexicographically greater
+    than or equal to the ones of second, e.g. to break the symmetry between
+    the schedules of two interchangeable employees.
+    equal is true while the variables of both lists seen so far are equal.
+    """
+    equal = model.NewConstant(1)
+    for k, (x, y) in enumerate(zip(first, second)):
+        # While equal so far, x >= y
+        model.AddBoolOr([equal.Not(), y.Not(), x])
+        if k == len(first) - 1:
+            break
+        following = model.NewBoolVar("")
+        # Still equal if both are false or both are true
+        model.AddBoolOr([equal.Not(), x, following])
+        model.AddBoolOr([equal.Not(), x.Not(), y.Not(), following])
+        equal = following
+
+
 def get_daily_hour_variables_for_employee(work, employee, dayIndex, hours):
     return [work[employee, dayIndex, h] for h in range(hours)]
 
 
 def negated_bounded_span(works, start, length):
     """Filters an isolated sub-sequence of variables assined to True.
+    works may be variables or literal indexes, see negate.
     Extract the span of Boolean variables [start, start + length), negate them,
     and if there is variables to the left/right of this span, surround the span by
     them in non negated form.
@@ -225,7 +379,7 @@ def negated_bounded_span(works, start, length):
     if start > 0:
         sequence.append(works[start - 1])
     for i in range(length):
-        sequence.append(works[start + i].Not())
+        sequence.append(negate(works[start + i]))
     # Right border (end of works or works[start + length])
     if start + length < len(works):
         sequence.append(works[start + length])
@@ -246,27 +400,35 @@ def add_soft_sequence_constraint(
         hard_min.
       hard_max: any sequence of true variables must have a length of at most
         hard_max.
+      prefix: a base name for penalty variables, None in the lean build mode,
+        where works are literal indexes and the variables are unnamed.
     Returns:
       a tuple (variables_list, coefficient_list) containing the different
       penalties created by the sequence constraint.
     """
+    lean = prefix is None
     cost_literals = []
     cost_coefficients = []
 
     # Forbid sequences that are too short.
     for length in range(1, hard_min):
         for start in range(len(works) - length + 1):
-            model.AddBoolOr(negated_bounded_span(works, start, length))
+            add_clause(model, negated_bounded_span(works, start, length), lean)
 
     # Penalize sequences that are below the soft limit.
     if min_cost > 0:
-        for length in range(hard_min, soft_min):
+        # Spans of length 0 are days off, not short shifts
+        for length in range(max(hard_min, 1), soft_min):
             for start in range(len(works) - length + 1):
                 span = negated_bounded_span(works, start, length)
-                name = ": under_span(start=%i, length=%i)" % (start, length)
-                lit = model.NewBoolVar(prefix + name)
-                span.append(lit)
-                model.AddBoolOr(span)
+                if lean:
+                    lit = model.NewBoolVar("")
+                    span.append(lit.Index())
+                else:
+                    name = ": under_span(start=%i, length=%i)" % (start, length)
+                    lit = model.NewBoolVar(prefix + name)
+                    span.append(lit)
+                add_clause(model, span, lean)
                 cost_literals.append(lit)
                 # We filter exactly the sequence with a short length.
                 # The penalty is proportional to the delta with soft_min.
@@ -277,16 +439,61 @@ def add_soft_sequence_constraint(
         for length in range(soft_max + 1, hard_max + 1):
             for start in range(len(works) - length + 1):
                 span = negated_bounded_span(works, start, length)
-                name = ": over_span(start=%i, length=%i)" % (start, length)
-                lit = model.NewBoolVar(prefix + name)
-                span.append(lit)
-                model.AddBoolOr(span)
+                if lean:
+                    lit = model.NewBoolVar("")
+                    span.append(lit.Index())
+                else:
+                    name = ": over_span(start=%i, length=%i)" % (start, length)
+                    lit = model.NewBoolVar(prefix + name)
+                    span.append(lit)
+                add_clause(model, span, lean)
                 cost_literals.append(lit)
                 # Cost paid is max_cost * excess length.
                 cost_coefficients.append(max_cost * (length - soft_max))
 
     # Just forbid any sequence of true variables with length hard_max + 1
     for start in range(len(works) - hard_max):
-        model.AddBoolOr([works[i].Not() for i in range(start, start + hard_max + 1)])
+        add_clause(
+            model, [negate(works[i]) for i in range(start, start + hard_max + 1)], lean
+        )
 
     return cost_literals, cost_coefficients
+
+
+# LEAN BUILD MODE
+# Large models are built from literal indexes, the index of a Boolean variable
+# in the proto or -index - 1 for its negation, written to the proto directly
+# rather than through the wrappers of cp_model.
+
+
+def negate(literal):
+    """Negation of a Boolean variable, or of a literal index."""
+    if isinstance(literal, int):
+        return -literal - 1
+    return literal.Not()
+
+
+def get_name(prefix: Optional[str], name: str):
+    """Name of a variable, empty in the lean build mode (prefix None)."""
+    return "" if prefix is None else prefix + name
+
+
+def add_clause(model, literals, lean: bool = False):
+    """Adds the disjunction of literals, literal indexes if lean."""
+    if lean:
+        model.Proto().constraints.add().bool_or.literals.extend(literals)
+    else:
+        model.AddBoolOr(literals)
+
+
+def add_linear(model, literals: List[int], coeffs: List[int], lower, upper=None):
+    """Adds lower <= sum(coeffs * literals) <= upper over literal indexes.
+    Returns:
+      the index of the constraint, like Constraint.Index().
+    """
+    index = len(model.Proto().constraints)
+    linear = model.Proto().constraints.add().linear
+    linear.vars.extend(literals)
+    linear.coeffs.extend(coeffs)
+    linear.domain.extend([lower, cp_model.INT_MAX if upper is None else upper])
+    return index
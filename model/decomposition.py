@@ -0,0 +1,256 @@
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from .constraints import get_weekly_constraints_for_employee
+from .options import SolverOptions
+from .schedule import get_schedule, get_solution_matrix, get_work_index
+from .solver import build_model, get_demand, solve_shift_scheduling
+from .utils import get_hours
+
+# Default decomposition
+WINDOW = 7
+POLISH_ITERATIONS = 0
+POLISH_TIME_LIMIT = 2
+# Share of the days relaxed by every polishing iteration
+POLISH_DAYS = 0.3
+
+
+def apportion(total: int, weights: List[int]):
+    """Splits total into integers proportional to weights, summing to total.
+    The remainder goes to the largest fractional parts (largest remainder
+    method).
+    """
+    weight = sum(weights)
+    if weight == 0:
+        return [0] * len(weights)
+    exact = [total * w / weight for w in weights]
+    parts = [int(x) for x in exact]
+    remainders = sorted(
+        range(len(weights)), key=lambda k: exact[k] - parts[k], reverse=True
+    )
+    for k in remainders[: total - sum(parts)]:
+        parts[k] += 1
+    return parts
+
+
+def get_windows(days: List[Dict], window: int):
+    """Consecutive blocks of at most window days, as lists of day indexes."""
+    return [
+        list(range(i, min(i + window, len(days)))) for i in range(0, len(days), window)
+    ]
+
+
+def get_groups(constraints: List[Dict], group_by: Optional[str]):
+    """Employees grouped by the value of the group_by key of their
+    constraints (e.g. a ward or a skill), all together if group_by is None.
+    """
+    if group_by is None:
+        return [list(range(len(constraints)))]
+    groups = {}
+    for e, employee_constraints in enumerate(constraints):
+        groups.setdefault(str(employee_constraints.get(group_by)), []).append(e)
+    return [groups[key] for key in sorted(groups)]
+
+
+def get_parts(employees, days, constraints, demand, windows, groups):
+    """Subproblems of every window and group of employees.
+    Weekly bounds are apportioned over the windows by their number of hours,
+    so that the bounds of the parts of an employee add up to their own.
+    The demand of every hour is apportioned over the groups by their size.
+    """
+    hours = [sum(get_hours(days[i]) for i in w) for w in windows]
+    weekly = {}
+    for e in range(employees):
+        # (hard_min, soft_min, min_cost, soft_max, hard_max, max_cost)
+        ct = get_weekly_constraints_for_employee(constraints[e])
+        bounds = [apportion(ct[k], hours) for k in (0, 1, 3, 4)]
+        weekly[e] = [
+            {
+                "hard_min": bounds[0][w],
+                "soft_min": bounds[1][w],
+                "soft_max": bounds[2][w],
+                "hard_max": bounds[3][w],
+            }
+            for w in range(len(windows))
+        ]
+
+    group_demand = {}
+    sizes = [len(g) for g in groups]
+    for (i, h), n in demand.items():
+        # Rotate the groups hour by hour, so that the rounding doesn't always
+        # favour the same group
+        shift = (i * 24 + h) % len(groups)
+        order = list(range(shift, len(groups))) + list(range(shift))
+        shares = apportion(n, [sizes[g] for g in order])
+        for g, share in zip(order, shares):
+            group_demand[g, i, h] = share
+
+    parts = []
+    for w, window in enumerate(windows):
+        for g, group in enumerate(groups):
+            part_constraints = []
+            for e in group:
+                daily = constraints[e].get("daily") or {}
+                part_daily = {}
+                if "defaults" in daily:
+                    part_daily["defaults"] = daily["defaults"]
+                for k, i in enumerate(window):
+                    if str(i) in daily:
+                        part_daily[str(k)] = daily[str(i)]
+                part_constraints.append({"weekly": weekly[e][w], "daily": part_daily})
+            parts.append(
+                {
+                    "employees": group,
+                    "days": window,
+                    "arguments": {
+                        "employees": len(group),
+                        "days": [days[i] for i in window],
+                        "constraints": part_constraints,
+                        "demand": {
+                            (k, h): group_demand[g, i, h]
+                            for k, i in enumerate(window)
+                            for h in range(get_hours(days[i]))
+                        },
+                    },
+                }
+            )
+    return parts
+
+
+def solve_part(arguments: Dict, options: SolverOptions):
+    """Solves a subproblem, returning its solution matrix or None."""
+    model, work, _ = build_model(
+        arguments["employees"],
+        arguments["days"],
+        arguments["constraints"],
+        arguments["demand"],
+    )
+    solver = cp_model.CpSolver()
+    with options.applied(solver):
+        status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    index = get_work_index(work, arguments["employees"], arguments["days"])
+    return get_solution_matrix(solver.ResponseProto().solution, index)
+
+
+def polish(model, index, matrix, iterations: int, options: SolverOptions):
+    """Large neighbourhood search on the full model.
+    Every iteration frees the work variables of a random block of days and
+    keeps the others fixed to the current solution, which is replaced if the
+    objective improves.
+    Returns:
+      a tuple (matrix, objective) of the best solution found.
+    """
+    rng = random.Random(options.random_seed or 0)
+    num_days = index.shape[1]
+    current, objective = fix_and_solve(model, index, matrix, [], options)
+    if current is None:
+        return matrix, None
+    for _ in range(iterations):
+        length = max(1, int(num_days * POLISH_DAYS))
+        start = rng.randrange(0, num_days - length + 1)
+        free = list(range(start, start + length))
+        candidate, value = fix_and_solve(model, index, current, free, options)
+        if candidate is not None and value < objective:
+            current, objective = candidate, value
+    return current, objective
+
+
+def fix_and_solve(model, index, matrix, free_days: List[int], options: SolverOptions):
+    """Solves model with the work variables outside of free_days fixed to
+    matrix, and the free ones hinted from it.
+    """
+    neighbourhood = cp_model.CpModel()
+    neighbourhood.Proto().CopyFrom(model.Proto())
+    proto = neighbourhood.Proto()
+    for (e, i, h), var_index in np.ndenumerate(index):
+        if var_index < 0:
+            continue
+        value = int(matrix[e, i, h])
+        if i in free_days:
+            proto.solution_hint.vars.append(int(var_index))
+            proto.solution_hint.values.append(value)
+        else:
+            proto.variables[var_index].domain[:] = [value, value]
+    solver = cp_model.CpSolver()
+    with options.applied(solver):
+        status = solver.Solve(neighbourhood)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, None
+    solution = get_solution_matrix(solver.ResponseProto().solution, index)
+    return solution, solver.ObjectiveValue()
+
+
+def solve_decomposed(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    window: int = WINDOW,
+    group_by: Optional[str] = None,
+    processes: Optional[int] = None,
+    polish_iterations: int = POLISH_ITERATIONS,
+    polish_time_limit: float = POLISH_TIME_LIMIT,
+    options: Optional[SolverOptions] = None,
+):
+    """Solves the shift scheduling problem by parts.
+    The horizon is split into windows of window days, and the employees into
+    groups by the group_by key of their constraints. Every (window, group)
+    part is solved on its own, in parallel worker processes, with the weekly
+    bounds and the demand apportioned so that the stitched schedule satisfies
+    the bounds of the whole horizon. The stitched schedule then goes through
+    polish_iterations of large neighbourhood search on the full model.
+    If a part has no solution, the full model is solved instead.
+    Returns:
+      a tuple (solution_found, res) like solve_shift_scheduling.
+    """
+    if options is None:
+        options = SolverOptions()
+    processes = processes or max(1, options.num_search_workers)
+    demand = get_demand(days, customer_bookings)
+    windows = get_windows(days, window)
+    groups = get_groups(constraints[:employees], group_by)
+    parts = get_parts(employees, days, constraints, demand, windows, groups)
+
+    # Every part runs on a single core, the parallelism comes from the parts
+    part_options = replace(options, num_search_workers=1, print_solutions=False)
+    if processes == 1 or len(parts) == 1:
+        matrices = [solve_part(p["arguments"], part_options) for p in parts]
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(processes, mp_context=context) as executor:
+            futures = [
+                executor.submit(solve_part, p["arguments"], part_options) for p in parts
+            ]
+            matrices = [f.result() for f in futures]
+
+    if any(m is None for m in matrices):
+        return solve_shift_scheduling(
+            employees, days, constraints, customer_bookings, options=options
+        )
+
+    # Stitch the parts together
+    hours = max(get_hours(d) for d in days)
+    matrix = np.zeros((employees, len(days), hours), dtype=np.int8)
+    for part, part_matrix in zip(parts, matrices):
+        rows = np.array(part["employees"])[:, None]
+        matrix[rows, part["days"], : part_matrix.shape[2]] = part_matrix
+
+    if polish_iterations > 0:
+        # The stitched schedule doesn't follow the symmetry breaking order
+        model, work, _ = build_model(
+            employees, days, constraints, demand, symmetry=False
+        )
+        index = get_work_index(work, employees, days)
+        polish_options = replace(
+            options, time_limit=polish_time_limit, num_search_workers=processes
+        )
+        matrix, _ = polish(model, index, matrix, polish_iterations, polish_options)
+    return (True, get_schedule(matrix))
@@ -0,0 +1,252 @@
+"""Greedy draft schedules, in milliseconds instead of a CP-SAT search.
+The deficit of every hour is kept in NumPy arrays. The most understaffed hour
+(of a skill first) is repeatedly given a shift of an employee free that day,
+the one furthest from their weekly soft_min, placed where it covers the most
+deficit. Shifts are single blocks of hours within the daily hard bounds, so
+that the no gaps rule holds, and the weekly hard_max is never exceeded. Weekly
+hours under the soft_min are then topped up by lengthening or adding shifts.
+
+A draft may miss an hour the solver would cover, and isn't optimal: it is an
+instant answer and a hint for the solver, not a replacement.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import metrics
+from .bounds import get_shift_costs
+from .constraints import (
+    get_daily_hour_constraints,
+    get_daily_max,
+    get_employee_skills,
+    get_weekly_constraints_for_employee,
+)
+from .schedule import get_schedule
+from .slots import HOUR, get_slot_bookings, get_slot_request
+from .solver import get_demand
+from .utils import get_hours
+
+# Reason of the termination of a draft, next to the STOP_* of the solver
+STOP_DRAFT = "draft"
+
+
+class Draft:
+    """Schedule built by get_draft, as an (employees, days, hours) matrix."""
+
+    def __init__(self, employees: int, days: List[Dict], constraints: List[Dict]):
+        self.hours = np.array([get_hours(d) for d in days], dtype=np.int64)
+        self.matrix = np.zeros(
+            (employees, len(days), max(self.hours, default=0)), dtype=np.int8
+        )
+        self.cts = [
+            [ct for _, _, ct in get_daily_hour_constraints(c.get("daily"), days)]
+            for c in constraints[:employees]
+        ]
+        self.weekly = np.array(
+            [get_weekly_constraints_for_employee(c) for c in constraints[:employees]],
+            dtype=np.int64,
+        ).reshape(employees, 6)
+        self.skills = [get_employee_skills(c) for c in constraints[:employees]]
+        # Shortest and longest shift of every employee on every day, 0 if off
+        self.longest = np.array(
+            [
+                [get_daily_max(ct, hours) for ct, hours in zip(cts, self.hours)]
+                for cts in self.cts
+            ],
+            dtype=np.int64,
+        ).reshape(employees, len(days))
+        self.shortest = np.array(
+            [[max(ct[0], 1) for ct in cts] for cts in self.cts], dtype=np.int64
+        ).reshape(employees, len(days))
+        self.shortest = np.minimum(self.shortest, self.longest)
+        # Preferred length: the daily soft_max within the hard bounds
+        self.preferred = np.array(
+            [[ct[3] for ct in cts] for cts in self.cts], dtype=np.int64
+        ).reshape(employees, len(days))
+        self.preferred = np.clip(self.preferred, self.shortest, self.longest)
+
+    def get_worked(self):
+        return self.matrix.sum(axis=(1, 2), dtype=np.int64)
+
+    def get_cost(self):
+        """Objective of the draft in the model of solve_shift_scheduling."""
+        lengths = self.matrix.sum(axis=2, dtype=np.int64)
+        cost = 0
+        for e, cts in enumerate(self.cts):
+            for d, ct in enumerate(cts):
+                if lengths[e, d]:
+                    cost += get_shift_costs(ct, int(self.hours[d]))[lengths[e, d]]
+        worked = self.get_worked()
+        hard_min, soft_min, min_cost, soft_max, hard_max, max_cost = self.weekly.T
+        cost += (min_cost * np.maximum(0, soft_min - worked)).sum()
+        cost += (max_cost * np.maximum(0, worked - soft_max)).sum()
+        return int(cost)
+
+
+def get_deficits(draft: Draft, demand: Dict):
+    """Arrays of the demand of every (day, hour), and of every skill."""
+    shape = draft.matrix.shape[1:]
+    need = np.zeros(shape, dtype=np.int64)
+    skill_need = {}
+    for key, n in demand.items():
+        if len(key) == 2:
+            need[key] = n
+        else:
+            d, h, skill = key
+            skill_need.setdefault(skill, np.zeros(shape, dtype=np.int64))[d, h] = n
+    qualified = {
+        skill: np.array([skill in s for s in draft.skills], dtype=bool)
+        for skill in skill_need
+    }
+    return need, skill_need, qualified
+
+
+def place_shift(deficit, hour: int, length: int, hours: int):
+    """Start of the shift of length covering hour with the most deficit."""
+    first = max(0, hour - length + 1)
+    last = min(hour, hours - length)
+    sums = np.concatenate(([0], np.cumsum(np.maximum(deficit[:hours], 0))))
+    starts = np.arange(first, last + 1)
+    covered = sums[starts + length] - sums[starts]
+    return int(starts[np.argmax(covered)])
+
+
+def add_shift(draft: Draft, e: int, d: int, hour: int, deficit) -> bool:
+    """Gives employee e a shift on day d covering hour, or lengthens the
+    shift they already have. Returns False if no such shift fits their
+    daily and weekly hard bounds.
+    """
+    row = draft.matrix[e, d]
+    left = int(draft.weekly[e, 4] - draft.get_worked()[e])
+    worked = np.flatnonzero(row)
+    if len(worked):
+        start, end = min(worked[0], hour), max(worked[-1] + 1, hour + 1)
+        added = end - start - len(worked)
+        if end - start > draft.longest[e, d] or added > left:
+            return False
+        row[start:end] = 1
+        return True
+    length = min(int(draft.preferred[e, d]), left)
+    if draft.longest[e, d] == 0 or length < draft.shortest[e, d]:
+        return False
+    start = place_shift(deficit, hour, length, int(draft.hours[d]))
+    row[start : start + length] = 1
+    return True
+
+
+def get_candidates(draft: Draft, d: int, mask):
+    """Employees of mask in the order to be given a shift on day d: free
+    that day first, then by the hours they lack to their weekly soft_min.
+    """
+    worked = draft.get_worked()
+    busy = draft.matrix[:, d].any(axis=1)
+    lacking = draft.weekly[:, 1] - worked
+    order = np.lexsort((worked, -lacking, busy))
+    return [int(e) for e in order if mask[e] and draft.longest[e, d] > 0]
+
+
+def cover(draft: Draft, need, skill_need: Dict, qualified: Dict):
+    """Covers the demand greedily, the skills first.
+    Returns:
+      the (day, hour) or (day, hour, skill) cells left short.
+    """
+    everyone = np.ones(draft.matrix.shape[0], dtype=bool)
+    short = []
+    for skill in sorted(skill_need) + [None]:
+        if skill is None:
+            target, mask = need, everyone
+        else:
+            target, mask = skill_need[skill], qualified[skill]
+        blocked = np.zeros(target.shape, dtype=bool)
+        while True:
+            deficit = target - draft.matrix[mask].sum(axis=0, dtype=np.int64)
+            deficit[blocked] = 0
+            d, h = np.unravel_index(np.argmax(deficit), deficit.shape)
+            if deficit[d, h] <= 0:
+                break
+            if not any(
+                add_shift(draft, e, d, h, deficit[d])
+                for e in get_candidates(draft, d, mask & (draft.matrix[:, d, h] == 0))
+            ):
+                blocked[d, h] = True
+                short.append((int(d), int(h)) + (() if skill is None else (skill,)))
+    return short
+
+
+def top_up(draft: Draft):
+    """Lengthens or adds shifts of the employees under their weekly soft_min,
+    without lengthening a shift past its preferred length unless the weekly
+    hard_min needs it. Returns the employees still under their hard_min.
+    """
+    short = []
+    for e in range(draft.matrix.shape[0]):
+        while draft.get_worked()[e] < draft.weekly[e, 1]:
+            needed = draft.get_worked()[e] < draft.weekly[e, 0]
+            if not any(
+                add_shift(draft, e, d, h, np.zeros(draft.matrix.shape[2]))
+                for d in np.argsort(draft.matrix[e].sum(axis=1), kind="stable")
+                for h in get_extensions(draft, e, d, needed)
+            ):
+                break
+        if draft.get_worked()[e] < draft.weekly[e, 0]:
+            short.append(e)
+    return short
+
+
+def get_extensions(draft: Draft, e: int, d: int, needed: bool = True):
+    """Hours adding to the shift of employee e on day d, or starting one.
+    Unless needed, a shift isn't lengthened past its preferred length.
+    """
+    worked = np.flatnonzero(draft.matrix[e, d])
+    if len(worked) == 0:
+        return [0] if draft.longest[e, d] > 0 else []
+    if not needed and len(worked) >= draft.preferred[e, d]:
+        return []
+    return [h for h in (worked[-1] + 1, worked[0] - 1) if 0 <= h < draft.hours[d]]
+
+
+def get_draft(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    skill_bookings: Optional[List[tuple[int, int, int, str]]] = None,
+    slot_minutes: int = HOUR,
+):
+    """Draft schedule of a request, built greedily without a solver.
+    Takes the request of solve_shift_scheduling.
+    Returns:
+      a tuple (success, res) like solve_shift_scheduling, res having a
+      "termination" with the reason "draft" and the objective of the draft.
+      Without success, res has a "message" and the "short" cells and
+      employees the draft couldn't satisfy.
+    """
+    if slot_minutes != HOUR:
+        days, constraints, customer_bookings = get_slot_request(
+            employees, days, constraints, customer_bookings, slot_minutes
+        )
+        if skill_bookings:
+            skill_bookings = get_slot_bookings(skill_bookings, slot_minutes)
+    with metrics.timer("schedule_phase_seconds", phase="draft"):
+        demand = get_demand(days, customer_bookings, skill_bookings)
+        draft = Draft(employees, days, constraints)
+        need, skill_need, qualified = get_deficits(draft, demand)
+        cells = cover(draft, need, skill_need, qualified)
+        weekly = top_up(draft)
+    if cells or weekly:
+        return (
+            False,
+            {
+                "message": "The draft leaves %i hours and %i employees short"
+                % (len(cells), len(weekly)),
+                "short": {"hours": cells, "employees": weekly},
+            },
+        )
+    res = get_schedule(draft.matrix, slot_minutes)
+    res["termination"] = {
+        "reason": STOP_DRAFT,
+        "objective": draft.get_cost(),
+        "bound": None,
+        "lower_bound": None,
+    }
+    return (True, res)
@@ -0,0 +1,277 @@
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+from .constraints import (
+    get_daily_hour_constraints,
+    get_daily_max,
+    get_employee_skills,
+    get_weekly_constraints_for_employee,
+    negated_bounded_span,
+)
+from .utils import get_hours
+
+# Time limit of the search for conflicting constraints, in seconds
+DIAGNOSIS_TIME_LIMIT = 5
+
+
+def check_request(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    skill_bookings: Optional[List[tuple[int, int, int, str]]] = None,
+):
+    """Cheap necessary conditions for a request to be feasible.
+    Doesn't build any model: the bounds of every employee and hour are
+    compared analytically. Skill bookings are checked like bookings, against
+    the employees having the skill, and their reasons name the "skill".
+    Returns:
+      a list of reasons, empty if no problem was found. Every reason is a dict
+      with a "reason" code, a "message" and the employee, day or hour involved.
+    """
+    reasons = []
+    if not isinstance(employees, int) or employees < 1:
+        return [{"reason": "no_employees", "message": "There are no employees"}]
+    if constraints is None or len(constraints) < employees:
+        return [
+            {
+                "reason": "missing_constraints",
+                "message": "There are %i employees but constraints for %i"
+                % (employees, 0 if constraints is None else len(constraints)),
+            }
+        ]
+    hours = []
+    for i, day in enumerate(days or []):
+        hours_of_day = day.get("hours") if isinstance(day, dict) else None
+        if not isinstance(hours_of_day, int) or hours_of_day < 0:
+            reasons.append(
+                {
+                    "reason": "invalid_day",
+                    "day": i,
+                    "message": "Day %i has no hours" % i,
+                }
+            )
+            hours_of_day = 0
+        hours.append(hours_of_day)
+    if not days:
+        reasons.append({"reason": "no_days", "message": "There are no days"})
+    if reasons:
+        return reasons
+
+    # Longest shift of every employee on every day
+    daily_max = []
+    for e in range(employees):
+        cts = get_daily_hour_constraints(constraints[e].get("daily") or {}, days)
+        daily_max.append([get_daily_max(ct, hours[d]) for d, _, ct in cts])
+
+    for e in range(employees):
+        hard_min, _, _, _, hard_max, _ = get_weekly_constraints_for_employee(
+            constraints[e]
+        )
+        available = sum(daily_max[e])
+        if hard_min > available:
+            reasons.append(
+                {
+                    "reason": "weekly_hard_min",
+                    "employee": e,
+                    "message": "Employee %i must work at least %i hours but the "
+                    "daily limits allow at most %i" % (e, hard_min, available),
+                }
+            )
+
+    for i in range(len(days)):
+        available = sum(1 for e in range(employees) if daily_max[e][i] > 0)
+        if hours[i] > 0 and available == 0:
+            reasons.append(
+                {
+                    "reason": "day_uncovered",
+                    "day": i,
+                    "message": "No employee can work on day %i" % i,
+                }
+            )
+
+    skills = [get_employee_skills(constraints[e]) for e in range(employees)]
+    bookings_with_skill = [(d, h, n, None) for d, h, n in customer_bookings]
+    bookings_with_skill += list(skill_bookings or [])
+    for d, h, bookings, skill in bookings_with_skill:
+        booking = {} if skill is None else {"skill": skill}
+        name = "Booking" if skill is None else "Booking of %s" % skill
+        if not 0 <= d < len(days):
+            reasons.append(
+                {
+                    "reason": "booking_day",
+                    "day": d,
+                    "hour": h,
+                    **booking,
+                    "message": "%s on day %i which doesn't exist" % (name, d),
+                }
+            )
+            continue
+        if not 0 <= h < hours[d]:
+            reasons.append(
+                {
+                    "reason": "booking_hour",
+                    "day": d,
+                    "hour": h,
+                    **booking,
+                    "message": "%s on hour %i of day %i which has %i hours"
+                    % (name, h, d, hours[d]),
+                }
+            )
+            continue
+        available = sum(
+            1
+            for e in range(employees)
+            if daily_max[e][d] > 0 and (skill is None or skill in skills[e])
+        )
+        if bookings > available:
+            staff = "employees" if skill is None else "employees with %s" % skill
+            reasons.append(
+                {
+                    "reason": "booking_staff",
+                    "day": d,
+                    "hour": h,
+                    **booking,
+                    "message": "%i %s booked on hour %i of day %i but only "
+                    "%i can work that day" % (bookings, staff, h, d, available),
+                }
+            )
+    return reasons
+
+
+def diagnose_infeasibility(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    time_limit: float = DIAGNOSIS_TIME_LIMIT,
+    skill_bookings: Optional[List[tuple[int, int, int, str]]] = None,
+):
+    """Names a set of hard constraints which can't be satisfied together.
+    Builds the hard constraints of the model only, each group of them (the
+    shift of an employee on a day, the weekly hours of an employee, the
+    coverage and the booking of an hour, or of a skill on an hour) enforced
+    by its own assumption literal, and asks CP-SAT for sufficient
+    assumptions for infeasibility.
+    Returns:
+      a list of reasons like check_request, empty if the request is feasible
+      or no conflict was found within the time limit.
+    """
+    model = cp_model.CpModel()
+    literals = []
+    reasons = {}
+
+    def assumption(name: str, reason: Dict):
+        literal = model.NewBoolVar(name)
+        literals.append(literal)
+        reasons[literal.Index()] = reason
+        return literal
+
+    work = {}
+    for e in range(employees):
+        for i, d in enumerate(days):
+            for h in range(get_hours(d)):
+                work[e, i, h] = model.NewBoolVar("work%i_%i_%i" % (e, i, h))
+
+    for e in range(employees):
+        cts = get_daily_hour_constraints(constraints[e].get("daily") or {}, days)
+        for d, day, ct in cts:
+            hard_min, hard_max = ct[0], ct[4]
+            works = [work[e, d, h] for h in range(get_hours(day))]
+            enforce = assumption(
+                "daily(employee %i, day %i)" % (e, d),
+                {
+                    "reason": "daily",
+                    "employee": e,
+                    "day": d,
+                    "message": "Shift of employee %i on day %i (%i to %i hours)"
+                    % (e, d, hard_min, hard_max),
+                },
+            )
+            # Shift length
+            for length in range(1, hard_min):
+                for start in range(len(works) - length + 1):
+                    span = negated_bounded_span(works, start, length)
+                    model.AddBoolOr(span).OnlyEnforceIf(enforce)
+            for start in range(len(works) - hard_max):
+                window = [works[h].Not() for h in range(start, start + hard_max + 1)]
+                model.AddBoolOr(window).OnlyEnforceIf(enforce)
+            # No gaps
+            starts = [model.NewBoolVar("") for _ in works]
+            for h, var in enumerate(works):
+                before = [works[h - 1]] if h > 0 else []
+                model.AddBoolOr([var.Not(), starts[h]] + before).OnlyEnforceIf(enforce)
+            model.Add(sum(starts) <= 1).OnlyEnforceIf(enforce)
+
+        hard_min, _, _, _, hard_max, _ = get_weekly_constraints_for_employee(
+            constraints[e]
+        )
+        enforce = assumption(
+            "weekly(employee %i)" % e,
+            {
+                "reason": "weekly",
+                "employee": e,
+                "message": "Weekly hours of employee %i (%i to %i hours)"
+                % (e, hard_min, hard_max),
+            },
+        )
+        total = [work[e, i, h] for i, d in enumerate(days) for h in range(get_hours(d))]
+        model.AddLinearConstraint(sum(total), hard_min, hard_max).OnlyEnforceIf(enforce)
+
+    for i, d in enumerate(days):
+        for h in range(get_hours(d)):
+            enforce = assumption(
+                "coverage(day %i, hour %i)" % (i, h),
+                {
+                    "reason": "coverage",
+                    "day": i,
+                    "hour": h,
+                    "message": "At least one employee on hour %i of day %i" % (h, i),
+                },
+            )
+            model.AddBoolOr([work[e, i, h] for e in range(employees)]).OnlyEnforceIf(
+                enforce
+            )
+    for d, h, bookings in customer_bookings:
+        enforce = assumption(
+            "booking(day %i, hour %i)" % (d, h),
+            {
+                "reason": "booking",
+                "day": d,
+                "hour": h,
+                "message": "%i employees booked on hour %i of day %i"
+                % (bookings, h, d),
+            },
+        )
+        model.Add(
+            sum(work[e, d, h] for e in range(employees)) >= bookings
+        ).OnlyEnforceIf(enforce)
+    for d, h, bookings, skill in skill_bookings or []:
+        enforce = assumption(
+            "booking(day %i, hour %i, skill %s)" % (d, h, skill),
+            {
+                "reason": "booking",
+                "day": d,
+                "hour": h,
+                "skill": skill,
+                "message": "%i employees with %s booked on hour %i of day %i"
+                % (bookings, skill, h, d),
+            },
+        )
+        qualified = [
+            work[e, d, h]
+            for e in range(employees)
+            if skill in get_employee_skills(constraints[e])
+        ]
+        model.Add(cp_model.LinearExpr.Sum(qualified) >= bookings).OnlyEnforceIf(enforce)
+
+    model.AddAssumptions(literals)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    # Sufficient assumptions are only reported by a single search worker
+    solver.parameters.num_search_workers = 1
+    status = solver.Solve(model)
+    if status != cp_model.INFEASIBLE:
+        return []
+    return [reasons[i] for i in solver.SufficientAssumptionsForInfeasibility()]
@@ -0,0 +1,497 @@
+"""Rolling horizon scheduling with persistent state.
+A plan is a horizon of days, the constraints of its employees and its
+bookings, kept in a SQLite store together with its schedule. Days before
+plan["frozen"] are committed and never solved again. Only the open window, the
+days from the first open day to the end of its week, is solved: the hours
+already worked that week are carried into the weekly bounds, and the previous
+schedule of the window is the hint of the search. Advancing the plan commits
+its first open days and solves the next window.
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from .cache import ModelCache
+from .constraints import get_weekly_constraints_for_employee
+from .options import SolverOptions
+from .solver import solve_shift_scheduling
+from .utils import get_hours
+
+# Days of a week, the period of the weekly constraints
+WEEK_LENGTH = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id TEXT PRIMARY KEY,
+    employees INTEGER NOT NULL,
+    constraints TEXT NOT NULL,
+    week_length INTEGER NOT NULL,
+    stability INTEGER NOT NULL,
+    frozen INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS days (
+    plan_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    hours INTEGER NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (plan_id, day)
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    plan_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    hour INTEGER NOT NULL,
+    bookings INTEGER NOT NULL,
+    PRIMARY KEY (plan_id, day, hour)
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    plan_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    employee INTEGER NOT NULL,
+    hours TEXT NOT NULL,
+    PRIMARY KEY (plan_id, day, employee)
+);
+"""
+
+
+class UnknownPlan(KeyError):
+    pass
+
+
+class ScheduleStore:
+    """SQLite store of the plans and their schedules.
+    A single connection is shared by the threads of the process behind a
+    lock. path is a file, or ":memory:" for a store lost on exit.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def create_plan(
+        self,
+        employees: int,
+        days: List[Dict],
+        constraints: List[Dict],
+        customer_bookings: List[tuple[int, int, int]],
+        week_length: int = WEEK_LENGTH,
+        stability: int = 1,
+        assignments: Optional[Dict] = None,
+    ) -> str:
+        """Saves a new plan, with the schedule of assignments if given, in a
+        single transaction.
+        Returns:
+          the id of the plan.
+        """
+        plan_id = uuid.uuid4().hex
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO plans VALUES (?, ?, ?, ?, ?, 0)",
+                (plan_id, employees, json.dumps(constraints), week_length, stability),
+            )
+            self._add_days(plan_id, days)
+            self._set_bookings(plan_id, 0, customer_bookings)
+            self._set_assignments(plan_id, assignments or {})
+        return plan_id
+
+    def get_plan(self, plan_id: str) -> Dict:
+        """The plan with its days and bookings.
+        Raises:
+          UnknownPlan: if there is no such plan.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT employees, constraints, week_length, stability, frozen "
+                "FROM plans WHERE id = ?",
+                (plan_id,),
+            ).fetchone()
+            if row is None:
+                raise UnknownPlan(plan_id)
+            days = self.connection.execute(
+                "SELECT hours, minutes FROM days WHERE plan_id = ? ORDER BY day",
+                (plan_id,),
+            ).fetchall()
+            bookings = self.connection.execute(
+                "SELECT day, hour, bookings FROM bookings WHERE plan_id = ? "
+                "ORDER BY day, hour",
+                (plan_id,),
+            ).fetchall()
+        employees, constraints, week_length, stability, frozen = row
+        return {
+            "id": plan_id,
+            "employees": employees,
+            "constraints": json.loads(constraints),
+            "week_length": week_length,
+            "stability": stability,
+            "frozen": frozen,
+            "days": [{"hours": h, "minutes": m} for h, m in days],
+            "customer_bookings": [tuple(b) for b in bookings],
+        }
+
+    def add_days(self, plan_id: str, days: List[Dict]):
+        """Extends the horizon of a plan with days."""
+        with self.lock, self.connection:
+            self._add_days(plan_id, days)
+
+    def _add_days(self, plan_id: str, days: List[Dict]):
+        (start,) = self.connection.execute(
+            "SELECT COUNT(*) FROM days WHERE plan_id = ?", (plan_id,)
+        ).fetchone()
+        self.connection.executemany(
+            "INSERT INTO days VALUES (?, ?, ?, ?)",
+            [
+                (plan_id, start + k, get_hours(d), d.get("minutes", 0))
+                for k, d in enumerate(days)
+            ],
+        )
+
+    def set_bookings(
+        self, plan_id: str, start: int, customer_bookings: List[tuple[int, int, int]]
+    ):
+        """Replaces the bookings of the days from start on."""
+        with self.lock, self.connection:
+            self._set_bookings(plan_id, start, customer_bookings)
+
+    def _set_bookings(
+        self, plan_id: str, start: int, customer_bookings: List[tuple[int, int, int]]
+    ):
+        self.connection.execute(
+            "DELETE FROM bookings WHERE plan_id = ? AND day >= ?", (plan_id, start)
+        )
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO bookings VALUES (?, ?, ?, ?)",
+            [(plan_id, d, h, n) for d, h, n in customer_bookings if d >= start],
+        )
+
+    def get_assignments(self, plan_id: str) -> Dict:
+        """Hours worked by (day, employee) in the schedule of a plan."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT day, employee, hours FROM assignments WHERE plan_id = ?",
+                (plan_id,),
+            ).fetchall()
+        return {(d, e): json.loads(hours) for d, e, hours in rows}
+
+    def set_assignments(self, plan_id: str, assignments: Dict):
+        """Replaces the schedule of the days of assignments."""
+        with self.lock, self.connection:
+            self._set_assignments(plan_id, assignments)
+
+    def _set_assignments(self, plan_id: str, assignments: Dict):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO assignments VALUES (?, ?, ?, ?)",
+            [
+                (plan_id, d, e, json.dumps(hours))
+                for (d, e), hours in assignments.items()
+            ],
+        )
+
+    def save_advance(
+        self,
+        plan_id: str,
+        previous: int,
+        frozen: int,
+        new_days: List[Dict],
+        customer_bookings: Optional[List[tuple[int, int, int]]],
+        assignments: Dict,
+    ):
+        """Commits the days of a plan before frozen, the new days, bookings
+        and schedule of an advance, in a single transaction.
+        Raises:
+          ValueError: if the plan was advanced past previous meanwhile.
+        """
+        with self.lock, self.connection:
+            updated = self.connection.execute(
+                "UPDATE plans SET frozen = ? WHERE id = ? AND frozen = ?",
+                (frozen, plan_id, previous),
+            ).rowcount
+            if not updated:
+                raise ValueError("The plan was advanced meanwhile")
+            self._add_days(plan_id, new_days)
+            if customer_bookings is not None:
+                self._set_bookings(plan_id, frozen, customer_bookings)
+            self._set_assignments(plan_id, assignments)
+
+    def close(self):
+        self.connection.close()
+
+
+def get_window(plan: Dict):
+    """Days of the open window of a plan: from the first open day to the end
+    of its week, or of the horizon.
+    """
+    start = plan["frozen"]
+    week_length = plan["week_length"]
+    end = min(len(plan["days"]), (start // week_length + 1) * week_length)
+    return list(range(start, end))
+
+
+def get_carried_hours(plan: Dict, assignments: Dict):
+    """Hours worked by every employee in the committed days of the week of
+    the first open day.
+    """
+    frozen = plan["frozen"]
+    week_start = frozen - frozen % plan["week_length"]
+    carried = [0] * plan["employees"]
+    for (d, e), hours in assignments.items():
+        if week_start <= d < frozen and e < plan["employees"]:
+            carried[e] += len(hours)
+    return carried
+
+
+def get_window_request(plan: Dict, assignments: Dict):
+    """Keyword arguments of solve_shift_scheduling for the open window.
+    Days are renumbered from the start of the window, the weekly bounds are
+    lowered by the hours carried from the committed days of the week, and
+    the current schedule of the window is the hint. A last week cut short by
+    the end of the horizon gets its share of the weekly bounds, the minimums
+    rounded down and the maximums up.
+    """
+    window = get_window(plan)
+    carried = get_carried_hours(plan, assignments)
+    week_length = plan["week_length"]
+    week_start = plan["frozen"] - plan["frozen"] % week_length
+    week_days = min(len(plan["days"]), week_start + week_length) - week_start
+    constraints = []
+    for e in range(plan["employees"]):
+        employee_constraints = plan["constraints"][e]
+        (
+            hard_min,
+            soft_min,
+            _,
+            soft_max,
+            hard_max,
+            _,
+        ) = get_weekly_constraints_for_employee(employee_constraints)
+        if week_days < week_length:
+            hard_min = hard_min * week_days // week_length
+            soft_min = soft_min * week_days // week_length
+            soft_max = -(-soft_max * week_days // week_length)
+            hard_max = -(-hard_max * week_days // week_length)
+        weekly = {
+            "hard_min": max(0, hard_min - carried[e]),
+            "soft_min": max(0, soft_min - carried[e]),
+            "soft_max": max(0, soft_max - carried[e]),
+            "hard_max": max(0, hard_max - carried[e]),
+        }
+        daily = employee_constraints.get("daily") or {}
+        window_daily = {}
+        if "defaults" in daily:
+            window_daily["defaults"] = daily["defaults"]
+        for k, d in enumerate(window):
+            if str(d) in daily:
+                window_daily[str(k)] = daily[str(d)]
+        constraints.append({"weekly": weekly, "daily": window_daily})
+
+    position = {d: k for k, d in enumerate(window)}
+    hint = [
+        {
+            "id": k,
+            "workers": [
+                {"id": e, "hours": assignments[d, e]}
+                for e in range(plan["employees"])
+                if (d, e) in assignments
+            ],
+        }
+        for k, d in enumerate(window)
+        if any((d, e) in assignments for e in range(plan["employees"]))
+    ]
+    return {
+        "employees": plan["employees"],
+        "days": [plan["days"][d] for d in window],
+        "constraints": constraints,
+        "customer_bookings": [
+            (position[d], h, n)
+            for d, h, n in plan["customer_bookings"]
+            if d in position
+        ],
+        "hint": hint or None,
+        "stability": plan["stability"] if hint else 0,
+    }
+
+
+def get_plan_schedule(plan: Dict, assignments: Dict):
+    """Schedule of the whole horizon of a plan, in the format of res, with
+    the committed and open days told apart.
+    """
+    res = {"frozen": plan["frozen"], "window": get_window(plan), "days": []}
+    totals = [0] * plan["employees"]
+    for d in range(len(plan["days"])):
+        workers = []
+        for e in range(plan["employees"]):
+            hours = assignments.get((d, e), [])
+            totals[e] += len(hours)
+            workers.append({"id": e, "hours": hours})
+        res["days"].append({"id": d, "workers": workers})
+    res["employees"] = [{e: hours} for e, hours in enumerate(totals)]
+    return res
+
+
+def solve_plan_window(
+    plan: Dict,
+    assignments: Dict,
+    options: Optional[SolverOptions] = None,
+    cache: Optional[ModelCache] = None,
+    solve: Optional[Callable] = None,
+    **kwargs
+):
+    """Solves the open window of a plan, without saving anything.
+    solve is called like api.jobs.solve_request, with the keyword arguments
+    of solve_shift_scheduling of the window and options, e.g. to diagnose a
+    window without solution. It is solve_shift_scheduling by default. The
+    days of the "reasons" it returns are numbered in the plan.
+    Returns:
+      a tuple (solution_found, res, solved) where res is like
+      solve_shift_scheduling and solved maps the (day, employee) of the
+      window to the hours of the solution.
+    """
+    window = get_window(plan)
+    request = get_window_request(plan, assignments)
+    if solve is None:
+        success, res = solve_shift_scheduling(
+            **request, options=options, cache=cache, **kwargs
+        )
+    else:
+        success, res = solve(request, options, cache=cache, **kwargs)
+    for reason in res.get("reasons", []):
+        reason["message"] = "Window from day %i: %s" % (window[0], reason["message"])
+        if "day" in reason:
+            reason["day"] = window[reason["day"]]
+    solved = {}
+    for day in res["days"] if success else []:
+        for worker in day["workers"]:
+            solved[window[day["id"]], worker["id"]] = worker["hours"]
+    return (success, res, solved)
+
+
+def start_plan(
+    store: ScheduleStore,
+    plan: Dict,
+    options: Optional[SolverOptions] = None,
+    cache: Optional[ModelCache] = None,
+    **kwargs
+):
+    """Solves the first window of a new plan, and saves the plan with its
+    schedule only if a solution is found.
+    Args:
+      plan: the "employees", "days", "constraints", "customer_bookings",
+        "week_length" and "stability" of the plan.
+      kwargs: like solve_plan_window.
+    Returns:
+      a tuple (solution_found, res) like solve_window, res getting the
+      "plan_id" of the saved plan.
+    """
+    plan = dict(plan, frozen=0)
+    success, res, solved = solve_plan_window(
+        plan, {}, options=options, cache=cache, **kwargs
+    )
+    if not success:
+        return (False, res)
+    plan_id = store.create_plan(
+        plan["employees"],
+        plan["days"],
+        plan["constraints"],
+        plan["customer_bookings"],
+        week_length=plan["week_length"],
+        stability=plan["stability"],
+        assignments=solved,
+    )
+    res = get_plan_schedule(plan, solved)
+    res["plan_id"] = plan_id
+    return (True, res)
+
+
+def solve_window(
+    store: ScheduleStore,
+    plan_id: str,
+    options: Optional[SolverOptions] = None,
+    cache: Optional[ModelCache] = None,
+    **kwargs
+):
+    """Solves the open window of a plan and saves its schedule.
+    Returns:
+      a tuple (solution_found, res) like solve_shift_scheduling, res being
+      the schedule of the whole horizon if a solution is found.
+    """
+    plan = store.get_plan(plan_id)
+    if not get_window(plan):
+        return (False, {"message": "The horizon has no open day left"})
+    assignments = store.get_assignments(plan_id)
+    success, res, solved = solve_plan_window(
+        plan, assignments, options=options, cache=cache, **kwargs
+    )
+    if not success:
+        return (False, res)
+    store.set_assignments(plan_id, solved)
+    assignments.update(solved)
+    return (True, get_plan_schedule(plan, assignments))
+
+
+def get_advanced_plan(
+    plan: Dict,
+    days: int = 1,
+    customer_bookings: Optional[List[tuple[int, int, int]]] = None,
+    new_days: Optional[List[Dict]] = None,
+):
+    """A plan with its first days open days committed, like advance, without
+    saving or solving anything.
+    Raises:
+      ValueError: if the days to commit go past the end of the horizon.
+    """
+    frozen = plan["frozen"] + days
+    if frozen > len(plan["days"]):
+        raise ValueError("Can't advance past the end of the horizon")
+    plan = dict(plan, frozen=frozen, days=plan["days"] + list(new_days or []))
+    if customer_bookings is not None:
+        plan["customer_bookings"] = [
+            b for b in plan["customer_bookings"] if b[0] < frozen
+        ] + [tuple(b) for b in customer_bookings if b[0] >= frozen]
+    return plan
+
+
+def advance(
+    store: ScheduleStore,
+    plan_id: str,
+    days: int = 1,
+    customer_bookings: Optional[List[tuple[int, int, int]]] = None,
+    new_days: Optional[List[Dict]] = None,
+    options: Optional[SolverOptions] = None,
+    cache: Optional[ModelCache] = None,
+    solve: Optional[Callable] = None,
+):
+    """Commits the first days open days of a plan and solves the next window.
+    customer_bookings replace the bookings of the days still open, and
+    new_days extend the horizon. Nothing is saved unless the window is
+    solved, or there is no open day left. solve is like solve_plan_window.
+    Raises:
+      ValueError: if the days to commit haven't been scheduled, or the plan
+        was advanced by another request during the solve.
+    Returns:
+      a tuple (solution_found, res) like solve_window.
+    """
+    plan = store.get_plan(plan_id)
+    previous = plan["frozen"]
+    assignments = store.get_assignments(plan_id)
+    # The plan as advanced, saved only with the solution of its window
+    plan = get_advanced_plan(plan, days, customer_bookings, new_days)
+    frozen = plan["frozen"]
+    for d in range(previous, frozen):
+        if not any((d, e) in assignments for e in range(plan["employees"])):
+            raise ValueError("Day %i hasn't been scheduled" % d)
+
+    solved = {}
+    if get_window(plan):
+        success, res, solved = solve_plan_window(
+            plan, assignments, options=options, cache=cache, solve=solve
+        )
+        if not success:
+            return (False, res)
+    store.save_advance(
+        plan_id, previous, frozen, new_days or [], customer_bookings, solved
+    )
+    assignments.update(solved)
+    return (True, get_plan_schedule(plan, assignments))
@@ -0,0 +1,46 @@
+"""Structured logs, one JSON object per line on stderr.
+
+    logger = get_logger(__name__)
+    logger.info("solve", extra={"fields": {"status": "OPTIMAL"}})
+"""
+import json
+import logging
+import os
+import time
+
+# Logger every logger of the package descends from
+ROOT = "schedule"
+
+# Level of the logs, e.g. WARNING to only keep problems
+LEVEL = os.environ.get("SCHEDULE_LOG_LEVEL", "INFO")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a JSON object with its time, level, logger, event
+    (the message) and the dict given as extra={"fields": ...}.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + ".%03dZ" % record.msecs,
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def get_logger(name: str):
+    """Logger writing JSON lines, under the package root logger."""
+    root = logging.getLogger(ROOT)
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+        root.setLevel(LEVEL)
+        root.propagate = False
+    return root.getChild(name)
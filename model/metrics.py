@@ -0,0 +1,168 @@
+"""Process wide metrics, rendered in the Prometheus text format.
+Metrics are declared once in METRICS, and observed by name with their labels.
+Worker processes can forward their observations to a parent process with
+set_sink instead of keeping them.
+"""
+import contextlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Optional
+
+COUNTER = "counter"
+HISTOGRAM = "histogram"
+
+# Upper bounds of the buckets of the histograms
+SECONDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZES = (100, 1000, 10000, 100000, 1000000, 10000000)
+OBJECTIVES = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# name: (type, help, buckets)
+METRICS = OrderedDict(
+    [
+        (
+            "schedule_phase_seconds",
+            (HISTOGRAM, "Time spent in every phase of a request.", SECONDS),
+        ),
+        (
+            "schedule_build_seconds",
+            (HISTOGRAM, "Time spent in every builder of a model.", SECONDS),
+        ),
+        ("schedule_model_variables", (HISTOGRAM, "Variables of a model.", SIZES)),
+        ("schedule_model_constraints", (HISTOGRAM, "Constraints of a model.", SIZES)),
+        ("schedule_solves_total", (COUNTER, "Solves by solver status.", None)),
+        ("schedule_stops_total", (COUNTER, "Solves by reason of ending.", None)),
+        (
+            "schedule_solve_wall_seconds",
+            (HISTOGRAM, "Wall time of a solve.", SECONDS),
+        ),
+        (
+            "schedule_solve_deterministic_seconds",
+            (HISTOGRAM, "Deterministic time of a solve.", SECONDS),
+        ),
+        ("schedule_objective", (HISTOGRAM, "Objective of a solve.", OBJECTIVES)),
+        ("schedule_best_bound", (HISTOGRAM, "Best bound of a solve.", OBJECTIVES)),
+        ("schedule_requests_total", (COUNTER, "Requests by route and status.", None)),
+    ]
+)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_sink: Optional[Callable[[tuple], None]] = None
+
+
+def set_sink(sink: Optional[Callable[[tuple], None]]):
+    """Sends every observation to sink, as a (kind, name, value, labels) tuple
+    to pass to record, instead of keeping it. None keeps them again.
+    """
+    global _sink
+    _sink = sink
+
+
+def increment(name: str, value: float = 1, **labels):
+    record((COUNTER, name, value, labels))
+
+
+def observe(name: str, value: float, **labels):
+    record((HISTOGRAM, name, value, labels))
+
+
+def record(observation: tuple):
+    kind, name, value, labels = observation
+    if METRICS[name][0] != kind:
+        raise ValueError("%s is not a %s" % (name, kind))
+    if _sink is not None:
+        _sink(observation)
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        if kind == COUNTER:
+            _counters[key] += value
+            return
+        buckets = METRICS[name][2]
+        if key not in _histograms:
+            _histograms[key] = [[0] * len(buckets), 0, 0.0]
+        histogram = _histograms[key]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[0][i] += 1
+        histogram[1] += 1
+        histogram[2] += value
+
+
+@contextlib.contextmanager
+def timer(name: str, **labels):
+    """Observes the duration of the block in seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+class Stopwatch:
+    """Accumulates the time spent in blocks by key, e.g. in every builder of
+    a model, to observe the totals at once.
+    """
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+
+    @contextlib.contextmanager
+    def time(self, key: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[key] += time.perf_counter() - start
+
+    def observe(self, name: str, label: str):
+        for key, total in self.totals.items():
+            observe(name, total, **{label: key})
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in pairs
+    ]
+    return "{%s}" % ",".join(escaped)
+
+
+def render():
+    """All the metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name, (kind, description, buckets) in METRICS.items():
+            lines.append("# HELP %s %s" % (name, description))
+            lines.append("# TYPE %s %s" % (name, kind))
+            if kind == COUNTER:
+                for (key, labels), value in sorted(_counters.items()):
+                    if key == name:
+                        lines.append("%s%s %g" % (name, _format_labels(labels), value))
+                continue
+            for (key, labels), (counts, count, total) in sorted(_histograms.items()):
+                if key != name:
+                    continue
+                for bound, bucket in zip(buckets, counts):
+                    le = (("le", "%g" % bound),)
+                    lines.append(
+                        "%s_bucket%s %i" % (name, _format_labels(labels, le), bucket)
+                    )
+                inf = (("le", "+Inf"),)
+                lines.append(
+                    "%s_bucket%s %i" % (name, _format_labels(labels, inf), count)
+                )
+                lines.append("%s_sum%s %g" % (name, _format_labels(labels), total))
+                lines.append("%s_count%s %i" % (name, _format_labels(labels), count))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,236 @@
+"""Secondary objectives, optimized lexicographically after the penalties.
+Besides the penalty of the soft limits (and of the stability), a schedule can
+be judged by its fairness, the spread between the employees of the hours
+worked on weekends and of the late hours, and by the preferences of the
+employees, the hours they work although they asked for them off.
+
+Rather than adding all of them to a single weighted objective, the stages of
+Objectives are solved in turn: every stage minimizes the weighted sum of its
+terms within its own time limit, then its objective is bounded by the value
+found, and the solution hints the next stage.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from ortools.sat.python import cp_model
+
+from .constraints import get_daily_hour_constraints, get_daily_max
+from .utils import get_hours
+
+# Terms of an objective
+PENALTY = "penalty"
+FAIRNESS = "fairness"
+PREFERENCES = "preferences"
+TERMS = (PENALTY, FAIRNESS, PREFERENCES)
+
+# Days of the weekend, by the index of the day modulo 7
+WEEKEND_DAYS = (5, 6)
+
+# Hours at the end of a day counted as late
+LATE_HOURS = 2
+
+
+@dataclass
+class Stage:
+    """A stage of a lexicographic solve.
+    Attributes:
+      weights: the weight of every term minimized by the stage.
+      time_limit: limit of the stage in seconds, by default an equal share of
+        the time limit of the solve.
+    """
+
+    weights: Dict[str, int]
+    time_limit: Optional[float] = None
+
+
+@dataclass
+class Objectives:
+    """Objectives of a solve, in the order of their stages.
+    Attributes:
+      stages: the stages, the first one being the most important.
+      weekend_days: the days of the weekend, by default the days whose index
+        modulo 7 is in WEEKEND_DAYS.
+      late_hours: the hours at the end of every day counted as late.
+    """
+
+    stages: List[Stage] = field(default_factory=lambda: [Stage({PENALTY: 1})])
+    weekend_days: Optional[List[int]] = None
+    late_hours: int = LATE_HOURS
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]):
+        """Objectives from a dict like to_dict, e.g.
+        {"stages": [{"weights": {"penalty": 1}},
+                    {"weights": {"fairness": 2, "preferences": 1},
+                     "time_limit": 2}]}
+        Raises:
+          ValueError: if a stage has no term with a positive weight, an
+            unknown term or a negative weight.
+        """
+        if data is None:
+            return cls()
+        stages = []
+        for stage in data.get("stages") or [{"weights": {PENALTY: 1}}]:
+            weights = stage.get("weights") or {}
+            for term, weight in weights.items():
+                if term not in TERMS:
+                    raise ValueError(
+                        "Unknown term %s, not one of %s" % (term, ", ".join(TERMS))
+                    )
+                if not isinstance(weight, int) or weight < 0:
+                    raise ValueError("Weights must be non-negative integers")
+            if not any(weights.values()):
+                raise ValueError("Every stage needs a term with a positive weight")
+            stages.append(Stage(dict(weights), stage.get("time_limit")))
+        return cls(
+            stages=stages,
+            weekend_days=data.get("weekend_days"),
+            late_hours=data.get("late_hours", LATE_HOURS),
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+    def get_terms(self):
+        """Terms with a positive weight in some stage."""
+        return {t for s in self.stages for t, w in s.weights.items() if w > 0}
+
+    def get_time_limits(self, time_limit: float):
+        """Time limit of every stage, sharing time_limit between the stages
+        without a limit of their own.
+        """
+        shared = [s for s in self.stages if s.time_limit is None]
+        own = sum(s.time_limit for s in self.stages if s.time_limit is not None)
+        share = max(time_limit - own, 0) / len(shared) if shared else 0
+        return [share if s.time_limit is None else s.time_limit for s in self.stages]
+
+
+def get_employee_preferences(employee_constraints, days: List[Dict]):
+    """(day, hour) an employee would rather have off, from the optional
+    "preferences" of their constraints: whole "days_off" and [day, hour]
+    pairs of "hours_off".
+    """
+    preferences = employee_constraints.get("preferences") or {}
+    off = set()
+    for d in preferences.get("days_off") or []:
+        if 0 <= d < len(days):
+            off.update((d, h) for h in range(get_hours(days[d])))
+    for d, h in preferences.get("hours_off") or []:
+        if 0 <= d < len(days) and 0 <= h < get_hours(days[d]):
+            off.add((d, h))
+    return sorted(off)
+
+
+def get_penalty_expression(model):
+    """Objective of a model as built, the penalty of its soft limits."""
+    objective = model.Proto().objective
+    variables = [model.GetIntVarFromProtoIndex(v) for v in objective.vars]
+    return cp_model.LinearExpr.WeightedSum(variables, list(objective.coeffs)) + int(
+        objective.offset
+    )
+
+
+def add_spread(model, totals: List, upper: int, name: str):
+    """Difference between the largest and smallest of totals."""
+    if len(totals) < 2:
+        return 0
+    largest = model.NewIntVar(0, upper, name + "_max")
+    smallest = model.NewIntVar(0, upper, name + "_min")
+    model.AddMaxEquality(largest, totals)
+    model.AddMinEquality(smallest, totals)
+    return largest - smallest
+
+
+def get_fairness_expression(
+    model,
+    work: Dict,
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    objectives: Objectives,
+    per_hour: int = 1,
+):
+    """Spread of the weekend hours plus spread of the late hours, between
+    the employees able to work them. Hours are counted in units of the
+    model, slots if per_hour > 1.
+    """
+    weekend_days = objectives.weekend_days
+    if weekend_days is None:
+        weekend_days = [d for d in range(len(days)) if d % 7 in WEEKEND_DAYS]
+    weekend = [d for d in weekend_days if 0 <= d < len(days)]
+    late = [
+        (d, h)
+        for d, day in enumerate(days)
+        for h in range(
+            max(0, get_hours(day) - objectives.late_hours * per_hour), get_hours(day)
+        )
+    ]
+    available = [
+        [get_daily_max(ct, get_hours(day)) > 0 for _, day, ct in daily]
+        for daily in (
+            get_daily_hour_constraints(constraints[e].get("daily"), days)
+            for e in range(employees)
+        )
+    ]
+    terms = 0
+    for name, cells in (
+        ("weekend", [(d, h) for d in weekend for h in range(get_hours(days[d]))]),
+        ("late", late),
+    ):
+        totals = []
+        for e in range(employees):
+            if not any(available[e][d] for d, _ in cells):
+                continue
+            total = model.NewIntVar(0, len(cells), "%s%i" % (name, e))
+            model.Add(total == sum(work[e, d, h] for d, h in cells))
+            totals.append(total)
+        terms += add_spread(model, totals, len(cells), name)
+    return terms
+
+
+def get_preference_expression(work: Dict, preferences: List, per_hour: int = 1):
+    """Hours worked although the employee asked for them off, in units of
+    the model.
+    Args:
+      preferences: the hours off of every employee, as returned by
+        get_employee_preferences.
+    """
+    worked = []
+    for e, off in enumerate(preferences):
+        for d, h in off:
+            worked.extend(work[e, d, h * per_hour + k] for k in range(per_hour))
+    return sum(worked)
+
+
+def get_stage_expressions(
+    model,
+    work: Dict,
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    objectives: Objectives,
+    preferences: List,
+    per_hour: int = 1,
+):
+    """Objective of every stage, the weighted sum of its terms.
+    The penalty is read from the objective of the model, so that this is
+    called before any stage replaces it.
+    """
+    terms = objectives.get_terms()
+    expressions = {PENALTY: get_penalty_expression(model)}
+    if FAIRNESS in terms:
+        expressions[FAIRNESS] = get_fairness_expression(
+            model, work, employees, days, constraints, objectives, per_hour
+        )
+    if PREFERENCES in terms:
+        expressions[PREFERENCES] = get_preference_expression(
+            work, preferences, per_hour
+        )
+    return [
+        sum(
+            weight * expressions[term]
+            for term, weight in stage.weights.items()
+            if weight > 0
+        )
+        for stage in objectives.stages
+    ]
@@ -0,0 +1,119 @@
+import contextlib
+import typing
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional
+
+from ortools.sat import sat_parameters_pb2
+
+# Default solver options
+TIME_LIMIT = 5
+NUM_SEARCH_WORKERS = 0  # 0 lets CP-SAT use every core
+
+
+@dataclass
+class SolverOptions:
+    """Parameters of a single CP-SAT solve.
+    Attributes:
+      time_limit: limit of the search in seconds. In deterministic mode it is
+        a limit in deterministic time instead, so that the search stops at the
+        same point on every run.
+      num_search_workers: number of parallel search workers, 0 for every core.
+      relative_gap_limit: stop once (objective - bound) / objective is at most
+        this value.
+      absolute_gap_limit: stop once objective - bound is at most this value.
+      no_improvement_time: stop once no better solution has been found for
+        this many seconds.
+      stop_at_lower_bound: stop at a solution reaching the lower bound of
+        get_lower_bound, which is then optimal.
+      random_seed: seed of the search.
+      log_path: write the search log to this file.
+      deterministic: make the parallel search reproducible.
+      print_solutions: print the objective of every solution found.
+    """
+
+    time_limit: float = TIME_LIMIT
+    num_search_workers: int = NUM_SEARCH_WORKERS
+    relative_gap_limit: Optional[float] = None
+    absolute_gap_limit: Optional[float] = None
+    no_improvement_time: Optional[float] = None
+    stop_at_lower_bound: bool = True
+    random_seed: Optional[int] = None
+    log_path: Optional[str] = None
+    deterministic: bool = False
+    print_solutions: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]):
+        """Options from a dict, ignoring unknown keys.
+        Raises:
+          ValueError: if data isn't a dict or an option has the wrong type.
+        """
+        if data is None:
+            return cls()
+        if not isinstance(data, dict):
+            raise ValueError("The options must be an object")
+        options = {}
+        for field in fields(cls):
+            if field.name not in data:
+                continue
+            value = data[field.name]
+            if not is_of_type(value, field.type):
+                raise ValueError("Invalid %s: %r" % (field.name, value))
+            options[field.name] = value
+        return cls(**options)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @contextlib.contextmanager
+    def applied(self, solver):
+        """Sets the parameters of solver for the duration of the block, and
+        restores the previous ones on exit.
+        """
+        parameters = solver.parameters
+        previous = sat_parameters_pb2.SatParameters()
+        previous.CopyFrom(parameters)
+        if self.deterministic:
+            parameters.max_deterministic_time = self.time_limit
+            parameters.interleave_search = True
+            parameters.random_seed = 0 if self.random_seed is None else self.random_seed
+        else:
+            parameters.max_time_in_seconds = self.time_limit
+        if self.num_search_workers:
+            parameters.num_search_workers = self.num_search_workers
+        if self.relative_gap_limit is not None:
+            parameters.relative_gap_limit = self.relative_gap_limit
+        if self.absolute_gap_limit is not None:
+            parameters.absolute_gap_limit = self.absolute_gap_limit
+        if self.random_seed is not None:
+            parameters.random_seed = self.random_seed
+
+        try:
+            if self.log_path is None:
+                yield solver
+                return
+            with open(self.log_path, "a") as log:
+                parameters.log_search_progress = True
+                parameters.log_to_stdout = False
+                solver.log_callback = lambda line: log.write(line + "\n")
+                try:
+                    yield solver
+                finally:
+                    solver.log_callback = None
+        finally:
+            parameters.CopyFrom(previous)
+
+
+def is_of_type(value, kind):
+    """Whether value fits the type of an option: floats take integers too,
+    and numbers aren't booleans.
+    """
+    if typing.get_origin(kind) is typing.Union:
+        return any(is_of_type(value, k) for k in typing.get_args(kind))
+    if kind is type(None):
+        return value is None
+    if isinstance(value, bool):
+        return kind is bool
+    if kind is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, kind)
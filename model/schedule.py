@@ -0,0 +1,109 @@
+from collections.abc import Mapping
+from typing import Dict, List
+
+import numpy as np
+
+from .utils import get_hours
+
+
+class WorkVariables(Mapping):
+    """Work variables of the lean build mode, by array position.
+    Rather than a dict of variables keyed by (employee, day, hour) tuples,
+    only the (employees, days, hours) array of their proto indexes is kept,
+    -1 after the end of a shorter day. Variables are wrapped on access, so
+    that this maps the same keys to the same variables as the dict.
+    """
+
+    def __init__(self, model, index):
+        self.model = model
+        self.index = index
+
+    def __getitem__(self, key):
+        if len(key) != 3 or not all(0 <= k < n for k, n in zip(key, self.index.shape)):
+            raise KeyError(key)
+        index = int(self.index[key])
+        if index < 0:
+            raise KeyError(key)
+        return self.model.GetIntVarFromProtoIndex(index)
+
+    def __iter__(self):
+        for e, i, h in zip(*np.nonzero(self.index >= 0)):
+            yield (int(e), int(i), int(h))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.index >= 0))
+
+    def get_literals(self, employee: int, day: int, hours: int):
+        """Literal indexes of the hours of an employee on a day."""
+        return self.index[employee, day, :hours].tolist()
+
+
+def get_work_index(work: Dict, employees: int, days: List[Dict]):
+    """Array of the proto indexes of the work variables.
+    Returns:
+      an (employees, days, hours) int array, hours being the longest day. The
+      hours after the end of a shorter day are -1.
+    """
+    if isinstance(work, WorkVariables):
+        return work.index.copy()
+    hours = [get_hours(d) for d in days]
+    index = np.full((employees, len(days), max(hours, default=0)), -1, np.int64)
+    for (e, i, h), var in work.items():
+        index[e, i, h] = var.Index()
+    return index
+
+
+def get_solution_matrix(solution, index):
+    """Values of the work variables, read at once from the solution.
+    Args:
+      solution: the values of all the variables of the model, e.g. the
+        solution field of a CpSolverResponse.
+      index: the array returned by get_work_index.
+    Returns:
+      an (employees, days, hours) array of 0/1, 0 after the end of a day.
+    """
+    values = np.asarray(solution, dtype=np.int8)
+    matrix = np.zeros(index.shape, dtype=np.int8)
+    mask = index >= 0
+    matrix[mask] = values[index[mask]]
+    return matrix
+
+
+def get_schedule(matrix, slot_minutes: int = 60):
+    """Response format of a solution matrix.
+    With slots shorter than an hour, workers get the "slots" they work
+    instead of their "hours", and the totals of the employees are in hours.
+    """
+    key = "hours" if slot_minutes == 60 else "slots"
+    res = dict()
+    res["days"] = []
+    for i in range(matrix.shape[1]):
+        workers = []
+        for e in range(matrix.shape[0]):
+            hours = np.flatnonzero(matrix[e, i]).tolist()
+            workers.append({"id": e, key: hours})
+        res["days"].append({"id": i, "workers": workers})
+    totals = matrix.sum(axis=(1, 2)).tolist()
+    if slot_minutes != 60:
+        totals = [slots * slot_minutes / 60 for slots in totals]
+    res["employees"] = [{e: hours} for e, hours in enumerate(totals)]
+    return res
+
+
+def format_schedule(matrix, days: List[Dict]):
+    """Text rendering of a solution matrix, for debugging."""
+    lines = []
+    for i, d in enumerate(days):
+        lines.append("\nDAY %i" % (i + 1))
+        lines.append(
+            "          " + "".join("%-3i" % (8 + h) for h in range(get_hours(d)))
+        )
+        for e in range(matrix.shape[0]):
+            schedule = "".join(
+                "X  " if matrix[e, i, h] else ".  " for h in range(get_hours(d))
+            )
+            lines.append("worker %i: %s" % (e, schedule))
+    lines.append("\n")
+    for e, hours in enumerate(matrix.sum(axis=(1, 2)).tolist()):
+        lines.append("Employee %i worked %i hours" % (e, hours))
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+"""Time slots shorter than an hour.
+A request in hours is turned into the same request in slots: every slot is a
+unit of the model, like an hour otherwise, so that the model and its builders
+don't need to know the slot size. Days last their hours and minutes, hour
+bounds become bounds in slots, and a booking covers every slot of its hour.
+"""
+from typing import Dict, List
+
+from .constraints import (
+    SLOT_SOFT_MAX,
+    SLOT_SOFT_MIN,
+    get_daily_hour_constraints,
+    get_employee_skills,
+    get_weekly_constraints_for_employee,
+)
+from .utils import get_hours
+
+# Slot sizes in minutes, an hour being the default
+SLOT_MINUTES = (15, 30, 60)
+HOUR = 60
+
+
+def get_slots_per_hour(slot_minutes: int):
+    if slot_minutes not in SLOT_MINUTES:
+        raise ValueError(
+            "Slots must last one of %s minutes, not %s" % (SLOT_MINUTES, slot_minutes)
+        )
+    return HOUR // slot_minutes
+
+
+def get_slot_days(days: List[Dict], slot_minutes: int):
+    """Days of a request counted in slots, as "hours" of the model."""
+    return [
+        {"hours": (get_hours(d) * HOUR + d.get("minutes", 0)) // slot_minutes}
+        for d in days
+    ]
+
+
+def get_slot_constraints(constraints: List[Dict], days: List[Dict], slot_minutes: int):
+    """Constraints of a request with every bound in slots.
+    The bounds are resolved in hours first, so that defaults and clamping
+    apply as usual, then written out for every day, the daily soft bounds
+    under the internal keys SLOT_SOFT_MIN and SLOT_SOFT_MAX.
+    """
+    per_hour = get_slots_per_hour(slot_minutes)
+    slot_constraints = []
+    for employee_constraints in constraints:
+        weekly = get_weekly_constraints_for_employee(employee_constraints)
+        daily = {}
+        for d, day, ct in get_daily_hour_constraints(
+            employee_constraints.get("daily"), days
+        ):
+            if ct[0] > min(ct[4], get_hours(day)):
+                # The default shift doesn't fit in the day, which is off
+                daily[str(d)] = {"hard_min": 0, "hard_max": 0}
+                continue
+            daily[str(d)] = {
+                "hard_min": ct[0] * per_hour,
+                SLOT_SOFT_MIN: ct[1] * per_hour,
+                SLOT_SOFT_MAX: ct[3] * per_hour,
+                "hard_max": ct[4] * per_hour,
+            }
+        slot_constraints.append(
+            {
+                "weekly": {
+                    "hard_min": weekly[0] * per_hour,
+                    "soft_min": weekly[1] * per_hour,
+                    "soft_max": weekly[3] * per_hour,
+                    "hard_max": weekly[4] * per_hour,
+                },
+                "daily": daily,
+                "skills": list(get_employee_skills(employee_constraints)),
+            }
+        )
+    return slot_constraints
+
+
+def get_slot_bookings(customer_bookings: List[tuple], slot_minutes: int):
+    """Bookings of every slot of the booked hours. The fields after the hour,
+    the bookings and the skill of skill bookings, are kept as is.
+    """
+    per_hour = get_slots_per_hour(slot_minutes)
+    return [
+        (d, h * per_hour + k, *rest)
+        for d, h, *rest in customer_bookings
+        for k in range(per_hour)
+    ]
+
+
+def get_slot_request(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    slot_minutes: int,
+):
+    """(days, constraints, customer_bookings) of a request in slots."""
+    return (
+        get_slot_days(days, slot_minutes),
+        get_slot_constraints(constraints[:employees], days, slot_minutes),
+        get_slot_bookings(customer_bookings, slot_minutes),
+    )
@@ -1,30 +1,496 @@
+import contextlib
 import json
-import sys
-from absl import app
-from typing import List, Dict
+import threading
+import time
+from dataclasses import replace
+from absl import app, flags
+from typing import Callable, Dict, List, Optional
+import numpy as np
 from ortools.sat.python import cp_model
 
+from .bounds import get_lower_bound
+from .capture import Capture, get_default_capture
+from .cache import (
+    ModelCache,
+    canonical_request,
+    load_model,
+    request_hash,
+    structure_hash,
+)
 from .constraints import (
+    add_clause,
     add_daily_hour_constraints,
+    add_daily_shift_constraints,
+    add_lexicographic_constraint,
+    add_linear,
     add_weekly_constraint,
     get_daily_hour_constraints,
     get_daily_hour_variables_for_employee,
+    get_daily_max,
+    get_employee_skills,
+    get_identical_employees,
     get_weekly_constraints_for_employee,
     get_weekly_hour_variables_for_employee,
+    negate,
+)
+from . import metrics
+from .logs import get_logger
+from .objectives import (
+    PENALTY,
+    PREFERENCES,
+    Objectives,
+    get_employee_preferences,
+    get_stage_expressions,
 )
+from .options import NUM_SEARCH_WORKERS, TIME_LIMIT, SolverOptions
+from .schedule import (
+    WorkVariables,
+    format_schedule,
+    get_schedule,
+    get_solution_matrix,
+    get_work_index,
+)
+from .slots import HOUR, get_slot_bookings, get_slot_request, get_slots_per_hour
 from .utils import get_hours
 
+logger = get_logger(__name__)
+
 SHIFT_HARD_MIN = 6
 SHIFT_HARD_MAX = 9
 
+FLAGS = flags.FLAGS
+flags.DEFINE_float("time_limit", TIME_LIMIT, "Time limit of the search in seconds.")
+flags.DEFINE_integer(
+    "num_search_workers", NUM_SEARCH_WORKERS, "Parallel search workers, 0 for all."
+)
+flags.DEFINE_float("relative_gap_limit", None, "Stop at this relative gap.")
+flags.DEFINE_float("absolute_gap_limit", None, "Stop at this absolute gap.")
+flags.DEFINE_float(
+    "no_improvement_time", None, "Stop after this many seconds without improving."
+)
+flags.DEFINE_bool(
+    "stop_at_lower_bound", True, "Stop at a solution reaching the lower bound."
+)
+flags.DEFINE_integer("random_seed", None, "Random seed of the search.")
+flags.DEFINE_string("log_path", None, "Write the search log to this file.")
+flags.DEFINE_bool("deterministic", False, "Make the parallel search reproducible.")
+
+# Seconds between two checks of the stop event of a search
+STOP_POLL_INTERVAL = 0.05
+
+# Encodings of the no gaps constraint
+NO_GAPS_QUADRATIC = "quadratic"
+NO_GAPS_LINEAR = "linear"
+
+# Formulations of the daily shifts
+SHIFT_MODEL_SEQUENCE = "sequence"
+SHIFT_MODEL_INTERVAL = "interval"
+
+# Reasons a search ended, reported in res["termination"]
+STOP_OPTIMAL = "optimal"
+STOP_INFEASIBLE = "infeasible"
+STOP_LOWER_BOUND = "lower_bound"
+STOP_GAP = "gap"
+STOP_NO_IMPROVEMENT = "no_improvement"
+STOP_TIME_LIMIT = "time_limit"
+STOP_REQUESTED = "stopped"
+
+# Reasons after which a result is the one any later search would find, and
+# can be cached whatever its options. Searches stopped by the caller (e.g. a
+# /stream client leaving) or without improvement are never cached.
+FINAL_REASONS = (STOP_OPTIMAL, STOP_LOWER_BOUND)
+
+# Work variables from which models are built in the lean mode by default
+LEAN_WORK_VARIABLES = 10000
+
 
 def solve_shift_scheduling(
     employees: int,
     days: List[Dict],
     constraints: List[Dict],
     customer_bookings: List[tuple[int, int, int]],
+    on_solution: Optional[Callable[[Dict], None]] = None,
+    cache: Optional[ModelCache] = None,
+    no_gaps: str = NO_GAPS_LINEAR,
+    shift_model: Optional[str] = None,
+    options: Optional[SolverOptions] = None,
+    hint: Optional[List[Dict]] = None,
+    stability: int = 0,
+    stop: Optional[threading.Event] = None,
+    slot_minutes: int = HOUR,
+    capture: Optional[Capture] = None,
+    skill_bookings: Optional[List[tuple[int, int, int, str]]] = None,
+    objectives: Optional[Objectives] = None,
+    lean: Optional[bool] = None,
+):
+    """Solves the shift scheduling problem.
+    If on_solution is given, it is called with a dict holding the objective,
+    best bound, elapsed time and res of every improving solution found during
+    the search, instead of printing them. Setting the stop event ends the
+    search early with the best solution so far.
+    If cache is given, the result of an identical earlier request is returned
+    as is, if its search ended optimal or at the lower bound (FINAL_REASONS),
+    and the model of a request differing only by its bookings is reused
+    with the coverage bounds patched.
+    no_gaps selects the encoding of the no gaps constraint, NO_GAPS_LINEAR or
+    NO_GAPS_QUADRATIC. shift_model selects the formulation of the daily
+    shifts: SHIFT_MODEL_SEQUENCE penalizes every span of hours, while
+    SHIFT_MODEL_INTERVAL models each shift by its start and length (and needs
+    no separate no gaps constraint). By default, the sequence model is used
+    for hours and the interval model for shorter slots, since the sequence
+    model grows with the square of the slots of a day. options are the
+    parameters of the solver, the defaults if not given.
+    slot_minutes is the granularity of the schedule, 15, 30 or 60 minutes.
+    Bounds stay in hours and bookings cover their whole hour, while the
+    workers of res get the "slots" they work instead of their "hours".
+    hint is a previous schedule, in the format of res["days"], used as a
+    starting point of the search. With a positive stability, every hour
+    assigned differently from the hint costs that much in the objective.
+    Interchangeable employees are ordered to break their symmetry, unless the
+    stability penalty tells them apart or the slots are shorter than an hour.
+    Besides the time limit, the search ends at the gap limits of options,
+    after options.no_improvement_time seconds without a better solution, or
+    at a solution reaching the lower bound of get_lower_bound. res gets a
+    "termination" dict with the reason the search ended, the objective, the
+    bound of the solver and the lower bound. Without a solution, its reason
+    is STOP_INFEASIBLE only if the solver proved the request infeasible.
+    capture picks solves to write with their request and model, for
+    benchmarks/replay.py, the one set by the environment if not given.
+    skill_bookings are (day, hour, bookings, skill) tuples: that many
+    employees with the skill in the "skills" of their constraints must work
+    the hour. Only the booked (day, hour, skill) cells get a constraint, over
+    the employees having the skill.
+    objectives adds the fairness and preference terms of model/objectives.py
+    and solves its stages lexicographically: every stage minimizes its
+    weighted terms within its share of the time limit, is then bounded by the
+    value found, and hints the next one. res then gets the "stages" with the
+    reason, objective and bound of each. Without objectives, the penalty of
+    the soft limits is minimized in a single search.
+    lean builds the model in the lean mode of build_model, by default for
+    models of at least LEAN_WORK_VARIABLES work variables. The model is the
+    same but for the names of its variables, so the cache doesn't tell them
+    apart.
+    """
+    if options is None:
+        options = SolverOptions()
+    if capture is None:
+        capture = get_default_capture()
+    if capture is not None:
+        request = {
+            "employees": employees,
+            "days": days,
+            "constraints": constraints,
+            "customer_bookings": customer_bookings,
+            "no_gaps": no_gaps,
+            "shift_model": shift_model,
+            "hint": hint,
+            "stability": stability,
+            "slot_minutes": slot_minutes,
+            "skill_bookings": skill_bookings,
+            "objectives": None if objectives is None else objectives.to_dict(),
+        }
+    if shift_model is None:
+        shift_model = (
+            SHIFT_MODEL_SEQUENCE if slot_minutes == HOUR else SHIFT_MODEL_INTERVAL
+        )
+    preferences = None
+    if objectives is not None:
+        # In hours, from the constraints of the request
+        preferences = [
+            get_employee_preferences(c, days) for c in constraints[:employees]
+        ]
+    if slot_minutes != HOUR:
+        days, constraints, customer_bookings = get_slot_request(
+            employees, days, constraints, customer_bookings, slot_minutes
+        )
+        if skill_bookings:
+            skill_bookings = get_slot_bookings(skill_bookings, slot_minutes)
+    demand = get_demand(days, customer_bookings, skill_bookings)
+    # The lexicographic ordering of long rows of slots slows down the search
+    # for a first solution more than it prunes
+    symmetry = (hint is None or stability <= 0) and slot_minutes == HOUR
+    if objectives is not None and PREFERENCES in objectives.get_terms():
+        # Preferences tell the employees apart
+        symmetry = symmetry and not any(preferences)
+
+    compiled = None
+    if cache is not None:
+        canonical = canonical_request(
+            employees,
+            days,
+            constraints,
+            demand,
+            no_gaps=no_gaps,
+            shift_model=shift_model,
+            symmetry=symmetry,
+            slot_minutes=slot_minutes,
+        )
+        if hint is not None:
+            canonical["hint"] = hint
+            canonical["stability"] = stability
+        if objectives is not None:
+            canonical["objectives"] = objectives.to_dict()
+            canonical["preferences"] = preferences
+        key = request_hash(canonical)
+        res = cache.get_result(key)
+        if res is not None:
+            return (True, res)
+        structure_key = structure_hash(canonical)
+        compiled = cache.get_model(structure_key)
+
+    build_start = time.perf_counter()
+    if compiled is None:
+        if lean is None:
+            lean = employees * sum(get_hours(d) for d in days) >= LEAN_WORK_VARIABLES
+        model, work, coverage = build_model(
+            employees, days, constraints, demand, no_gaps, shift_model, symmetry, lean
+        )
+        if cache is not None:
+            cache.put_model(structure_key, model, work, coverage)
+    else:
+        model, work, coverage = load_model(compiled)
+        set_demand(model, coverage, demand)
+
+    index = get_work_index(work, employees, days)
+    if hint is not None:
+        hinted = get_hinted_values(hint, work)
+        if symmetry:
+            groups = get_identical_employees(constraints[:employees], days)
+            hinted = sort_hinted_values(hinted, index, groups)
+        for key, value in hinted.items():
+            model.AddHint(work[key], value)
+        if stability > 0:
+            add_stability_penalty(model, work, hinted, stability)
+
+    build_seconds = time.perf_counter() - build_start
+
+    lower_bound = None
+    if options.stop_at_lower_bound:
+        with metrics.timer("schedule_phase_seconds", phase="bound"):
+            lower_bound = get_lower_bound(employees, days, constraints, demand)
+
+    # Solve the model, stage by stage with objectives.
+    solver = cp_model.CpSolver()
+    if objectives is None:
+        stages = [(None, options)]
+    else:
+        expressions = get_stage_expressions(
+            model,
+            work,
+            employees,
+            days,
+            constraints,
+            objectives,
+            preferences,
+            get_slots_per_hour(slot_minutes),
+        )
+        stages = [
+            (expression, replace(options, time_limit=time_limit))
+            for expression, time_limit in zip(
+                expressions, objectives.get_time_limits(options.time_limit)
+            )
+        ]
+        # The lower bound only holds for the penalty alone
+        weights = objectives.stages[0].weights
+        if {t for t, w in weights.items() if w > 0} == {PENALTY}:
+            lower_bound = (
+                None if lower_bound is None else lower_bound * weights[PENALTY]
+            )
+        else:
+            lower_bound = None
+    response = None
+    results = []
+    solve_seconds = 0
+    for k, (expression, stage_options) in enumerate(stages):
+        if expression is not None:
+            model.Minimize(expression)
+            if response is not None:
+                model.ClearHints()
+                for i, value in enumerate(response.solution):
+                    model.Proto().solution_hint.vars.append(i)
+                    model.Proto().solution_hint.values.append(value)
+        callback = IncumbentCallback(
+            index,
+            on_solution,
+            slot_minutes,
+            lower_bound=lower_bound if k == 0 else None,
+            log_solutions=options.print_solutions,
+        )
+        with stage_options.applied(solver), stopped_by(
+            solver, stop, callback, stage_options.no_improvement_time
+        ):
+            with metrics.timer("schedule_phase_seconds", phase="solve"):
+                status = solver.Solve(model, callback)
+        solve_seconds += solver.WallTime()
+        reason = get_stop_reason(solver, status, callback, stage_options)
+        record_solve(solver, status, model, reason)
+        found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        results.append(
+            {
+                "reason": reason,
+                "objective": solver.ObjectiveValue() if found else None,
+                "bound": solver.BestObjectiveBound() if found else None,
+            }
+        )
+        if not found:
+            break
+        response = solver.ResponseProto()
+        termination = dict(results[-1], lower_bound=lower_bound if k == 0 else None)
+        if reason == STOP_REQUESTED:
+            break
+        if k < len(stages) - 1:
+            # Keep the objective of this stage for the next ones
+            model.Add(expression <= round(solver.ObjectiveValue()))
+    if capture is not None:
+        capture.record(
+            request,
+            model,
+            options,
+            {"build": build_seconds, "solve": solve_seconds},
+            {
+                "status": solver.StatusName(status),
+                "reason": reason,
+                "objective": results[-1]["objective"],
+            },
+        )
+
+    res = dict()
+    res["employees"] = []
+    res["days"] = []
+    solution_found = False
+
+    if response is not None:
+        solution_found = True
+        with metrics.timer("schedule_phase_seconds", phase="extract"):
+            matrix = get_solution_matrix(response.solution, index)
+            res = get_schedule(matrix, slot_minutes)
+        res["termination"] = termination
+        if objectives is not None:
+            res["stages"] = [
+                dict(result, weights=stage.weights)
+                for result, stage in zip(results, objectives.stages)
+            ]
+        if options.print_solutions:
+            logger.info(
+                "schedule",
+                extra={"fields": {"schedule": format_schedule(matrix, days)}},
+            )
+        # A search cut short by its limits or stopped may do better next time
+        final = len(results) == len(stages) and all(
+            result["reason"] in FINAL_REASONS for result in results
+        )
+        if cache is not None and final:
+            cache.put_result(key, res)
+    else:
+        # Tells a request proven infeasible from a search out of time
+        res["termination"] = dict(results[-1], lower_bound=lower_bound)
+
+    return (solution_found, res)
+
+
+def get_stop_reason(solver, status, callback, options: SolverOptions):
+    """Reason the search ended, one of the STOP_* constants."""
+    if callback.reason is not None:
+        return callback.reason
+    if status == cp_model.OPTIMAL:
+        return STOP_OPTIMAL
+    if status == cp_model.INFEASIBLE:
+        return STOP_INFEASIBLE
+    if status == cp_model.FEASIBLE:
+        objective = solver.ObjectiveValue()
+        gap = abs(objective - solver.BestObjectiveBound())
+        if options.absolute_gap_limit is not None and gap <= options.absolute_gap_limit:
+            return STOP_GAP
+        if (
+            options.relative_gap_limit is not None
+            and gap <= options.relative_gap_limit * max(abs(objective), 1)
+        ):
+            return STOP_GAP
+    return STOP_TIME_LIMIT
+
+
+def record_solve(solver, status, model, reason: str):
+    """Records the outcome of a solve in the metrics and the log."""
+    name = solver.StatusName(status)
+    response = solver.ResponseProto()
+    fields = {
+        "status": name,
+        "reason": reason,
+        "wall_time": solver.WallTime(),
+        "deterministic_time": response.deterministic_time,
+        "variables": len(model.Proto().variables),
+        "constraints": len(model.Proto().constraints),
+    }
+    metrics.increment("schedule_solves_total", status=name)
+    metrics.increment("schedule_stops_total", reason=reason)
+    metrics.observe("schedule_solve_wall_seconds", fields["wall_time"])
+    metrics.observe(
+        "schedule_solve_deterministic_seconds", fields["deterministic_time"]
+    )
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        fields["objective"] = solver.ObjectiveValue()
+        fields["best_bound"] = solver.BestObjectiveBound()
+        metrics.observe("schedule_objective", fields["objective"])
+        metrics.observe("schedule_best_bound", fields["best_bound"])
+    logger.info("solve", extra={"fields": fields})
+
+
+def get_demand(
+    days: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    skill_bookings: Optional[List[tuple[int, int, int, str]]] = None,
+):
+    """Number of employees needed on every hour of every day.
+    At least one employee works any given hour, and at least as many as the
+    largest booking on that hour. Skill bookings add the number of employees
+    with a skill needed on a (day, hour, skill) key, for the booked cells
+    only, and count as bookings of their hour as well.
+    """
+    demand = {}
+    for i, d in enumerate(days):
+        for h in range(get_hours(d)):
+            demand[i, h] = 1
+    for d, h, bookings in customer_bookings:
+        if (d, h) not in demand:
+            raise KeyError("Booking outside of the opening hours: %s" % str((d, h)))
+        demand[d, h] = max(demand[d, h], bookings)
+    for d, h, bookings, skill in skill_bookings or []:
+        if (d, h) not in demand:
+            raise KeyError("Booking outside of the opening hours: %s" % str((d, h)))
+        demand[d, h] = max(demand[d, h], bookings)
+        demand[d, h, skill] = max(demand.get((d, h, skill), 0), bookings)
+    return demand
+
+
+def build_model(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    demand,
+    no_gaps: str = NO_GAPS_LINEAR,
+    shift_model: str = SHIFT_MODEL_SEQUENCE,
+    symmetry: bool = True,
+    lean: bool = False,
 ):
-    """Solves the shift scheduling problem."""
+    """Builds the scheduling model.
+    The weekly hours are bounded by the longest shifts the daily constraints
+    allow, and if symmetry is set, the schedules of employees with the same
+    constraints are in decreasing lexicographic order.
+    The time spent resolving the constraints and in every builder, and the
+    size of the model, are recorded in the metrics.
+    Demand keyed by (day, hour, skill) is covered by the employees having the
+    skill only, an employee with several skills counting towards each.
+    lean builds the same model with less time and memory, for large rosters:
+    the variables are unnamed, and the work variables, the clauses of the
+    daily sequences, the no gaps and coverage constraints and the weekly sums
+    are written to the proto by literal index instead of through cp_model
+    objects. work is then a WorkVariables.
+    Returns:
+      a tuple (model, work, coverage) where work maps (employee, day, hour) to
+      its Boolean variable and coverage maps (day, hour), or (day, hour,
+      skill), to the index of the constraint enforcing its demand.
+    """
+    stopwatch = metrics.Stopwatch()
     model = cp_model.CpModel()
 
     # Linear terms of the objective in a minimization context.
@@ -33,121 +499,339 @@ def solve_shift_scheduling(
     obj_bool_vars = []
     obj_bool_coeffs = []
 
+    # Resolve the constraints of every employee
+    with stopwatch.time("resolve"):
+        daily_cts = [
+            get_daily_hour_constraints(constraints[e].get("daily"), days)
+            for e in range(employees)
+        ]
+        weekly_cts = [
+            get_weekly_constraints_for_employee(constraints[e])
+            for e in range(employees)
+        ]
+        groups = get_identical_employees(constraints[:employees], days)
+        skills = [get_employee_skills(constraints[e]) for e in range(employees)]
+
     # Build model
     work = {}
+    with stopwatch.time("variables"):
+        if lean:
+            work = add_work_variables(model, employees, days)
+        else:
+            for e in range(employees):
+                for i, d in enumerate(days):
+                    hours = get_hours(d)
+                    for h in range(hours):
+                        work[e, i, h] = model.NewBoolVar("work%i_%i_%i" % (e, i, h))
+
+    # Shift constraints
     for e in range(employees):
+        for d, day, ct in daily_cts[e]:
+            hours = get_hours(day)
+            if lean and shift_model != SHIFT_MODEL_INTERVAL:
+                works = work.get_literals(e, d, hours)
+            else:
+                works = get_daily_hour_variables_for_employee(work, e, d, hours)
+            if shift_model == SHIFT_MODEL_INTERVAL:
+                with stopwatch.time("add_daily_shift_constraints"):
+                    variables, coeffs = add_daily_shift_constraints(
+                        model, works, ct, e, d, lean
+                    )
+                obj_int_vars.extend(variables)
+                obj_int_coeffs.extend(coeffs)
+            else:
+                with stopwatch.time("add_daily_hour_constraints"):
+                    variables, coeffs = add_daily_hour_constraints(
+                        model, works, ct, e, d, lean
+                    )
+                obj_bool_vars.extend(variables)
+                obj_bool_coeffs.extend(coeffs)
+
+    # Coverage constraints: at least one employee works any given hour any
+    # given day, and at least as many as booked.
+    coverage = {}
+    with stopwatch.time("coverage"):
         for i, d in enumerate(days):
             hours = get_hours(d)
             for h in range(hours):
-                work[e, i, h] = model.NewBoolVar("work%i_%i_%i" % (e, i, h))
+                if lean:
+                    coverage[i, h] = add_linear(
+                        model,
+                        work.index[:, i, h].tolist(),
+                        [1] * employees,
+                        demand[i, h],
+                    )
+                    continue
+                assignments = []
+                for e in range(employees):
+                    assignments.append(work[(e, i, h)])
+                coverage[i, h] = model.Add(sum(assignments) >= demand[i, h]).Index()
 
-    # Shift constraints
-    for e in range(employees):
-        employee_constraints = constraints[e]
-        daily_constraints = employee_constraints.get("daily")
-        cts = get_daily_hour_constraints(daily_constraints, days)
-        for d, day, ct in cts:
-            hours = get_hours(day)
-            works = get_daily_hour_variables_for_employee(work, e, d, hours)
-            variables, coeffs = add_daily_hour_constraints(model, works, ct, e, d)
-            obj_bool_vars.extend(variables)
-            obj_bool_coeffs.extend(coeffs)
-
-    # Booking constraints
-    for booking in customer_bookings:
-        d, h, bookings = booking
-        workingEmployees = []
-        for e in range(employees):
-            workingEmployees.append(work[(e, d, h)])
-        model.Add(sum(workingEmployees) >= bookings)
+    # Skill coverage: only the booked (day, hour, skill) cells, over the
+    # employees having the skill
+    with stopwatch.time("skill_coverage"):
+        qualified = {}
+        for key in sorted(key for key in demand if len(key) == 3):
+            i, h, skill = key
+            if skill not in qualified:
+                qualified[skill] = [e for e in range(employees) if skill in skills[e]]
+            assignments = [work[e, i, h] for e in qualified[skill]]
+            # LinearExpr.Sum keeps a constraint even without qualified employees
+            coverage[key] = model.Add(
+                cp_model.LinearExpr.Sum(assignments) >= demand[key]
+            ).Index()
 
     # Weekly hour constraints
     for e in range(employees):
-        employee_constraints = constraints[e]
-        ct = get_weekly_constraints_for_employee(employee_constraints)
-        totalHours = get_weekly_hour_variables_for_employee(e, days, work)
-        variables, coeffs = add_weekly_constraint(model, ct, totalHours, e)
+        ct = weekly_cts[e]
+        if lean:
+            totalHours = work.index[e][work.index[e] >= 0].tolist()
+        else:
+            totalHours = get_weekly_hour_variables_for_employee(e, days, work)
+        available = sum(
+            get_daily_max(daily, get_hours(d)) for _, d, daily in daily_cts[e]
+        )
+        with stopwatch.time("add_weekly_constraint"):
+            variables, coeffs = add_weekly_constraint(
+                model, ct, totalHours, e, available, lean
+            )
         obj_int_vars.extend(variables)
         obj_int_coeffs.extend(coeffs)
 
-    # At least one employee works any given hour any given day
-    for i, d in enumerate(days):
-        hours = get_hours(d)
-        for h in range(hours):
-            assignments = []
-            for e in range(employees):
-                assignments.append(work[(e, i, h)])
-            model.AddAtLeastOne(assignments)
+    # No gaps in the middle of a shift, implied by the interval model
+    if shift_model != SHIFT_MODEL_INTERVAL:
+        for e in range(employees):
+            for i, d in enumerate(days):
+                hours = get_hours(d)
+                if no_gaps == NO_GAPS_LINEAR and lean:
+                    with stopwatch.time("add_compact_no_gaps_constraint"):
+                        add_compact_no_gaps_constraint(
+                            model, work.get_literals(e, i, hours), lean
+                        )
+                    continue
+                dailyHours = []
+                for h in range(hours):
+                    dailyHours.append(work[(e, i, h)])
+                if no_gaps == NO_GAPS_LINEAR:
+                    with stopwatch.time("add_compact_no_gaps_constraint"):
+                        add_compact_no_gaps_constraint(model, dailyHours)
+                else:
+                    with stopwatch.time("add_no_gaps_constraint"):
+                        add_no_gaps_constraint(model, dailyHours, lean)
 
-    # No gaps in the middle of a shift
-    for e in range(employees):
-        for i, d in enumerate(days):
-            hours = get_hours(d)
-            dailyHours = []
-            for h in range(hours):
-                dailyHours.append(work[(e, i, h)])
-            add_no_gaps_constraint(model, dailyHours)
+    # Symmetry breaking between interchangeable employees
+    if symmetry:
+        with stopwatch.time("add_lexicographic_constraint"):
+            for group in groups:
+                for first, second in zip(group, group[1:]):
+                    add_lexicographic_constraint(
+                        model,
+                        get_weekly_hour_variables_for_employee(first, days, work),
+                        get_weekly_hour_variables_for_employee(second, days, work),
+                    )
 
     # Objective
-    model.Minimize(
-        sum(obj_bool_vars[i] * obj_bool_coeffs[i] for i in range(len(obj_bool_vars)))
-        + sum(obj_int_vars[i] * obj_int_coeffs[i] for i in range(len(obj_int_vars)))
+    with stopwatch.time("objective"):
+        # In bulk, rather than a Python sum of products
+        model.Minimize(
+            cp_model.LinearExpr.WeightedSum(
+                obj_bool_vars + obj_int_vars, obj_bool_coeffs + obj_int_coeffs
+            )
+        )
+
+    metrics.observe(
+        "schedule_phase_seconds", stopwatch.totals.pop("resolve"), phase="resolve"
     )
+    metrics.observe(
+        "schedule_phase_seconds", sum(stopwatch.totals.values()), phase="build"
+    )
+    stopwatch.observe("schedule_build_seconds", "builder")
+    proto = model.Proto()
+    metrics.observe("schedule_model_variables", len(proto.variables))
+    metrics.observe("schedule_model_constraints", len(proto.constraints))
+    return model, work, coverage
 
-    # Solve the model.
-    solver = cp_model.CpSolver()
-    solution_printer = cp_model.ObjectiveSolutionPrinter()
-    solver.parameters.max_time_in_seconds = 5
-    status = solver.Solve(model, solution_printer)
 
-    res = dict()
-    res["employees"] = []
-    res["days"] = []
-    solution_found = False
+def add_work_variables(model, employees: int, days: List[Dict]):
+    """Work variables of the lean build mode, added to the proto at once in
+    the order of the (employee, day, hour) keys.
+    """
+    hours = [get_hours(d) for d in days]
+    index = np.full((employees, len(days), max(hours, default=0)), -1, np.int64)
+    mask = np.arange(index.shape[2]) < np.array(hours, dtype=np.int64)[:, None]
+    mask = np.broadcast_to(mask, index.shape)
+    variables = model.Proto().variables
+    count = int(np.count_nonzero(mask))
+    index[mask] = np.arange(len(variables), len(variables) + count)
+    for _ in range(count):
+        variables.add().domain.extend((0, 1))
+    return WorkVariables(model, index)
 
-    # Print solution.
-    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-        solution_found = True
-        for i, d in enumerate(days):
-            print("\nDAY %i" % (i + 1))
-            header = "          "
-            header += "8  9  10 11 12 13 14 15 16 17 18 19"
-            print(header)
-            workers = []
-            for e in range(employees):
-                schedule = ""
-                hours = []
-                hoursOfTheDay = get_hours(d)
-                for h in range(hoursOfTheDay):
-                    if solver.BooleanValue(work[(e, i, h)]):
-                        schedule += "X" + "  "
-                        hours.append(h)
-                    else:
-                        schedule += "." + "  "
-                print("worker %i: %s" % (e, schedule))
-                workers.append({"id": e, "hours": hours})
-            res["days"].append({"id": d, "workers": workers})
-
-        print("\n")
-        for e in range(employees):
-            hours = 0
-            for i, d in enumerate(days):
-                hoursOfTheDay = get_hours(d)
-                for h in range(hoursOfTheDay):
-                    if solver.BooleanValue(work[((e, i, h))]):
-                        hours += 1
-            print("Employee %i worked %i hours" % (e, hours))
-            res["employees"].append({e: hours})
-
-    print(solution_found)
-    return (solution_found, res)
 
+def set_demand(model, coverage: Dict, demand: Dict):
+    """Patches the lower bounds of the coverage constraints in place."""
+    proto = model.Proto()
+    for key, index in coverage.items():
+        proto.constraints[index].linear.domain[0] = demand[key]
+
+
+def get_hinted_values(hint: List[Dict], work: Dict):
+    """Values of the work variables in a previous schedule.
+    Days and employees missing from the hint, or no longer in the model, are
+    left out. Workers of a schedule in slots give their "slots" instead of
+    their "hours".
+    """
+    hinted = {}
+    for day in hint:
+        i = day["id"]
+        for worker in day["workers"]:
+            e = worker["id"]
+            if (e, i, 0) not in work:
+                continue
+            hours = set(worker["slots"] if "slots" in worker else worker["hours"])
+            h = 0
+            while (e, i, h) in work:
+                hinted[e, i, h] = 1 if h in hours else 0
+                h += 1
+    return hinted
+
+
+def sort_hinted_values(hinted: Dict, index, groups: List[List[int]]):
+    """Hinted values with the schedules of every group of interchangeable
+    employees swapped into the order required by the symmetry breaking.
+    Args:
+      index: the array of the work variables returned by get_work_index.
+    """
+    hinted = dict(hinted)
+    for group in groups:
+        keys = [
+            [(e, int(i), int(h)) for i, h in zip(*np.nonzero(index[e] >= 0))]
+            for e in group
+        ]
+        rows = [tuple(hinted.get(key, 0) for key in row) for row in keys]
+        for row, values in zip(keys, sorted(rows, reverse=True)):
+            hinted.update(zip(row, values))
+    return hinted
+
+
+def add_stability_penalty(model, work: Dict, hinted: Dict, weight: int):
+    """Penalizes every hour assigned differently from the hinted values.
+    The terms are added to the objective of the model in place, so that this
+    works on cached models as well.
+    """
+    objective = model.Proto().objective
+    for key, value in hinted.items():
+        index = work[key].Index()
+        objective.vars.append(index)
+        if value:
+            # weight * (1 - x)
+            objective.coeffs.append(-weight)
+            objective.offset += weight
+        else:
+            objective.coeffs.append(weight)
+
+
+class IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """Follows the improving solutions of a search.
+    Every solution is passed to on_solution if given, and logged if
+    log_solutions is set. The time of the last one is kept for the no
+    improvement watchdog of stopped_by, and the search is stopped at a
+    solution reaching lower_bound.
+    """
+
+    def __init__(
+        self,
+        index,
+        on_solution: Optional[Callable[[Dict], None]] = None,
+        slot_minutes: int = HOUR,
+        lower_bound: Optional[int] = None,
+        log_solutions: bool = False,
+    ):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.index = index
+        self.on_solution = on_solution
+        self.slot_minutes = slot_minutes
+        self.lower_bound = lower_bound
+        self.log_solutions = log_solutions
+        self.last_improvement = None
+        # Reason the search was stopped, set when it is stopped from here or
+        # by stopped_by
+        self.reason = None
+
+    def on_solution_callback(self):
+        self.last_improvement = time.monotonic()
+        objective = self.ObjectiveValue()
+        if self.lower_bound is not None and objective <= self.lower_bound:
+            self.reason = STOP_LOWER_BOUND
+            self.StopSearch()
+        if self.log_solutions:
+            logger.info(
+                "solution",
+                extra={"fields": {"objective": objective, "time": self.WallTime()}},
+            )
+        if self.on_solution is None:
+            return
+        matrix = get_solution_matrix(self.Response().solution, self.index)
+        self.on_solution(
+            {
+                "objective": self.ObjectiveValue(),
+                "bound": self.BestObjectiveBound(),
+                "time": self.WallTime(),
+                "res": get_schedule(matrix, self.slot_minutes),
+            }
+        )
 
-def add_no_gaps_constraint(model, vars):
-    # Channeling constraints
+
+@contextlib.contextmanager
+def stopped_by(
+    solver,
+    stop: Optional[threading.Event],
+    callback: Optional[IncumbentCallback] = None,
+    no_improvement_time: Optional[float] = None,
+):
+    """Stops the search of solver once stop is set, or once callback has seen
+    no better solution for no_improvement_time seconds, from a watcher thread.
+    """
+    if callback is None:
+        no_improvement_time = None
+    if stop is None and no_improvement_time is None:
+        yield solver
+        return
+    done = threading.Event()
+    # CpSolver.StopSearch does nothing during Solve in OR-Tools 9.6, while
+    # the StopSearch of a solution callback of the search does
+    stopper = solver if callback is None else callback
+
+    def watch():
+        # Keep stopping: a stop before the search has started would be lost
+        while not done.wait(STOP_POLL_INTERVAL):
+            if stop is not None and stop.is_set():
+                if callback is not None and callback.reason is None:
+                    callback.reason = STOP_REQUESTED
+                stopper.StopSearch()
+            elif (
+                no_improvement_time is not None
+                and callback.last_improvement is not None
+                and time.monotonic() - callback.last_improvement >= no_improvement_time
+            ):
+                if callback.reason is None:
+                    callback.reason = STOP_NO_IMPROVEMENT
+                stopper.StopSearch()
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        yield solver
+    finally:
+        done.set()
+        watcher.join()
+
+
+def add_no_gaps_constraint(model, vars, lean: bool = False):
+    # Channeling constraints, with unnamed variables if lean
     true_to_false = []
     for i in range(len(vars) - 1):
-        true_to_false.append(model.NewBoolVar("helper%i" % i))
+        true_to_false.append(model.NewBoolVar("" if lean else "helper%i" % i))
 
     model.Add(sum(true_to_false) <= 1)
     for i in range(len(vars) - 1):
@@ -159,7 +843,7 @@ def add_no_gaps_constraint(model, vars):
 
     false_to_true = []
     for i in range(len(vars) - 1):
-        false_to_true.append(model.NewBoolVar("helper_2%i" % i))
+        false_to_true.append(model.NewBoolVar("" if lean else "helper_2%i" % i))
         model.Add(sum(false_to_true) <= 1)
 
     for i in range(len(vars) - 1):
@@ -176,23 +860,75 @@ def add_no_gaps_constraint(model, vars):
     return true_to_false, false_to_true
 
 
-def main(_=None):
-    employees = json.loads(sys.argv[1])
-    days = json.loads(sys.argv[2])
-    constraints = json.loads(sys.argv[3])
-    customer_bookings = sys.argv[4]
+def add_compact_no_gaps_constraint(model, vars, lean: bool = False):
+    """Linear size encoding of the no gaps constraint.
+    A shift starts on every hour worked right after an hour off (or at the
+    start of the day). Allowing at most one start leaves a single contiguous
+    block of true variables, or none.
+    Args:
+      model: the constraint is built on this model.
+      vars: the Boolean variables of the hours of a day, in order, or their
+        literal indexes if lean.
+      lean: write the constraints to the proto, with unnamed variables.
+    Returns:
+      the list of start indicator variables, literal indexes if lean.
+    """
+    starts = []
+    for i in range(len(vars)):
+        if lean:
+            start = model.NewBoolVar("").Index()
+        else:
+            start = model.NewBoolVar("start%i" % i)
+        if i == 0:
+            # vars[0] => start
+            if lean:
+                implication = model.Proto().constraints.add()
+                implication.enforcement_literal.append(vars[0])
+                implication.bool_or.literals.append(start)
+            else:
+                model.AddImplication(vars[0], start)
+        else:
+            # (vars[i] and not vars[i - 1]) => start
+            add_clause(model, [negate(vars[i]), vars[i - 1], start], lean)
+        starts.append(start)
+    if lean:
+        model.Proto().constraints.add().at_most_one.literals.extend(starts)
+    else:
+        model.AddAtMostOne(starts)
+    return starts
 
-    print("Days: " + str(days))
-    customer_bookings_array = list(map(int, customer_bookings.split(",")))
-    print("Bookings: " + str(customer_bookings_array))
 
+def main(argv):
+    employees = json.loads(argv[1])
+    days = json.loads(argv[2])
+    constraints = json.loads(argv[3])
+    customer_bookings = argv[4]
+
+    customer_bookings_array = list(map(int, customer_bookings.split(",")))
     customer_bookings_tuple_array = [
         tuple(customer_bookings_array[i : i + 3])
         for i in range(0, len(customer_bookings_array), 3)
     ]
-    print(customer_bookings_tuple_array)
+    logger.info(
+        "request",
+        extra={"fields": {"days": days, "bookings": customer_bookings_tuple_array}},
+    )
 
-    solve_shift_scheduling(employees, days, constraints, customer_bookings_tuple_array)
+    options = SolverOptions(
+        time_limit=FLAGS.time_limit,
+        num_search_workers=FLAGS.num_search_workers,
+        relative_gap_limit=FLAGS.relative_gap_limit,
+        absolute_gap_limit=FLAGS.absolute_gap_limit,
+        no_improvement_time=FLAGS.no_improvement_time,
+        stop_at_lower_bound=FLAGS.stop_at_lower_bound,
+        random_seed=FLAGS.random_seed,
+        log_path=FLAGS.log_path,
+        deterministic=FLAGS.deterministic,
+        print_solutions=True,
+    )
+    solve_shift_scheduling(
+        employees, days, constraints, customer_bookings_tuple_array, options=options
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""Independent checks of a schedule against its request.
+Nothing here goes through a model: the hours of every worker are read from
+the response format and compared with the bounds the constraints resolve to,
+so that a schedule returned by any encoding of the solver, or by the draft,
+can be checked and its penalty recomputed on its own.
+"""
+from typing import Dict, List, Optional
+
+from .constraints import (
+    get_daily_hour_constraints,
+    get_employee_skills,
+    get_weekly_constraints_for_employee,
+)
+from .utils import get_hours
+
+
+def get_worked_hours(employees: int, days: List[Dict], schedule: List[Dict]):
+    """Hours worked by every employee on every day of a schedule in the
+    format of res["days"], as sorted lists. Missing workers work no hours.
+    """
+    worked = [[[] for _ in days] for _ in range(employees)]
+    for day in schedule:
+        for worker in day["workers"]:
+            worked[worker["id"]][day["id"]] = sorted(worker["hours"])
+    return worked
+
+
+def validate_schedule(
+    employees: int,
+    days: List[Dict],
+    constraints: List[Dict],
+    customer_bookings: List[tuple[int, int, int]],
+    schedule: List[Dict],
+    skill_bookings: Optional[List[tuple[int, int, int, str]]] = None,
+):
+    """Hard constraints of a request a schedule breaks.
+    Every open hour needs a worker and as many as its largest booking, skill
+    bookings as many workers with the skill, every shift is a single block
+    of hours within the daily hard bounds, and the weekly hours are within
+    the weekly hard bounds.
+    Args:
+      schedule: the "days" of a res, in hours.
+    Returns:
+      a list of reasons like check_request, empty if the schedule is valid.
+    """
+    reasons = []
+    worked = get_worked_hours(employees, days, schedule)
+    needed = {}
+    for i, day in enumerate(days):
+        for h in range(get_hours(day)):
+            needed[i, h, None] = 1
+    for d, h, bookings in customer_bookings:
+        needed[d, h, None] = max(needed.get((d, h, None), 1), bookings)
+    for d, h, bookings, skill in skill_bookings or []:
+        needed[d, h, None] = max(needed.get((d, h, None), 1), bookings)
+        needed[d, h, skill] = max(needed.get((d, h, skill), 0), bookings)
+    skills = [get_employee_skills(constraints[e]) for e in range(employees)]
+    for (d, h, skill), n in needed.items():
+        staff = [
+            e
+            for e in range(employees)
+            if h in worked[e][d] and (skill is None or skill in skills[e])
+        ]
+        if len(staff) < n:
+            reason = {
+                "reason": "coverage",
+                "day": d,
+                "hour": h,
+                "message": "Day %i hour %i has %i workers but needs %i"
+                % (d, h, len(staff), n),
+            }
+            if skill is not None:
+                reason["skill"] = skill
+            reasons.append(reason)
+
+    for e in range(employees):
+        for d, day, ct in get_daily_hour_constraints(constraints[e].get("daily"), days):
+            hours = worked[e][d]
+            if not hours:
+                continue
+            if hours[0] < 0 or hours[-1] >= get_hours(day):
+                reasons.append(
+                    {
+                        "reason": "closed",
+                        "employee": e,
+                        "day": d,
+                        "message": "Employee %i works outside of the hours of "
+                        "day %i" % (e, d),
+                    }
+                )
+            if hours != list(range(hours[0], hours[-1] + 1)):
+                reasons.append(
+                    {
+                        "reason": "gaps",
+                        "employee": e,
+                        "day": d,
+                        "message": "The shift of employee %i on day %i has gaps"
+                        % (e, d),
+                    }
+                )
+            hard_min, hard_max = ct[0], ct[4]
+            if not max(hard_min, 1) <= len(hours) <= hard_max:
+                reasons.append(
+                    {
+                        "reason": "daily",
+                        "employee": e,
+                        "day": d,
+                        "message": "Employee %i works %i hours on day %i, not "
+                        "between %i and %i" % (e, len(hours), d, hard_min, hard_max),
+                    }
+                )
+        hard_min, _, _, _, hard_max, _ = get_weekly_constraints_for_employee(
+            constraints[e]
+        )
+        total = sum(len(hours) for hours in worked[e])
+        if not hard_min <= total <= hard_max:
+            reasons.append(
+                {
+                    "reason": "weekly",
+                    "employee": e,
+                    "message": "Employee %i works %i hours, not between %i and %i"
+                    % (e, total, hard_min, hard_max),
+                }
+            )
+    return reasons
+
+
+def get_daily_penalty(ct, length: int):
+    """Penalty of a shift of length hours under daily constraints ct."""
+    if length == 0:
+        return 0
+    _, soft_min, min_cost, soft_max, _, max_cost = ct
+    return min_cost * max(0, soft_min - length) + max_cost * max(0, length - soft_max)
+
+
+def get_weekly_penalty(ct, total: int):
+    """Penalty of total weekly hours under weekly constraints ct."""
+    _, soft_min, min_cost, soft_max, _, max_cost = ct
+    return min_cost * max(0, soft_min - total) + max_cost * max(0, total - soft_max)
+
+
+def get_schedule_penalty(
+    employees: int, days: List[Dict], constraints: List[Dict], schedule: List[Dict]
+):
+    """Penalty of the soft limits of a valid schedule, the objective the
+    solver minimizes without stability or objectives.
+    """
+    worked = get_worked_hours(employees, days, schedule)
+    penalty = 0
+    for e in range(employees):
+        for d, _, ct in get_daily_hour_constraints(constraints[e].get("daily"), days):
+            penalty += get_daily_penalty(ct, len(worked[e][d]))
+        penalty += get_weekly_penalty(
+            get_weekly_constraints_for_employee(constraints[e]),
+            sum(len(hours) for hours in worked[e]),
+        )
+    return penalty
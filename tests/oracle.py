@@ -0,0 +1,152 @@
+"""Brute-force oracle for small scheduling requests, and random requests to
+compare it with the solver.
+Every employee works a single block of hours a day, so all the schedules of
+an employee are enumerated by their (start, length) on every day. Schedules
+covering the same hours are interchangeable but for their penalty, so only
+the cheapest one is kept, and the employees are then combined depth first,
+pruning on the coverage still reachable and on the best penalty so far.
+"""
+import itertools
+import random
+
+from model.constraints import (
+    SLOT_SOFT_MAX,
+    SLOT_SOFT_MIN,
+    get_daily_hour_constraints,
+    get_weekly_constraints_for_employee,
+)
+from model.utils import get_hours
+from model.validation import get_daily_penalty, get_weekly_penalty
+
+
+def get_shifts(ct, hours: int):
+    """(start, length) of the shifts allowed by daily constraints ct, the
+    day off being (0, 0).
+    """
+    hard_min, _, _, _, hard_max, _ = ct
+    shifts = [(0, 0)]
+    for length in range(max(hard_min, 1), min(hard_max, hours) + 1):
+        shifts.extend((start, length) for start in range(hours - length + 1))
+    return shifts
+
+
+def get_employee_options(employee_constraints, days):
+    """Cheapest schedule of an employee for every set of hours they can
+    cover within their hard bounds.
+    Returns:
+      a dict mapping frozensets of (day, hour) to (penalty, shifts).
+    """
+    cts = get_daily_hour_constraints(employee_constraints.get("daily"), days)
+    weekly = get_weekly_constraints_for_employee(employee_constraints)
+    options = {}
+    for shifts in itertools.product(
+        *(get_shifts(ct, get_hours(day)) for _, day, ct in cts)
+    ):
+        total = sum(length for _, length in shifts)
+        if not weekly[0] <= total <= weekly[4]:
+            continue
+        penalty = get_weekly_penalty(weekly, total) + sum(
+            get_daily_penalty(ct, length)
+            for (_, _, ct), (_, length) in zip(cts, shifts)
+        )
+        cells = frozenset(
+            (d, h)
+            for d, (start, length) in enumerate(shifts)
+            for h in range(start, start + length)
+        )
+        if cells not in options or penalty < options[cells][0]:
+            options[cells] = (penalty, shifts)
+    return options
+
+
+def solve_brute_force(employees, days, constraints, customer_bookings):
+    """Optimal schedule of a small request, by enumeration.
+    Returns:
+      a tuple (penalty, schedule), schedule being the shifts of every
+      employee, or (None, None) if the request is infeasible.
+    """
+    demand = {(d, h): 1 for d, day in enumerate(days) for h in range(get_hours(day))}
+    for d, h, bookings in customer_bookings:
+        demand[d, h] = max(demand[d, h], bookings)
+    options = [
+        sorted(get_employee_options(constraints[e], days).items(), key=lambda o: o[1])
+        for e in range(employees)
+    ]
+    # Most workers the employees from e on can put on every hour
+    reachable = [dict.fromkeys(demand, 0) for _ in range(employees + 1)]
+    for e in reversed(range(employees)):
+        covered = set().union(*(cells for cells, _ in options[e]))
+        for key in demand:
+            reachable[e][key] = reachable[e + 1][key] + (key in covered)
+    cheapest = [min((p for _, (p, _) in o), default=0) for o in options] + [0]
+    remaining = [sum(cheapest[e:]) for e in range(employees + 1)]
+    best = [None, None]
+
+    def search(e, staff, penalty, shifts):
+        if best[0] is not None and penalty + remaining[e] >= best[0]:
+            return
+        if any(staff[key] + reachable[e][key] < n for key, n in demand.items()):
+            return
+        if e == employees:
+            best[:] = [penalty, list(shifts)]
+            return
+        for cells, (cost, employee_shifts) in options[e]:
+            for key in cells:
+                staff[key] += 1
+            search(e + 1, staff, penalty + cost, shifts + [employee_shifts])
+            for key in cells:
+                staff[key] -= 1
+
+    search(0, dict.fromkeys(demand, 0), 0, [])
+    return tuple(best)
+
+
+def get_random_daily(rng: random.Random):
+    """Daily constraints with random and sometimes missing or inconsistent
+    bounds. Requests in hours have fixed daily soft bounds, so they are set
+    through the keys of the constraints in slots, to vary the penalties.
+    """
+    ct = {}
+    for key, values in (
+        ("hard_min", range(0, 4)),
+        (SLOT_SOFT_MIN, range(0, 5)),
+        (SLOT_SOFT_MAX, range(0, 5)),
+        ("hard_max", range(1, 6)),
+    ):
+        if rng.random() < 0.9:
+            ct[key] = rng.choice(values)
+    return ct
+
+
+def get_random_request(rng: random.Random):
+    """Request of 1 to 3 employees over 1 to 3 days of 1 to 5 hours, small
+    enough for solve_brute_force.
+    """
+    employees = rng.randint(1, 3)
+    days = [
+        {"hours": rng.randint(1, 5), "minutes": 0} for _ in range(rng.randint(1, 3))
+    ]
+    constraints = []
+    for _ in range(employees):
+        daily = {}
+        if rng.random() < 0.9:
+            daily["defaults"] = get_random_daily(rng)
+        if rng.random() < 0.3:
+            daily[str(rng.randrange(len(days)))] = get_random_daily(rng)
+        weekly = {"hard_min": rng.randint(0, 3), "hard_max": rng.randint(2, 8)}
+        if rng.random() < 0.8:
+            weekly["soft_min"] = rng.randint(0, 6)
+            weekly["soft_max"] = rng.randint(0, 8)
+        constraints.append({"weekly": weekly, "daily": daily})
+    bookings = [
+        (d, h, rng.randint(1, employees + (rng.random() < 0.1)))
+        for d, day in enumerate(days)
+        for h in range(day["hours"])
+        if rng.random() < 0.3
+    ]
+    return {
+        "employees": employees,
+        "days": days,
+        "constraints": constraints,
+        "customer_bookings": bookings,
+    }
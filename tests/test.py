@@ -1,6 +1,6 @@
 import unittest
 from ortools.sat.python import cp_model
-from model.solver import add_no_gaps_constraint
+from model.solver import add_compact_no_gaps_constraint, add_no_gaps_constraint
 
 
 class SolutionPrinter(cp_model.CpSolverSolutionCallback):
@@ -71,5 +71,74 @@ class TestNoGapsConstraint(unittest.TestCase):
         assert status == cp_model.INFEASIBLE
 
 
+class AssignmentCollector(cp_model.CpSolverSolutionCallback):
+    def __init__(self, bool_vars):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.bool_vars = bool_vars
+        self.assignments = set()
+
+    def on_solution_callback(self):
+        self.assignments.add(tuple(self.Value(x) for x in self.bool_vars))
+
+
+def get_assignments(add_constraint, length):
+    model = cp_model.CpModel()
+    vars = [model.NewBoolVar("test_var%i" % i) for i in range(length)]
+    add_constraint(model, vars)
+    solver = cp_model.CpSolver()
+    solver.parameters.enumerate_all_solutions = True
+    collector = AssignmentCollector(vars)
+    solver.Solve(model, collector)
+    return collector.assignments
+
+
+class TestCompactNoGapsConstraint(unittest.TestCase):
+    def test_gap_constraint(self):
+        model = cp_model.CpModel()
+        vars = [model.NewBoolVar("test_var%i" % i) for i in range(10)]
+        model.Add(vars[1] == 1)
+        add_compact_no_gaps_constraint(model, vars)
+        model.Add(sum(vars) == 6)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.enumerate_all_solutions = True
+        collector = AssignmentCollector(vars)
+        status = solver.Solve(model, collector)
+
+        assert status == cp_model.OPTIMAL
+        # The block of 6 hours starts on hour 0 or 1
+        assert collector.assignments == {
+            (1, 1, 1, 1, 1, 1, 0, 0, 0, 0),
+            (0, 1, 1, 1, 1, 1, 1, 0, 0, 0),
+        }
+
+    def test_gap_constraint_infeasible(self):
+        model = cp_model.CpModel()
+        vars = [model.NewBoolVar("test_var%i" % i) for i in range(10)]
+        model.Add(vars[1] == 1)
+        model.Add(vars[9] == 1)
+        add_compact_no_gaps_constraint(model, vars)
+        model.Add(sum(vars) == 6)
+
+        solver = cp_model.CpSolver()
+        status = solver.Solve(model)
+
+        assert status == cp_model.INFEASIBLE
+
+    def test_equivalent_encodings(self):
+        for length in range(1, 8):
+            # Every single block of true variables, and all false
+            expected = {tuple([0] * length)}
+            for start in range(length):
+                for end in range(start + 1, length + 1):
+                    expected.add(
+                        tuple(1 if start <= i < end else 0 for i in range(length))
+                    )
+            compact = get_assignments(add_compact_no_gaps_constraint, length)
+            quadratic = get_assignments(add_no_gaps_constraint, length)
+            assert compact == expected
+            assert quadratic == expected
+
+
 if __name__ == "__main__":
     unittest.main()
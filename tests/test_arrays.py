@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from benchmarks.generator import generate_request, to_arguments
+from model.arrays import (
+    get_arrays_from_request,
+    get_request_from_arrays,
+    load_npz,
+    normalize_arrays,
+    save_npz,
+)
+from model.cache import canonical_request
+from model.solver import get_demand
+
+
+def get_canonical(request):
+    demand = get_demand(request["days"], request["customer_bookings"])
+    return canonical_request(
+        request["employees"], request["days"], request["constraints"], demand
+    )
+
+
+class TestArrays(unittest.TestCase):
+    def test_round_trip(self):
+        for seed in range(3):
+            request = to_arguments(generate_request(seed, 8, 7, 10, 0.5, 0.2))
+            request["constraints"][0]["daily"]["defaults"] = {"hard_max": 5}
+            request["constraints"][1]["daily"]["2"] = {"hard_min": 12}
+            arrays = load_npz(save_npz(get_arrays_from_request(**request)))
+            parsed, options = get_request_from_arrays(arrays)
+            self.assertIsNone(options)
+            self.assertEqual(get_canonical(parsed), get_canonical(request))
+
+    def test_defaults(self):
+        arrays = {"hours": np.array([8, 4]), "num_employees": np.array(2)}
+        request, _ = get_request_from_arrays(arrays)
+        self.assertEqual(request["employees"], 2)
+        self.assertEqual(request["days"][1], {"hours": 4, "minutes": 0})
+        self.assertEqual(request["constraints"], [{"daily": {}}, {"daily": {}}])
+        self.assertEqual(request["customer_bookings"], [])
+
+    def test_normalize(self):
+        normalized = normalize_arrays(
+            {
+                "hours": np.array([8, 4]),
+                "daily_min": np.array([[-1, 6], [2, -1]]),
+                "daily_max": np.array([[-1, 9], [-1, 0]]),
+                "weekly": np.array([[40, -1, -1, 20], [-1, -1, -1, -1]]),
+            }
+        )
+        np.testing.assert_array_equal(normalized["daily_set"], [[0, 1], [1, 1]])
+        # Clamped to the day, then hard_min to hard_max
+        np.testing.assert_array_equal(normalized["daily_max"][:, 1], [4, 0])
+        np.testing.assert_array_equal(normalized["daily_min"][:, 1], [4, 0])
+        self.assertEqual(normalized["weekly"][0, 0], 20)
+        np.testing.assert_array_equal(normalized["weekly_set"], [True, False])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            normalize_arrays({"num_employees": np.array(1)})
+        with self.assertRaises(ValueError):
+            normalize_arrays({"hours": np.array([8.0]), "num_employees": np.array(1)})
+        with self.assertRaises(ValueError):
+            normalize_arrays({"hours": np.array([8]), "weekly": np.zeros((2, 3), int)})
+        with self.assertRaises(ValueError):
+            normalize_arrays(
+                {
+                    "hours": np.array([8]),
+                    "num_employees": 1,
+                    "demand": -np.ones((1, 8), int),
+                }
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from model.batch import apply_delta, solve_batch, solve_scenario
+from model.cache import ModelCache
+from model.options import SolverOptions
+
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+REQUEST = {
+    "employees": 2,
+    "days": [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}],
+    "constraints": [
+        {"weekly": WEEKLY, "daily": {}},
+        {"weekly": WEEKLY, "daily": {}},
+    ],
+    "customer_bookings": [(0, 3, 2), (1, 2, 1)],
+}
+
+
+class TestApplyDelta(unittest.TestCase):
+    def test_employees(self):
+        variant = apply_delta(REQUEST, {"employees": 3, "constraints": {"0": {}}})
+        self.assertEqual(variant["employees"], 3)
+        self.assertEqual(variant["constraints"], [{}, REQUEST["constraints"][1], {}])
+        variant = apply_delta(REQUEST, {"employees": 1})
+        self.assertEqual(variant["constraints"], REQUEST["constraints"][:1])
+        # The base is left untouched
+        self.assertEqual(REQUEST["employees"], 2)
+        self.assertEqual(len(REQUEST["constraints"]), 2)
+
+    def test_invalid(self):
+        for delta in (
+            {"constraints": {"2": {}}},
+            {"employees": 3, "constraints": {"3": {}}},
+            {"constraints": {"-1": {}}},
+            {"constraints": {"first": {}}},
+            {"employees": 0},
+        ):
+            with self.assertRaises(ValueError, msg=delta):
+                apply_delta(REQUEST, delta)
+
+    def test_bookings(self):
+        variant = apply_delta(
+            REQUEST,
+            {"customer_bookings": [(0, 3, 1), (1, 5, 1)], "booking_factor": {"1": 2}},
+        )
+        self.assertEqual(
+            sorted(variant["customer_bookings"]), [(0, 3, 1), (1, 2, 2), (1, 5, 2)]
+        )
+
+
+class TestSolveBatch(unittest.TestCase):
+    def test_batch(self):
+        deltas = [
+            {"name": "more bookings", "booking_factor": {"0": 2}},
+            {
+                "name": "more staff",
+                "employees": 3,
+                "constraints": {"2": REQUEST["constraints"][0]},
+            },
+            {"name": "too many bookings", "customer_bookings": [(0, 0, 5)]},
+        ]
+        options = SolverOptions(time_limit=5, num_search_workers=2)
+        results = solve_batch(REQUEST, deltas, options=options)
+        self.assertTrue(results["base"]["success"])
+        scenarios = results["scenarios"]
+        self.assertEqual([r["name"] for r in scenarios], [d["name"] for d in deltas])
+        # Doubled bookings of 2 can't be staffed by 2 employees
+        self.assertFalse(scenarios[0]["success"])
+        self.assertEqual(scenarios[0]["res"]["reasons"][0]["reason"], "booking_staff")
+        self.assertTrue(scenarios[1]["success"])
+        self.assertEqual(len(scenarios[1]["res"]["employees"]), 3)
+        self.assertFalse(scenarios[2]["success"])
+        for r in [results["base"]] + scenarios:
+            self.assertGreaterEqual(r["time"], 0)
+
+    def test_cached_scenario(self):
+        # The base is solved again from the cache, without new solutions
+        options = SolverOptions(time_limit=5, num_search_workers=1)
+        cache = ModelCache()
+        first = solve_scenario("base", REQUEST, options, cache)
+        second = solve_scenario("base", REQUEST, options, cache)
+        self.assertEqual(len(cache.results), 1)
+        self.assertIsNotNone(first["objective"])
+        self.assertEqual(second["objective"], first["objective"])
+
+    def test_single_process(self):
+        deltas = [{"customer_bookings": [(1, 0, 2)]}]
+        results = solve_batch(REQUEST, deltas, processes=1)
+        scenario = results["scenarios"][0]
+        self.assertEqual(scenario["name"], "scenario 0")
+        self.assertTrue(scenario["success"])
+        workers = scenario["res"]["days"][1]["workers"]
+        self.assertTrue(all(0 in w["hours"] for w in workers))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import math
+import unittest
+
+from ortools.sat.python import cp_model
+
+from model.bounds import get_lower_bound, get_shift_costs
+from model.constraints import DEFAULT_DAY_CONSTRAINTS
+from model.solver import build_model, get_demand
+
+WEEKLY = {"hard_min": 0, "soft_min": 0, "soft_max": 40, "hard_max": 40}
+
+
+def solve_objective(employees, days, constraints, bookings):
+    demand = get_demand(days, bookings)
+    model, _, _ = build_model(employees, days, constraints, demand)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 20
+    status = solver.Solve(model)
+    assert status == cp_model.OPTIMAL
+    return solver.ObjectiveValue()
+
+
+class TestLowerBound(unittest.TestCase):
+    def test_shift_costs(self):
+        costs = get_shift_costs(DEFAULT_DAY_CONSTRAINTS, 12)
+        self.assertEqual(costs[0], 0)
+        self.assertTrue(all(math.isinf(c) for c in costs[1:6]))
+        self.assertEqual(costs[6:].tolist(), [1, 0, 0, 1])
+
+    def test_tight(self):
+        # A single employee works the whole 9 hour day, 1 over soft_max
+        days = [{"hours": 9, "minutes": 0}]
+        constraints = [{"weekly": WEEKLY}]
+        demand = get_demand(days, [])
+        self.assertEqual(get_lower_bound(1, days, constraints, demand), 1)
+        self.assertEqual(solve_objective(1, days, constraints, []), 1)
+
+    def test_below_optimum(self):
+        days = [{"hours": 10, "minutes": 0} for _ in range(3)]
+        weekly = {"hard_min": 12, "soft_min": 16, "soft_max": 18, "hard_max": 24}
+        constraints = [
+            {"weekly": weekly, "daily": {}},
+            {"weekly": weekly, "daily": {"1": {"hard_max": 0}}},
+            {"weekly": weekly, "daily": {"defaults": {"hard_min": 2, "hard_max": 5}}},
+        ]
+        for bookings in ([], [(0, 2, 2), (1, 8, 2)], [(0, 4, 3), (2, 4, 3)]):
+            demand = get_demand(days, bookings)
+            bound = get_lower_bound(3, days, constraints, demand)
+            self.assertLessEqual(bound, solve_objective(3, days, constraints, bookings))
+
+    def test_infeasible(self):
+        days = [{"hours": 9, "minutes": 0}]
+        constraints = [{"weekly": dict(WEEKLY, hard_min=20)}]
+        demand = get_demand(days, [])
+        self.assertIsNone(get_lower_bound(1, days, constraints, demand))
+
+
+if __name__ == "__main__":
+    unittest.main()
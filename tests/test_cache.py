@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+
+from model.cache import (
+    ModelCache,
+    canonical_request,
+    request_hash,
+    structure_hash,
+)
+from benchmarks.generator import generate_request, to_arguments
+from model.options import SolverOptions
+from model.solver import FINAL_REASONS, get_demand, solve_shift_scheduling
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+CONSTRAINTS = [{"weekly": WEEKLY, "daily": {}}, {"weekly": WEEKLY, "daily": {}}]
+
+
+class TestModelCache(unittest.TestCase):
+    def test_canonical_request(self):
+        demand = get_demand(DAYS, [(0, 3, 2)])
+        canonical = canonical_request(2, DAYS, CONSTRAINTS, demand)
+        # Spelling out the default daily constraints doesn't change the form
+        constraints = [
+            {"weekly": WEEKLY, "daily": {"defaults": {"hard_min": 6, "hard_max": 9}}},
+            {"weekly": WEEKLY, "daily": {}},
+        ]
+        other = canonical_request(2, DAYS, constraints, demand)
+        self.assertEqual(request_hash(canonical), request_hash(other))
+        # Bookings only change the result key
+        other = canonical_request(2, DAYS, CONSTRAINTS, get_demand(DAYS, []))
+        self.assertNotEqual(request_hash(canonical), request_hash(other))
+        self.assertEqual(structure_hash(canonical), structure_hash(other))
+
+    def test_cached_result(self):
+        cache = ModelCache()
+        success, res = solve_shift_scheduling(
+            2, DAYS, CONSTRAINTS, [(0, 3, 2)], cache=cache
+        )
+        self.assertTrue(success)
+        self.assertEqual(len(cache.results), 1)
+        self.assertEqual(len(cache.models), 1)
+        _, cached = solve_shift_scheduling(
+            2, DAYS, CONSTRAINTS, [(0, 3, 2)], cache=cache
+        )
+        self.assertIs(cached, res)
+
+    def test_unfinished_result(self):
+        # A search ended by its time limit isn't cached, a longer one may do
+        # better, but its model is
+        cache = ModelCache()
+        options = SolverOptions(
+            time_limit=1, num_search_workers=1, stop_at_lower_bound=False
+        )
+        success, res = solve_shift_scheduling(
+            **to_arguments(generate_request(1, 8, 7)), options=options, cache=cache
+        )
+        self.assertTrue(success)
+        final = res["termination"]["reason"] in FINAL_REASONS
+        self.assertEqual(len(cache.results), int(final))
+        self.assertEqual(len(cache.models), 1)
+
+    def test_patched_bookings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            solve_shift_scheduling(
+                2, DAYS, CONSTRAINTS, [], cache=ModelCache(directory=directory)
+            )
+            # A new cache reads the model back from the directory
+            cache = ModelCache(directory=directory)
+            success, res = solve_shift_scheduling(
+                2, DAYS, CONSTRAINTS, [(1, 7, 2)], cache=cache
+            )
+            self.assertTrue(success)
+            self.assertEqual(len(cache.models), 1)
+            workers = res["days"][1]["workers"]
+            self.assertTrue(all(7 in w["hours"] for w in workers))
+
+
+if __name__ == "__main__":
+    unittest.main()
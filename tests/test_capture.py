@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+
+from benchmarks.replay import CAPTURED, replay_capture
+from model.capture import SLOW, Capture, find_captures, load_capture
+from model.options import SolverOptions
+from model.solver import SHIFT_MODEL_INTERVAL, solve_shift_scheduling
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+CONSTRAINTS = [{"weekly": WEEKLY, "daily": {}}, {"weekly": WEEKLY, "daily": {}}]
+BOOKINGS = [(0, 3, 2)]
+OPTIONS = SolverOptions(time_limit=5, num_search_workers=1)
+
+
+class TestCapture(unittest.TestCase):
+    def test_trigger(self):
+        capture = Capture(tempfile.mkdtemp(), sample_rate=0, slow_seconds=1)
+        self.assertIsNone(capture.get_trigger(0.5))
+        self.assertEqual(capture.get_trigger(2), SLOW)
+        capture = Capture(tempfile.mkdtemp(), sample_rate=0.5, seed=0)
+        triggers = [capture.get_trigger(0) for _ in range(100)]
+        self.assertTrue(0 < triggers.count(None) < 100)
+
+    def test_capture_and_replay(self):
+        directory = tempfile.mkdtemp()
+        skipped = Capture(directory)
+        solve_shift_scheduling(
+            2, DAYS, CONSTRAINTS, BOOKINGS, options=OPTIONS, capture=skipped
+        )
+        self.assertEqual(find_captures([directory]), [])
+
+        capture = Capture(directory, slow_seconds=0)
+        success, res = solve_shift_scheduling(
+            2, DAYS, CONSTRAINTS, BOOKINGS, options=OPTIONS, capture=capture
+        )
+        self.assertTrue(success)
+        (path,) = find_captures([directory])
+        self.assertEqual(find_captures([path]), [path])
+        request, proto, meta = load_capture(path)
+        self.assertEqual(request["customer_bookings"], BOOKINGS)
+        self.assertGreater(len(proto.variables), 0)
+        self.assertEqual(meta["trigger"], SLOW)
+        self.assertEqual(meta["options"]["time_limit"], 5)
+        self.assertEqual(meta["outcome"]["objective"], res["termination"]["objective"])
+
+        results = replay_capture(
+            path, [CAPTURED, SHIFT_MODEL_INTERVAL], [1], ["", "linearization_level: 0"]
+        )
+        self.assertEqual(len(results), 4)
+        for r in results:
+            self.assertEqual(r["status"], "OPTIMAL")
+            self.assertEqual(r["objective"], meta["outcome"]["objective"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from model.constraints import get_weekly_constraints_for_employee
+from model.decomposition import apportion, get_groups, get_parts, solve_decomposed
+from model.options import SolverOptions
+from model.solver import get_demand
+
+DAYS = [{"hours": 8, "minutes": 0} for _ in range(4)]
+WEEKLY = {"hard_min": 12, "soft_min": 14, "soft_max": 20, "hard_max": 24}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}, "ward": "a"},
+    {"weekly": WEEKLY, "daily": {"3": {"hard_max": 0}}, "ward": "a"},
+    {"weekly": WEEKLY, "daily": {}, "ward": "b"},
+    {"weekly": WEEKLY, "daily": {}, "ward": "b"},
+]
+BOOKINGS = [(0, 4, 3), (3, 0, 2)]
+
+
+class TestDecomposition(unittest.TestCase):
+    def test_apportion(self):
+        self.assertEqual(apportion(10, [1, 1, 1]), [4, 3, 3])
+        self.assertEqual(apportion(7, [12, 12, 6]), [3, 3, 1])
+        self.assertEqual(apportion(0, [1, 2]), [0, 0])
+
+    def test_parts(self):
+        demand = get_demand(DAYS, BOOKINGS)
+        groups = get_groups(CONSTRAINTS, "ward")
+        self.assertEqual(groups, [[0, 1], [2, 3]])
+        parts = get_parts(4, DAYS, CONSTRAINTS, demand, [[0, 1], [2, 3]], groups)
+        self.assertEqual(len(parts), 4)
+        # The weekly bounds of the parts of an employee add up to their own
+        hard_min = sum(
+            p["arguments"]["constraints"][0]["weekly"]["hard_min"]
+            for p in parts
+            if p["employees"] == [0, 1]
+        )
+        self.assertEqual(hard_min, 12)
+        # and so does the demand of every hour
+        total = sum(n for p in parts for n in p["arguments"]["demand"].values())
+        self.assertEqual(total, sum(demand.values()))
+        # Daily constraints follow their day into the window
+        self.assertEqual(
+            parts[2]["arguments"]["constraints"][1]["daily"], {"1": {"hard_max": 0}}
+        )
+
+    def test_solve_decomposed(self):
+        for processes in (1, 2):
+            success, res = solve_decomposed(
+                4,
+                DAYS,
+                CONSTRAINTS,
+                BOOKINGS,
+                window=2,
+                group_by="ward",
+                processes=processes,
+                polish_iterations=1,
+                options=SolverOptions(time_limit=2),
+            )
+            self.assertTrue(success)
+            for i, day in enumerate(res["days"]):
+                for h in range(8):
+                    working = sum(h in w["hours"] for w in day["workers"])
+                    self.assertGreaterEqual(working, 1)
+            self.assertEqual(res["days"][3]["workers"][1]["hours"], [])
+            self.assertGreaterEqual(
+                sum(4 in w["hours"] for w in res["days"][0]["workers"]), 3
+            )
+            for e, totals in enumerate(res["employees"]):
+                ct = get_weekly_constraints_for_employee(CONSTRAINTS[e])
+                self.assertTrue(ct[0] <= totals[e] <= ct[4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import time
+import unittest
+
+from benchmarks.generator import generate_request, to_arguments
+from model.draft import STOP_DRAFT, get_draft
+from model.options import SolverOptions
+from model.solver import solve_shift_scheduling
+from model.validation import get_schedule_penalty, validate_schedule
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}, "skills": ["RN"]},
+    {"weekly": WEEKLY, "daily": {"1": {"hard_max": 0}}},
+    {"weekly": WEEKLY, "daily": {"defaults": {"hard_min": 2, "hard_max": 5}}},
+]
+BOOKINGS = [(0, 2, 2), (1, 7, 2)]
+
+
+def check_schedule(test, request, res):
+    """Asserts that res satisfies every hard constraint of request."""
+    reasons = validate_schedule(
+        request["employees"],
+        request["days"],
+        request["constraints"],
+        request["customer_bookings"],
+        res["days"],
+        request.get("skill_bookings"),
+    )
+    test.assertEqual(reasons, [])
+
+
+class TestDraft(unittest.TestCase):
+    def test_draft(self):
+        request = {
+            "employees": 3,
+            "days": DAYS,
+            "constraints": CONSTRAINTS,
+            "customer_bookings": BOOKINGS,
+            "skill_bookings": [(1, 0, 1, "RN")],
+        }
+        success, res = get_draft(**request)
+        self.assertTrue(success)
+        check_schedule(self, request, res)
+        self.assertEqual(res["termination"]["reason"], STOP_DRAFT)
+        self.assertEqual(
+            res["termination"]["objective"],
+            get_schedule_penalty(3, DAYS, CONSTRAINTS, res["days"]),
+        )
+
+    def test_generated(self):
+        for seed in range(3):
+            request = to_arguments(generate_request(seed, 12, 7, booking_density=0.3))
+            start = time.perf_counter()
+            success, res = get_draft(**request)
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertTrue(success)
+            check_schedule(self, request, res)
+
+    def test_objective(self):
+        # The first solution of a search hinted with the draft is the draft
+        request = to_arguments(generate_request(2, 6, 5, booking_density=0.5))
+        _, draft = get_draft(**request)
+        solutions = []
+        solve_shift_scheduling(
+            **request,
+            hint=draft["days"],
+            options=SolverOptions(time_limit=5, num_search_workers=1),
+            on_solution=solutions.append
+        )
+        self.assertEqual(solutions[0]["objective"], draft["termination"]["objective"])
+        self.assertLessEqual(
+            solutions[-1]["objective"], draft["termination"]["objective"]
+        )
+
+    def test_slots(self):
+        success, res = get_draft(3, DAYS, CONSTRAINTS, BOOKINGS, slot_minutes=30)
+        self.assertTrue(success)
+        # Hour 2 of the first day is slots 4 and 5
+        workers = res["days"][0]["workers"]
+        for slot in (4, 5):
+            self.assertGreaterEqual(len([w for w in workers if slot in w["slots"]]), 2)
+
+    def test_short(self):
+        success, res = get_draft(3, DAYS, CONSTRAINTS, [(1, 3, 3)])
+        self.assertFalse(success)
+        self.assertEqual(res["short"]["hours"], [(1, 3)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from model.feasibility import check_request, diagnose_infeasibility
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}},
+    {"weekly": dict(WEEKLY, hard_max=6), "daily": {}},
+]
+
+
+def reason_codes(reasons):
+    return [r["reason"] for r in reasons]
+
+
+class TestCheckRequest(unittest.TestCase):
+    def test_feasible(self):
+        self.assertEqual(check_request(2, DAYS, CONSTRAINTS, [(0, 3, 2)]), [])
+
+    def test_bookings(self):
+        reasons = check_request(2, DAYS, CONSTRAINTS, [(0, 8, 1), (2, 0, 1), (1, 2, 3)])
+        self.assertEqual(
+            reason_codes(reasons), ["booking_hour", "booking_day", "booking_staff"]
+        )
+
+    def test_weekly_hard_min(self):
+        constraints = [
+            {"weekly": dict(WEEKLY, hard_min=10), "daily": {"1": {"hard_max": 0}}},
+            CONSTRAINTS[1],
+        ]
+        reasons = check_request(2, DAYS, constraints, [])
+        self.assertEqual(reason_codes(reasons), ["weekly_hard_min"])
+        self.assertEqual(reasons[0]["employee"], 0)
+
+    def test_day_uncovered(self):
+        off = {"weekly": {"hard_min": 0}, "daily": {"0": {"hard_max": 0}}}
+        reasons = check_request(2, DAYS, [off, off], [])
+        self.assertEqual(reason_codes(reasons), ["day_uncovered"])
+
+
+class TestDiagnoseInfeasibility(unittest.TestCase):
+    def test_feasible(self):
+        self.assertEqual(diagnose_infeasibility(2, DAYS, CONSTRAINTS, [(0, 3, 2)]), [])
+
+    def test_conflict(self):
+        # Both employees work hours 0 and 7 of day 0, a shift of 8 hours
+        # employee 1 can't work within their 6 weekly hours
+        bookings = [(0, 0, 2), (0, 7, 2)]
+        self.assertEqual(check_request(2, DAYS, CONSTRAINTS, bookings), [])
+        reasons = diagnose_infeasibility(2, DAYS, CONSTRAINTS, bookings)
+        self.assertIn(
+            {"reason": "weekly", "employee": 1},
+            [{k: r[k] for k in ("reason", "employee") if k in r} for r in reasons],
+        )
+        self.assertEqual(
+            sorted((r["day"], r["hour"]) for r in reasons if r["reason"] == "booking"),
+            [(0, 0), (0, 7)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+from model.horizon import (
+    ScheduleStore,
+    UnknownPlan,
+    advance,
+    get_carried_hours,
+    get_window,
+    get_window_request,
+    solve_window,
+    start_plan,
+)
+from model.options import SolverOptions
+
+WEEKLY = {"hard_min": 6, "soft_min": 12, "soft_max": 12, "hard_max": 18}
+DAYS = [{"hours": 8, "minutes": 0} for _ in range(5)]
+CONSTRAINTS = [{"weekly": WEEKLY, "daily": {}} for _ in range(2)]
+BOOKINGS = [(d, 2, 1) for d in range(5)]
+OPTIONS = SolverOptions(time_limit=5, num_search_workers=2)
+
+
+def create_plan(store):
+    return store.create_plan(2, DAYS, CONSTRAINTS, BOOKINGS, week_length=3)
+
+
+class TestWindow(unittest.TestCase):
+    def test_window_request(self):
+        store = ScheduleStore()
+        plan_id = create_plan(store)
+        plan = store.get_plan(plan_id)
+        self.assertEqual(get_window(plan), [0, 1, 2])
+        plan["frozen"] = 2
+        assignments = {(0, 0): [0, 1, 2, 3], (1, 0): [0, 1], (2, 0): [5]}
+        self.assertEqual(get_window(plan), [2])
+        self.assertEqual(get_carried_hours(plan, assignments), [6, 0])
+        request = get_window_request(plan, assignments)
+        self.assertEqual(len(request["days"]), 1)
+        self.assertEqual(request["customer_bookings"], [(0, 2, 1)])
+        self.assertEqual(
+            request["constraints"][0]["weekly"],
+            {"hard_min": 0, "soft_min": 6, "soft_max": 6, "hard_max": 12},
+        )
+        self.assertEqual(request["constraints"][1]["weekly"], WEEKLY)
+        self.assertEqual(
+            request["hint"], [{"id": 0, "workers": [{"id": 0, "hours": [5]}]}]
+        )
+        # A new week carries nothing
+        plan["frozen"] = 3
+        self.assertEqual(get_window(plan), [3, 4])
+        self.assertEqual(get_carried_hours(plan, assignments), [0, 0])
+        # The last week has 2 of its 3 days in the horizon
+        self.assertEqual(
+            get_window_request(plan, assignments)["constraints"][0]["weekly"],
+            {"hard_min": 4, "soft_min": 8, "soft_max": 8, "hard_max": 12},
+        )
+
+    def test_start_plan(self):
+        store = ScheduleStore()
+        plan = {
+            "employees": 2,
+            "days": DAYS,
+            "constraints": CONSTRAINTS,
+            "customer_bookings": BOOKINGS,
+            "week_length": 3,
+            "stability": 1,
+        }
+        success, res = start_plan(store, plan, options=OPTIONS)
+        self.assertTrue(success)
+        self.assertEqual(res["window"], [0, 1, 2])
+        self.assertEqual(len(store.get_assignments(res["plan_id"])), 6)
+        # A plan without a solution isn't saved
+        bookings = [(0, 2, 3)]
+        success, _ = start_plan(
+            store, dict(plan, customer_bookings=bookings), options=OPTIONS
+        )
+        self.assertFalse(success)
+        (plans,) = store.connection.execute("SELECT COUNT(*) FROM plans").fetchone()
+        self.assertEqual(plans, 1)
+
+    def test_unknown(self):
+        with self.assertRaises(UnknownPlan):
+            ScheduleStore().get_plan("missing")
+
+
+class TestAdvance(unittest.TestCase):
+    def test_advance(self):
+        path = os.path.join(tempfile.mkdtemp(), "plans.sqlite3")
+        store = ScheduleStore(path)
+        plan_id = create_plan(store)
+        with self.assertRaises(ValueError):
+            advance(store, plan_id, options=OPTIONS)
+        success, res = solve_window(store, plan_id, options=OPTIONS)
+        self.assertTrue(success)
+        self.assertEqual(res["window"], [0, 1, 2])
+        first = res["days"][0]
+
+        bookings = [(d, 6, 1) for d in range(5)]
+        success, res = advance(
+            store, plan_id, customer_bookings=bookings, options=OPTIONS
+        )
+        self.assertTrue(success)
+        self.assertEqual(res["frozen"], 1)
+        self.assertEqual(res["window"], [1, 2])
+        # The committed day is kept, the open days follow the new bookings
+        self.assertEqual(res["days"][0], first)
+        for d in (1, 2):
+            self.assertTrue(any(6 in w["hours"] for w in res["days"][d]["workers"]))
+        store.close()
+
+        # A failed solve saves nothing
+        store = ScheduleStore(path)
+        plan = store.get_plan(plan_id)
+        success, _ = advance(
+            store, plan_id, customer_bookings=[(2, 3, 9)], options=OPTIONS
+        )
+        self.assertFalse(success)
+        self.assertEqual(store.get_plan(plan_id), plan)
+        store.close()
+
+        # The plan survives a restart
+        store = ScheduleStore(path)
+        success, res = advance(
+            store, plan_id, days=2, new_days=DAYS[:1], options=OPTIONS
+        )
+        self.assertTrue(success)
+        self.assertEqual(res["window"], [3, 4, 5])
+        self.assertEqual(len(res["days"]), 6)
+        # The first week keeps within its weekly bounds
+        for e in range(2):
+            worked = sum(len(res["days"][d]["workers"][e]["hours"]) for d in range(3))
+            self.assertGreaterEqual(worked, WEEKLY["hard_min"])
+            self.assertLessEqual(worked, WEEKLY["hard_max"])
+        store.close()
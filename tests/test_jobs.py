@@ -0,0 +1,107 @@
+import threading
+import time
+import unittest
+
+from api.jobs import DONE, CoreBudget, JobQueue, QueueFull, solve_request
+from benchmarks.generator import generate_request, to_arguments
+from model.options import SolverOptions
+from model.solver import STOP_TIME_LIMIT
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+CONSTRAINTS = [
+    {
+        "weekly": {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16},
+        "daily": {},
+    },
+    {
+        "weekly": {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16},
+        "daily": {},
+    },
+]
+REQUEST = {
+    "employees": 2,
+    "days": DAYS,
+    "constraints": CONSTRAINTS,
+    "customer_bookings": [(0, 3, 2)],
+}
+
+
+def wait_for(queue, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job.state == DONE:
+            return job
+        time.sleep(0.1)
+    raise AssertionError("Job did not finish in time")
+
+
+class TestJobQueue(unittest.TestCase):
+    def test_job_result(self):
+        queue = JobQueue(max_workers=1, max_pending=1)
+        try:
+            job_id = queue.submit(REQUEST)
+            job = wait_for(queue, job_id)
+            self.assertTrue(job.success)
+            self.assertEqual(len(job.result["days"]), 2)
+            # Both employees are booked on the first day, hour 3
+            workers = job.result["days"][0]["workers"]
+            self.assertTrue(all(3 in w["hours"] for w in workers))
+        finally:
+            queue.shutdown()
+
+    def test_queue_full(self):
+        queue = JobQueue(max_workers=1, max_pending=0)
+        try:
+            job_id = queue.submit(REQUEST)
+            with self.assertRaises(QueueFull):
+                queue.submit(REQUEST)
+            wait_for(queue, job_id)
+            queue.submit(REQUEST)
+        finally:
+            queue.shutdown()
+
+
+class TestCoreBudget(unittest.TestCase):
+    def test_limit(self):
+        budget = CoreBudget(8, solves=2)
+        self.assertEqual(budget.limit(None).num_search_workers, 4)
+        options = SolverOptions(num_search_workers=16)
+        self.assertEqual(budget.limit(options).num_search_workers, 8)
+
+    def test_acquire(self):
+        budget = CoreBudget(4)
+        budget.acquire(3)
+        acquired = threading.Event()
+
+        def acquire():
+            budget.acquire(2)
+            acquired.set()
+
+        threading.Thread(target=acquire).start()
+        self.assertFalse(acquired.wait(0.1))
+        budget.release(3)
+        self.assertTrue(acquired.wait(5))
+        self.assertEqual(budget.available, 2)
+
+
+class TestSolveRequest(unittest.TestCase):
+    def test_infeasible(self):
+        options = SolverOptions(time_limit=5, num_search_workers=1)
+        request = dict(REQUEST, customer_bookings=[(0, 3, 3)])
+        success, res = solve_request(request, options)
+        self.assertFalse(success)
+        self.assertEqual(res["reasons"][0]["reason"], "booking")
+
+    def test_time_limit(self):
+        # Out of time isn't diagnosed as infeasible
+        options = SolverOptions(time_limit=0.01, num_search_workers=1)
+        request = to_arguments(generate_request(0, 40, 7))
+        success, res = solve_request(request, options)
+        self.assertFalse(success)
+        self.assertEqual(res["termination"]["reason"], STOP_TIME_LIMIT)
+        self.assertNotIn("reasons", res)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from model.options import SolverOptions
+from model.schedule import WorkVariables, get_work_index
+from model.solver import (
+    NO_GAPS_LINEAR,
+    NO_GAPS_QUADRATIC,
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    build_model,
+    get_demand,
+    solve_shift_scheduling,
+)
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 6, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 12, "hard_max": 14}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {"defaults": {"hard_min": 2, "soft_min": 4}}},
+    {"weekly": WEEKLY, "daily": {"defaults": {"hard_min": 2, "soft_min": 4}}},
+    {"weekly": WEEKLY, "daily": {"1": {"soft_max": 4}}},
+]
+BOOKINGS = [(0, 3, 2), (1, 5, 2)]
+
+
+def get_normal_form(model):
+    """Proto of a model without its names, and with the terms of its linear
+    constraints sorted.
+    """
+    proto = model.Proto().__deepcopy__()
+    for variable in proto.variables:
+        variable.ClearField("name")
+    for constraint in proto.constraints:
+        if constraint.HasField("linear"):
+            terms = sorted(zip(constraint.linear.vars, constraint.linear.coeffs))
+            del constraint.linear.vars[:]
+            del constraint.linear.coeffs[:]
+            constraint.linear.vars.extend(v for v, _ in terms)
+            constraint.linear.coeffs.extend(c for _, c in terms)
+    return proto
+
+
+class TestLean(unittest.TestCase):
+    def test_same_model(self):
+        demand = get_demand(DAYS, BOOKINGS)
+        for shift_model, no_gaps in (
+            (SHIFT_MODEL_SEQUENCE, NO_GAPS_LINEAR),
+            (SHIFT_MODEL_SEQUENCE, NO_GAPS_QUADRATIC),
+            (SHIFT_MODEL_INTERVAL, NO_GAPS_LINEAR),
+        ):
+            models = [
+                build_model(
+                    3, DAYS, CONSTRAINTS, demand, no_gaps, shift_model, lean=lean
+                )
+                for lean in (False, True)
+            ]
+            (model, work, coverage), (lean_model, lean_work, lean_coverage) = models
+            self.assertEqual(get_normal_form(model), get_normal_form(lean_model))
+            self.assertEqual(coverage, lean_coverage)
+            self.assertTrue(
+                all(not v.name for v in lean_model.Proto().variables), shift_model
+            )
+
+    def test_work_variables(self):
+        demand = get_demand(DAYS, BOOKINGS)
+        _, work, _ = build_model(3, DAYS, CONSTRAINTS, demand)
+        _, lean_work, _ = build_model(3, DAYS, CONSTRAINTS, demand, lean=True)
+        self.assertIsInstance(lean_work, WorkVariables)
+        self.assertEqual(
+            {k: v.Index() for k, v in work.items()},
+            {k: v.Index() for k, v in lean_work.items()},
+        )
+        # Hours after the end of the second day, and outside the roster
+        for key in ((0, 1, 6), (3, 0, 0), (-1, 0, 0)):
+            self.assertNotIn(key, lean_work)
+        self.assertEqual(
+            get_work_index(work, 3, DAYS).tolist(),
+            get_work_index(lean_work, 3, DAYS).tolist(),
+        )
+
+    def test_solve(self):
+        options = SolverOptions(time_limit=10, num_search_workers=1)
+        _, res = solve_shift_scheduling(
+            3, DAYS, CONSTRAINTS, BOOKINGS, options=options, lean=False
+        )
+        for kwargs in ({}, {"hint": res["days"], "stability": 1}):
+            success, lean_res = solve_shift_scheduling(
+                3, DAYS, CONSTRAINTS, BOOKINGS, options=options, lean=True, **kwargs
+            )
+            self.assertTrue(success)
+            self.assertEqual(
+                lean_res["termination"]["objective"],
+                res["termination"]["objective"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
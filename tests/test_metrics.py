@@ -0,0 +1,103 @@
+import json
+import logging
+import unittest
+
+from api.routes import app
+from model import metrics
+from model.logs import JsonFormatter
+from model.solver import build_model, get_demand
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+REQUEST = {
+    "num_employees": 2,
+    "days": DAYS,
+    "employee_constraints": [
+        {"weekly": WEEKLY, "daily": {}},
+        {"weekly": WEEKLY, "daily": {}},
+    ],
+    "bookings": [{"day": 1, "hour": 5, "bookings": 2}],
+    "solver": {"time_limit": 2},
+}
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_render(self):
+        metrics.increment("schedule_solves_total", status="OPTIMAL")
+        metrics.increment("schedule_solves_total", status="OPTIMAL")
+        metrics.observe("schedule_phase_seconds", 0.02, phase="solve")
+        metrics.observe("schedule_phase_seconds", 3, phase="solve")
+        text = metrics.render()
+        self.assertIn("# TYPE schedule_solves_total counter", text)
+        self.assertIn('schedule_solves_total{status="OPTIMAL"} 2', text)
+        # Buckets are cumulative
+        self.assertIn('schedule_phase_seconds_bucket{phase="solve",le="0.01"} 0', text)
+        self.assertIn('schedule_phase_seconds_bucket{phase="solve",le="0.05"} 1', text)
+        self.assertIn('schedule_phase_seconds_bucket{phase="solve",le="5"} 2', text)
+        self.assertIn('schedule_phase_seconds_bucket{phase="solve",le="+Inf"} 2', text)
+        self.assertIn('schedule_phase_seconds_sum{phase="solve"} 3.02', text)
+        self.assertIn('schedule_phase_seconds_count{phase="solve"} 2', text)
+
+    def test_wrong_kind(self):
+        with self.assertRaises(ValueError):
+            metrics.increment("schedule_phase_seconds")
+
+    def test_sink(self):
+        observations = []
+        metrics.set_sink(observations.append)
+        try:
+            metrics.increment("schedule_solves_total", status="FEASIBLE")
+        finally:
+            metrics.set_sink(None)
+        self.assertNotIn('status="FEASIBLE"', metrics.render())
+        metrics.record(observations[0])
+        self.assertIn('schedule_solves_total{status="FEASIBLE"} 1', metrics.render())
+
+    def test_build_model(self):
+        constraints = REQUEST["employee_constraints"]
+        build_model(2, DAYS, constraints, get_demand(DAYS, []))
+        text = metrics.render()
+        for builder in (
+            "add_daily_hour_constraints",
+            "add_weekly_constraint",
+            "add_compact_no_gaps_constraint",
+            "add_lexicographic_constraint",
+            "coverage",
+        ):
+            self.assertIn(
+                'schedule_build_seconds_count{builder="%s"} 1' % builder, text
+            )
+        self.assertIn('schedule_phase_seconds_count{phase="resolve"} 1', text)
+        self.assertIn("schedule_model_variables_count 1", text)
+
+    def test_endpoint(self):
+        client = app.test_client()
+        client.post("/endpoint", json=REQUEST)
+        response = client.get("/metrics")
+        self.assertEqual(response.mimetype, "text/plain")
+        text = response.get_data(as_text=True)
+        for phase in ("parse", "resolve", "build", "solve", "extract"):
+            self.assertIn('schedule_phase_seconds_count{phase="%s"} 1' % phase, text)
+        self.assertIn('schedule_solves_total{status="OPTIMAL"} 1', text)
+        self.assertIn('schedule_requests_total{route="endpoint",status="200"} 1', text)
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_format(self):
+        record = logging.LogRecord(
+            "schedule.test", logging.INFO, "", 0, "solve", (), None
+        )
+        record.fields = {"status": "OPTIMAL", "objective": 3.0}
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["event"], "solve")
+        self.assertEqual(entry["level"], "info")
+        self.assertEqual(entry["status"], "OPTIMAL")
+        self.assertEqual(entry["objective"], 3.0)
+        self.assertTrue(entry["time"].endswith("Z"))
+
+
+if __name__ == "__main__":
+    unittest.main()
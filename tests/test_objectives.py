@@ -0,0 +1,132 @@
+import unittest
+
+from api.routes import app
+from model.cache import ModelCache
+from model.objectives import Objectives
+from model.options import SolverOptions
+from model.solver import solve_shift_scheduling
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}, "preferences": {"days_off": [1]}},
+    {"weekly": WEEKLY, "daily": {}},
+    {"weekly": WEEKLY, "daily": {}},
+]
+BOOKINGS = [(0, 3, 2), (1, 3, 2)]
+LEXICOGRAPHIC = {
+    "stages": [
+        {"weights": {"penalty": 1}},
+        {"weights": {"fairness": 1, "preferences": 5}},
+    ],
+    "weekend_days": [1],
+}
+OPTIONS = SolverOptions(time_limit=10, num_search_workers=1)
+
+
+def get_spread(res, cells):
+    totals = [0] * len(res["employees"])
+    for day in res["days"]:
+        for worker in day["workers"]:
+            totals[worker["id"]] += len(
+                [h for h in worker["hours"] if (day["id"], h) in cells]
+            )
+    return max(totals) - min(totals)
+
+
+class TestObjectives(unittest.TestCase):
+    def test_from_dict(self):
+        objectives = Objectives.from_dict(LEXICOGRAPHIC)
+        self.assertEqual(len(objectives.stages), 2)
+        self.assertEqual(objectives.get_terms(), {"penalty", "fairness", "preferences"})
+        self.assertEqual(Objectives.from_dict(objectives.to_dict()), objectives)
+        objectives.stages[1].time_limit = 1
+        self.assertEqual(objectives.get_time_limits(5), [4, 1])
+        for invalid in (
+            {"stages": [{"weights": {"overtime": 1}}]},
+            {"stages": [{"weights": {"penalty": -1}}]},
+            {"stages": [{"weights": {"penalty": 0}}]},
+        ):
+            with self.assertRaises(ValueError):
+                Objectives.from_dict(invalid)
+
+    def test_lexicographic(self):
+        cache = ModelCache()
+        _, plain = solve_shift_scheduling(
+            3, DAYS, CONSTRAINTS, BOOKINGS, options=OPTIONS, cache=cache
+        )
+        success, res = solve_shift_scheduling(
+            3,
+            DAYS,
+            CONSTRAINTS,
+            BOOKINGS,
+            options=OPTIONS,
+            cache=cache,
+            objectives=Objectives.from_dict(LEXICOGRAPHIC),
+        )
+        self.assertTrue(success)
+        # Not the cached result of the plain solve
+        self.assertIn("stages", res)
+        # Preferences turn the symmetry breaking off, fairness doesn't
+        self.assertEqual(len(cache.models), 2)
+        fairness = {
+            "stages": [{"weights": {"penalty": 1}}, {"weights": {"fairness": 1}}]
+        }
+        solve_shift_scheduling(
+            3,
+            DAYS,
+            CONSTRAINTS,
+            BOOKINGS,
+            options=OPTIONS,
+            cache=cache,
+            objectives=Objectives.from_dict(fairness),
+        )
+        self.assertEqual(len(cache.models), 2)
+        first, second = res["stages"]
+        # The penalty isn't traded for the secondary terms
+        self.assertEqual(first["objective"], plain["termination"]["objective"])
+        self.assertEqual(second["reason"], "optimal")
+        # Employee 0 gets their day off
+        self.assertEqual(res["days"][1]["workers"][0]["hours"], [])
+        weekend = {(1, h) for h in range(8)}
+        late = {(d, h) for d in range(2) for h in (6, 7)}
+        self.assertEqual(
+            second["objective"], get_spread(res, weekend) + get_spread(res, late)
+        )
+
+    def test_slots(self):
+        success, res = solve_shift_scheduling(
+            3,
+            DAYS,
+            CONSTRAINTS,
+            BOOKINGS,
+            options=OPTIONS,
+            slot_minutes=30,
+            objectives=Objectives.from_dict(
+                {"stages": [{"weights": {"penalty": 1, "preferences": 1}}]}
+            ),
+        )
+        self.assertTrue(success)
+        self.assertEqual(res["days"][1]["workers"][0]["slots"], [])
+
+    def test_route(self):
+        client = app.test_client()
+        request = {
+            "num_employees": 3,
+            "days": DAYS,
+            "employee_constraints": CONSTRAINTS,
+            "bookings": [{"day": 0, "hour": 3, "bookings": 2}],
+            "solver": {"time_limit": 4},
+        }
+        response = client.post(
+            "/endpoint", json=dict(request, objectives=LEXICOGRAPHIC)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()["res"]["stages"]), 2)
+        invalid = {"stages": [{"weights": {"overtime": 1}}]}
+        response = client.post("/endpoint", json=dict(request, objectives=invalid))
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
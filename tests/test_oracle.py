@@ -0,0 +1,138 @@
+import random
+import unittest
+
+from model.constraints import SLOT_SOFT_MAX, SLOT_SOFT_MIN
+from model.options import SolverOptions
+from model.solver import (
+    NO_GAPS_LINEAR,
+    NO_GAPS_QUADRATIC,
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    solve_shift_scheduling,
+)
+from model.validation import get_schedule_penalty, validate_schedule
+from tests.oracle import get_random_request, get_shifts, solve_brute_force
+
+# Every encoding of the model, compared with the oracle
+ENCODINGS = [
+    {"shift_model": SHIFT_MODEL_SEQUENCE, "no_gaps": NO_GAPS_LINEAR},
+    {"shift_model": SHIFT_MODEL_SEQUENCE, "no_gaps": NO_GAPS_QUADRATIC},
+    {"shift_model": SHIFT_MODEL_INTERVAL},
+    {"shift_model": SHIFT_MODEL_SEQUENCE, "no_gaps": NO_GAPS_LINEAR, "lean": True},
+    {"shift_model": SHIFT_MODEL_SEQUENCE, "no_gaps": NO_GAPS_QUADRATIC, "lean": True},
+    {"shift_model": SHIFT_MODEL_INTERVAL, "lean": True},
+]
+INSTANCES = 200
+
+DAYS = [{"hours": 4, "minutes": 0}, {"hours": 4, "minutes": 0}]
+DAILY = {
+    "defaults": {
+        "hard_min": 2,
+        SLOT_SOFT_MIN: 3,
+        SLOT_SOFT_MAX: 3,
+        "hard_max": 4,
+    }
+}
+CONSTRAINTS = [
+    {"weekly": {"hard_min": 2, "soft_min": 4, "soft_max": 6, "hard_max": 8}, **c}
+    for c in ({"daily": DAILY}, {"daily": DAILY, "skills": ["RN"]})
+]
+
+
+def get_days(hours):
+    """Schedule in the format of res["days"] from the hours of every
+    employee on every day.
+    """
+    return [
+        {"id": d, "workers": [{"id": e, "hours": h[d]} for e, h in enumerate(hours)]}
+        for d in range(len(hours[0]))
+    ]
+
+
+class TestOracle(unittest.TestCase):
+    def test_brute_force(self):
+        self.assertEqual(
+            get_shifts((2, 3, 1, 3, 3, 1), 4),
+            [(0, 0), (0, 2), (1, 2), (2, 2), (0, 3), (1, 3)],
+        )
+        # Both employees work 3 hours a day for a week of 6 hours
+        penalty, shifts = solve_brute_force(2, DAYS, CONSTRAINTS, [(0, 1, 2)])
+        self.assertEqual(penalty, 0)
+        self.assertTrue(all(length == 3 for s in shifts for _, length in s))
+        penalty, shifts = solve_brute_force(
+            2, DAYS, CONSTRAINTS, [(0, 0, 2), (0, 3, 2)]
+        )
+        # Both work the whole first day, an hour over their daily soft_max.
+        # The second day, one works 2 hours, under the daily soft_min, and the
+        # other 3, over the weekly soft_max.
+        self.assertEqual(penalty, 4)
+        self.assertEqual(sorted(s[1][1] for s in shifts), [2, 3])
+        self.assertEqual(
+            solve_brute_force(2, DAYS, CONSTRAINTS, [(0, 1, 3)]), (None, None)
+        )
+
+    def test_validate_schedule(self):
+        valid = get_days([[[0, 1, 2], [1, 2, 3]], [[1, 2, 3], [0, 1, 2]]])
+        self.assertEqual(validate_schedule(2, DAYS, CONSTRAINTS, [], valid), [])
+        self.assertEqual(get_schedule_penalty(2, DAYS, CONSTRAINTS, valid), 0)
+        for hours, bookings, skill_bookings, reason in (
+            ([[[0, 1, 2], [1, 2, 3]], [[1, 2, 3], []]], [], [], "coverage"),
+            (
+                [[[0, 1, 2], [1, 2, 3]], [[1, 2, 3], [0, 1, 2]]],
+                [(0, 0, 2)],
+                [],
+                "coverage",
+            ),
+            (
+                [[[0, 1, 2], [1, 2, 3]], [[1, 2, 3], [0, 1, 2]]],
+                [],
+                [(0, 0, 1, "RN")],
+                "coverage",
+            ),
+            ([[[0, 1, 3], [1, 2, 3]], [[1, 2, 3], [0, 1, 2]]], [], [], "gaps"),
+            ([[[0], [1, 2, 3]], [[0, 1, 2, 3], [0, 1, 2]]], [], [], "daily"),
+            ([[[], []], [[0, 1, 2, 3], [0, 1, 2, 3]]], [], [], "weekly"),
+            ([[[0, 1, 2], [1, 2, 3, 4]], [[1, 2, 3], [0, 1, 2]]], [], [], "closed"),
+        ):
+            reasons = validate_schedule(
+                2, DAYS, CONSTRAINTS, bookings, get_days(hours), skill_bookings
+            )
+            self.assertIn(reason, [r["reason"] for r in reasons], hours)
+
+    def test_encodings(self):
+        # Every encoding agrees with the oracle on feasibility and on the
+        # optimum, with a schedule passing the validator
+        options = SolverOptions(time_limit=10, num_search_workers=1)
+        feasible = 0
+        for seed in range(INSTANCES):
+            request = get_random_request(random.Random(seed))
+            penalty, _ = solve_brute_force(**request)
+            feasible += penalty is not None
+            for encoding in ENCODINGS:
+                with self.subTest(seed=seed, **encoding):
+                    success, res = solve_shift_scheduling(
+                        **request, options=options, **encoding
+                    )
+                    self.assertEqual(success, penalty is not None)
+                    if not success:
+                        continue
+                    self.assertEqual(res["termination"]["objective"], penalty)
+                    args = (
+                        request["employees"],
+                        request["days"],
+                        request["constraints"],
+                    )
+                    self.assertEqual(
+                        validate_schedule(
+                            *args, request["customer_bookings"], res["days"]
+                        ),
+                        [],
+                    )
+                    self.assertEqual(get_schedule_penalty(*args, res["days"]), penalty)
+        # Enough of both to compare
+        self.assertGreater(feasible, INSTANCES // 5)
+        self.assertLess(feasible, INSTANCES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+import json
+import unittest
+
+import numpy as np
+
+from api.routes import app
+from api.warmup import is_warm, warmup
+from model.arrays import NPZ_MIMETYPE, save_npz
+
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+REQUEST = {
+    "num_employees": 2,
+    "days": [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}],
+    "employee_constraints": [
+        {"weekly": WEEKLY, "daily": {}},
+        {"weekly": WEEKLY, "daily": {}},
+    ],
+    "bookings": [{"day": 0, "hour": 3, "bookings": 2}],
+    "solver": {"time_limit": 2},
+}
+
+
+def parse_events(body: str):
+    events = []
+    for chunk in body.strip().split("\n\n"):
+        name, data = chunk.split("\n")
+        events.append((name[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+class TestStream(unittest.TestCase):
+    def test_stream(self):
+        # A request no other test solves, so that it isn't cached
+        request = dict(REQUEST, bookings=[{"day": 0, "hour": 6, "bookings": 2}])
+        response = app.test_client().post("/stream", json=request)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        events = parse_events(response.get_data(as_text=True))
+        names = [name for name, _ in events]
+        self.assertIn("solution", names)
+        self.assertEqual(names[-1], "result")
+        solution = events[names.index("solution")][1]
+        self.assertEqual(set(solution), {"objective", "bound", "time", "res"})
+        self.assertEqual(events[-1][1]["status"], 200)
+
+
+class TestBatch(unittest.TestCase):
+    def test_batch(self):
+        request = dict(
+            REQUEST,
+            scenarios=[
+                {
+                    "name": "more staff",
+                    "num_employees": 3,
+                    "employee_constraints": {"2": {"weekly": WEEKLY}},
+                },
+                {"name": "busy", "bookings": [{"day": 1, "hour": 0, "bookings": 3}]},
+            ],
+        )
+        response = app.test_client().post("/batch", json=request)
+        body = response.get_json()
+        self.assertEqual(body["base"]["status"], 200)
+        self.assertEqual([s["name"] for s in body["scenarios"]], ["more staff", "busy"])
+        self.assertEqual(body["scenarios"][0]["status"], 200)
+        self.assertEqual(body["scenarios"][1]["status"], 422)
+
+        scenarios = [{"employee_constraints": {"2": {"weekly": WEEKLY}}}]
+        response = app.test_client().post(
+            "/batch", json=dict(REQUEST, scenarios=scenarios)
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TestContentType(unittest.TestCase):
+    def test_npz(self):
+        arrays = {
+            "hours": np.array([8, 8]),
+            "demand": np.array([[0, 0, 0, 2, 0, 0, 0, 0], [0] * 8]),
+            "weekly": np.array([[6, 8, 14, 16]] * 2),
+            "solver": np.array(json.dumps({"time_limit": 2})),
+        }
+        response = app.test_client().post(
+            "/endpoint", data=save_npz(arrays), content_type=NPZ_MIMETYPE
+        )
+        body = response.get_json()
+        self.assertEqual(body["status"], 200)
+        workers = body["res"]["days"][0]["workers"]
+        self.assertTrue(all(3 in w["hours"] for w in workers))
+
+    def test_invalid(self):
+        client = app.test_client()
+        response = client.post("/endpoint", data=b"nope", content_type=NPZ_MIMETYPE)
+        self.assertEqual(response.status_code, 400)
+        response = client.post("/endpoint", data=b"nope", content_type="text/plain")
+        self.assertEqual(response.status_code, 415)
+
+
+class TestInfeasible(unittest.TestCase):
+    def test_rejected(self):
+        request = dict(REQUEST, bookings=[{"day": 0, "hour": 12, "bookings": 1}])
+        response = app.test_client().post("/endpoint", json=request)
+        self.assertEqual(response.status_code, 422)
+        body = response.get_json()
+        self.assertEqual(body["reasons"][0]["reason"], "booking_hour")
+
+
+class TestDraft(unittest.TestCase):
+    def test_draft(self):
+        client = app.test_client()
+        response = client.post("/draft", json=REQUEST)
+        self.assertEqual(response.status_code, 200)
+        res = response.get_json()["res"]
+        self.assertEqual(res["termination"]["reason"], "draft")
+
+        response = client.post("/stream", json=dict(REQUEST, draft=True))
+        events = parse_events(response.get_data(as_text=True))
+        self.assertEqual(events[0], ("draft", res))
+        self.assertEqual(events[-1][0], "result")
+
+
+class TestSkills(unittest.TestCase):
+    def test_skill_bookings(self):
+        client = app.test_client()
+        constraints = [
+            {"weekly": WEEKLY, "daily": {}, "skills": ["RN"]},
+            {"weekly": WEEKLY, "daily": {}},
+        ]
+        bookings = [{"day": 1, "hour": 0, "bookings": 1, "skill": "RN"}]
+        request = dict(REQUEST, employee_constraints=constraints, bookings=bookings)
+        response = client.post("/endpoint", json=request)
+        self.assertEqual(response.status_code, 200)
+        day = response.get_json()["res"]["days"][1]
+        self.assertIn(0, day["workers"][0]["hours"])
+
+        bookings = [dict(bookings[0], bookings=2)]
+        response = client.post("/endpoint", json=dict(request, bookings=bookings))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.get_json()["reasons"][0]["skill"], "RN")
+        response = client.post("/plans", json=request)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestOptions(unittest.TestCase):
+    def test_invalid(self):
+        request = dict(REQUEST, solver={"time_limit": "x"})
+        response = app.test_client().post("/endpoint", json=request)
+        self.assertEqual(response.status_code, 400)
+
+
+class TestPlans(unittest.TestCase):
+    def test_plan(self):
+        client = app.test_client()
+        request = dict(REQUEST, week_length=1)
+        response = client.post("/plans", json=request)
+        self.assertEqual(response.status_code, 200)
+        plan_id = response.get_json()["plan_id"]
+        self.assertEqual(response.get_json()["res"]["window"], [0])
+
+        response = client.post("/plans/%s/advance" % plan_id, json={})
+        self.assertEqual(response.status_code, 200)
+        res = response.get_json()["res"]
+        self.assertEqual((res["frozen"], res["window"]), (1, [1]))
+        response = client.post("/plans/%s/advance" % plan_id, json={"days": 2})
+        self.assertEqual(response.status_code, 409)
+        # Without a body
+        response = client.post("/plans/%s/advance" % plan_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["res"]["frozen"], 2)
+
+        response = client.get("/plans/%s" % plan_id)
+        self.assertEqual(response.get_json()["res"]["days"], res["days"])
+        response = client.get("/plans/missing")
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_advance(self):
+        client = app.test_client()
+        response = client.post("/plans", json=dict(REQUEST, week_length=1))
+        plan_id = response.get_json()["plan_id"]
+        url = "/plans/%s/advance" % plan_id
+        for data, reason in (
+            ({"bookings": [{"day": 1, "hour": 9, "bookings": 1}]}, "booking_hour"),
+            ({"bookings": [{"day": 1, "hour": 2, "bookings": 3}]}, "booking_staff"),
+            ({"append_days": [{"minutes": 0}]}, "invalid_day"),
+        ):
+            response = client.post(url, json=data)
+            self.assertEqual(response.status_code, 422, data)
+            self.assertEqual(response.get_json()["reasons"][0]["reason"], reason)
+        response = client.post(url, json={"append_days": {"hours": 8}})
+        self.assertEqual(response.status_code, 400)
+        # Nothing was committed
+        response = client.get("/plans/%s" % plan_id)
+        self.assertEqual(response.get_json()["res"]["frozen"], 0)
+
+    def test_infeasible_window(self):
+        # Passes the checks, but 2 hours a week can't cover a day of 8 hours
+        weekly = {"hard_min": 0, "soft_min": 0, "soft_max": 2, "hard_max": 2}
+        constraints = [{"weekly": weekly, "daily": {}}] * 2
+        request = dict(REQUEST, week_length=1, employee_constraints=constraints)
+        response = app.test_client().post("/plans", json=request)
+        self.assertEqual(response.status_code, 422)
+        reasons = response.get_json()["reasons"]
+        self.assertIn("coverage", [r["reason"] for r in reasons])
+
+    def test_infeasible_week(self):
+        # Only the second week books more employees than there are
+        bookings = [{"day": 1, "hour": 2, "bookings": 3}]
+        request = dict(REQUEST, week_length=1, bookings=bookings)
+        response = app.test_client().post("/plans", json=request)
+        self.assertEqual(response.status_code, 422)
+        reason = response.get_json()["reasons"][0]
+        self.assertEqual(reason["day"], 1)
+        self.assertTrue(reason["message"].startswith("Week from day 1: "))
+
+
+class TestHealth(unittest.TestCase):
+    def test_health(self):
+        client = app.test_client()
+        warmup()
+        self.assertTrue(is_warm())
+        response = client.get("/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()["warm"])
+
+
+if __name__ == "__main__":
+    unittest.main()
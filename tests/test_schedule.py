@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from model.schedule import format_schedule, get_schedule, get_solution_matrix
+
+# 2 employees, 2 days of 3 and 2 hours
+INDEX = np.array(
+    [
+        [[0, 1, 2], [3, 4, -1]],
+        [[5, 6, 7], [8, 9, -1]],
+    ]
+)
+SOLUTION = [1, 1, 0, 0, 1, 0, 1, 1, 1, 0, 7]
+
+
+class TestSchedule(unittest.TestCase):
+    def test_solution_matrix(self):
+        matrix = get_solution_matrix(SOLUTION, INDEX)
+        expected = [[[1, 1, 0], [0, 1, 0]], [[0, 1, 1], [1, 0, 0]]]
+        self.assertEqual(matrix.tolist(), expected)
+
+    def test_schedule(self):
+        res = get_schedule(get_solution_matrix(SOLUTION, INDEX))
+        self.assertEqual(
+            res["days"],
+            [
+                {
+                    "id": 0,
+                    "workers": [{"id": 0, "hours": [0, 1]}, {"id": 1, "hours": [1, 2]}],
+                },
+                {
+                    "id": 1,
+                    "workers": [{"id": 0, "hours": [1]}, {"id": 1, "hours": [0]}],
+                },
+            ],
+        )
+        self.assertEqual(res["employees"], [{0: 3}, {1: 3}])
+
+    def test_format_schedule(self):
+        matrix = get_solution_matrix(SOLUTION, INDEX)
+        text = format_schedule(matrix, [{"hours": 3}, {"hours": 2}])
+        self.assertIn("worker 1: .  X  X  ", text)
+        self.assertIn("Employee 0 worked 3 hours", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from model.cache import ModelCache, canonical_request, structure_hash
+from model.constraints import get_employee_skills, get_identical_employees
+from model.feasibility import check_request, diagnose_infeasibility
+from model.options import SolverOptions
+from model.slots import get_slot_bookings
+from model.solver import build_model, get_demand, solve_shift_scheduling
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 8, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}, "skills": ["RN"]},
+    {"weekly": WEEKLY, "daily": {}, "skills": ["LPN"]},
+    {"weekly": WEEKLY, "daily": {}, "skills": ["RN", "LPN"]},
+    {"weekly": WEEKLY, "daily": {}},
+]
+SKILL_BOOKINGS = [(0, 3, 2, "RN"), (1, 7, 2, "LPN")]
+
+
+def get_workers(res, day, hour):
+    return [
+        worker["id"]
+        for worker in res["days"][day]["workers"]
+        if hour in worker["hours"]
+    ]
+
+
+class TestSkills(unittest.TestCase):
+    def test_employee_skills(self):
+        self.assertEqual(get_employee_skills({"skills": ["RN", "LPN"]}), ("LPN", "RN"))
+        self.assertEqual(get_employee_skills({}), ())
+        # Same constraints but different skills
+        self.assertEqual(get_identical_employees(CONSTRAINTS, DAYS), [])
+        constraints = [CONSTRAINTS[0], dict(CONSTRAINTS[0], skills=["RN"])]
+        self.assertEqual(get_identical_employees(constraints, DAYS), [[0, 1]])
+
+    def test_sparse_demand(self):
+        demand = get_demand(DAYS, [], SKILL_BOOKINGS)
+        self.assertEqual(demand[0, 3, "RN"], 2)
+        # Skill bookings count as bookings of their hour
+        self.assertEqual(demand[0, 3], 2)
+        self.assertEqual(len([key for key in demand if len(key) == 3]), 2)
+        with self.assertRaises(KeyError):
+            get_demand(DAYS, [], [(0, 8, 1, "RN")])
+
+    def test_qualified_only(self):
+        demand = get_demand(DAYS, [], SKILL_BOOKINGS)
+        model, work, coverage = build_model(4, DAYS, CONSTRAINTS, demand)
+        linear = model.Proto().constraints[coverage[0, 3, "RN"]].linear
+        self.assertEqual(
+            sorted(linear.vars), sorted(work[e, 0, 3].Index() for e in (0, 2))
+        )
+        self.assertEqual(linear.domain[0], 2)
+
+    def test_solve(self):
+        success, res = solve_shift_scheduling(
+            4,
+            DAYS,
+            CONSTRAINTS,
+            [],
+            options=SolverOptions(time_limit=10),
+            skill_bookings=SKILL_BOOKINGS,
+        )
+        self.assertTrue(success)
+        self.assertLessEqual({0, 2}, set(get_workers(res, 0, 3)))
+        self.assertLessEqual({1, 2}, set(get_workers(res, 1, 7)))
+
+    def test_slots(self):
+        self.assertEqual(
+            get_slot_bookings([(0, 2, 1, "RN")], 30),
+            [(0, 4, 1, "RN"), (0, 5, 1, "RN")],
+        )
+
+    def test_cache(self):
+        options = dict(no_gaps="linear", shift_model="sequence", symmetry=True)
+        first = canonical_request(
+            4, DAYS, CONSTRAINTS, get_demand(DAYS, [], SKILL_BOOKINGS), **options
+        )
+        more = [(0, 3, 1, "RN"), (1, 7, 2, "LPN")]
+        second = canonical_request(
+            4, DAYS, CONSTRAINTS, get_demand(DAYS, [], more), **options
+        )
+        other = canonical_request(
+            4, DAYS, CONSTRAINTS, get_demand(DAYS, [], [(0, 4, 1, "RN")]), **options
+        )
+        # The same cells share a model, other cells don't
+        self.assertEqual(structure_hash(first), structure_hash(second))
+        self.assertNotEqual(structure_hash(first), structure_hash(other))
+
+        cache = ModelCache()
+        kwargs = dict(options=SolverOptions(time_limit=10), cache=cache)
+        solve_shift_scheduling(4, DAYS, CONSTRAINTS, [], skill_bookings=more, **kwargs)
+        success, res = solve_shift_scheduling(
+            4, DAYS, CONSTRAINTS, [], skill_bookings=SKILL_BOOKINGS, **kwargs
+        )
+        self.assertTrue(success)
+        self.assertEqual(len(cache.models), 1)
+        self.assertLessEqual({0, 2}, set(get_workers(res, 0, 3)))
+
+    def test_check_request(self):
+        self.assertEqual(check_request(4, DAYS, CONSTRAINTS, [], SKILL_BOOKINGS), [])
+        reasons = check_request(4, DAYS, CONSTRAINTS, [], [(0, 3, 3, "RN")])
+        self.assertEqual(reasons[0]["reason"], "booking_staff")
+        self.assertEqual(reasons[0]["skill"], "RN")
+        reasons = check_request(4, DAYS, CONSTRAINTS, [], [(0, 3, 1, "aide")])
+        self.assertEqual(reasons[0]["reason"], "booking_staff")
+
+    def test_diagnose(self):
+        # Employees 0 and 2, the ones with RN, can't work all day
+        short = {"defaults": {"hard_min": 2, "hard_max": 5}}
+        constraints = [dict(ct, daily=short) for ct in CONSTRAINTS]
+        reasons = diagnose_infeasibility(
+            4,
+            DAYS,
+            constraints,
+            [],
+            skill_bookings=[(0, 0, 2, "RN"), (0, 7, 2, "RN")],
+        )
+        self.assertIn("daily", [r["reason"] for r in reasons])
+        self.assertIn("RN", [r.get("skill") for r in reasons])
@@ -0,0 +1,107 @@
+import unittest
+
+from model.constraints import (
+    DAY_SOFT_MAX,
+    DAY_SOFT_MIN,
+    get_daily_hour_constraints,
+)
+from model.slots import (
+    get_slot_bookings,
+    get_slot_constraints,
+    get_slot_days,
+    get_slots_per_hour,
+)
+from model.solver import (
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    solve_shift_scheduling,
+)
+from model.options import SolverOptions
+
+WEEKLY = {"hard_min": 6, "soft_min": 8, "soft_max": 14, "hard_max": 16}
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 7, "minutes": 30}]
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}},
+    {"weekly": WEEKLY, "daily": {"1": {"hard_max": 0}}},
+]
+BOOKINGS = [(0, 2, 2)]
+
+
+class TestSlotRequest(unittest.TestCase):
+    def test_slots_per_hour(self):
+        self.assertEqual(get_slots_per_hour(15), 4)
+        with self.assertRaises(ValueError):
+            get_slots_per_hour(20)
+
+    def test_days(self):
+        self.assertEqual(get_slot_days(DAYS, 30), [{"hours": 16}, {"hours": 15}])
+        self.assertEqual(get_slot_days(DAYS, 60), [{"hours": 8}, {"hours": 7}])
+
+    def test_constraints(self):
+        days = DAYS + [{"hours": 4, "minutes": 0}]
+        constraints = get_slot_constraints(CONSTRAINTS, days, 15)
+        self.assertEqual(
+            constraints[0]["weekly"],
+            {"hard_min": 24, "soft_min": 32, "soft_max": 56, "hard_max": 64},
+        )
+        self.assertEqual(constraints[1]["daily"]["1"]["hard_max"], 0)
+        self.assertEqual(constraints[0]["daily"]["0"]["hard_min"], 24)
+        # The default shift of 6 hours doesn't fit in 4
+        self.assertEqual(constraints[0]["daily"]["2"], {"hard_min": 0, "hard_max": 0})
+
+    def test_soft_bounds(self):
+        # Requests in hours keep the default daily soft bounds, and those in
+        # slots get them scaled
+        daily = {"defaults": {"soft_min": 2, "soft_max": 3}}
+        ((_, _, ct),) = get_daily_hour_constraints(daily, DAYS[:1])
+        self.assertEqual((ct[1], ct[3]), (DAY_SOFT_MIN, DAY_SOFT_MAX))
+        (constraints,) = get_slot_constraints([{"daily": daily}], DAYS[:1], 30)
+        ((_, _, ct),) = get_daily_hour_constraints(
+            constraints["daily"], [{"hours": 16}]
+        )
+        self.assertEqual((ct[1], ct[3]), (2 * DAY_SOFT_MIN, 2 * DAY_SOFT_MAX))
+
+    def test_bookings(self):
+        self.assertEqual(
+            get_slot_bookings([(0, 2, 2), (1, 0, 1)], 30),
+            [(0, 4, 2), (0, 5, 2), (1, 0, 1), (1, 1, 1)],
+        )
+
+
+class TestSlotSolve(unittest.TestCase):
+    def test_half_hours(self):
+        success, res = solve_shift_scheduling(
+            2, DAYS, CONSTRAINTS, BOOKINGS, slot_minutes=30
+        )
+        self.assertTrue(success)
+        workers = res["days"][0]["workers"]
+        self.assertTrue(all({4, 5} <= set(w["slots"]) for w in workers))
+        # The second day lasts 15 half hours, all covered by employee 0
+        self.assertEqual(res["days"][1]["workers"][0]["slots"], list(range(15)))
+        self.assertEqual(res["days"][1]["workers"][1]["slots"], [])
+        self.assertEqual(
+            res["employees"][0][0],
+            sum(len(d["workers"][0]["slots"]) for d in res["days"]) / 2,
+        )
+
+    def test_formulations_agree(self):
+        objectives = []
+        for shift_model in (SHIFT_MODEL_SEQUENCE, SHIFT_MODEL_INTERVAL):
+            solutions = []
+            success, _ = solve_shift_scheduling(
+                2,
+                DAYS,
+                CONSTRAINTS,
+                BOOKINGS,
+                on_solution=solutions.append,
+                shift_model=shift_model,
+                options=SolverOptions(time_limit=20),
+                slot_minutes=30,
+            )
+            self.assertTrue(success)
+            objectives.append(solutions[-1]["objective"])
+        self.assertEqual(objectives[0], objectives[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,297 @@
+import os
+import threading
+import time
+import unittest
+
+from ortools.sat.python import cp_model
+
+from model.constraints import add_lexicographic_constraint, get_identical_employees
+from model.cache import ModelCache
+from model.options import SolverOptions
+from model.schedule import get_work_index
+from benchmarks.generator import generate_request, to_arguments
+from model.solver import (
+    SHIFT_MODEL_INTERVAL,
+    SHIFT_MODEL_SEQUENCE,
+    STOP_LOWER_BOUND,
+    STOP_NO_IMPROVEMENT,
+    STOP_REQUESTED,
+    build_model,
+    get_demand,
+    get_hinted_values,
+    solve_shift_scheduling,
+    sort_hinted_values,
+)
+
+DAYS = [{"hours": 8, "minutes": 0}, {"hours": 9, "minutes": 0}]
+WEEKLY = {"hard_min": 6, "soft_min": 10, "soft_max": 12, "hard_max": 16}
+CONSTRAINTS = [
+    {"weekly": WEEKLY, "daily": {}},
+    {"weekly": WEEKLY, "daily": {"1": {"hard_max": 0}}},
+    {"weekly": WEEKLY, "daily": {"defaults": {"hard_min": 2, "hard_max": 5}}},
+]
+BOOKINGS = [(0, 2, 2), (1, 8, 2)]
+
+
+def solve_objective(shift_model):
+    demand = get_demand(DAYS, BOOKINGS)
+    model, _, _ = build_model(3, DAYS, CONSTRAINTS, demand, shift_model=shift_model)
+    solver = cp_model.CpSolver()
+    status = solver.Solve(model)
+    assert status == cp_model.OPTIMAL
+    return solver.ObjectiveValue()
+
+
+class TestShiftModels(unittest.TestCase):
+    def test_same_optimum(self):
+        self.assertEqual(
+            solve_objective(SHIFT_MODEL_SEQUENCE), solve_objective(SHIFT_MODEL_INTERVAL)
+        )
+
+    def test_interval_schedule(self):
+        success, res = solve_shift_scheduling(
+            3, DAYS, CONSTRAINTS, BOOKINGS, shift_model=SHIFT_MODEL_INTERVAL
+        )
+        self.assertTrue(success)
+        for day in res["days"]:
+            for worker in day["workers"]:
+                hours = worker["hours"]
+                # A single block of hours
+                self.assertEqual(
+                    hours, list(range(hours[0], hours[0] + len(hours))) if hours else []
+                )
+        # Employee 1 is off on the second day
+        self.assertEqual(res["days"][1]["workers"][1]["hours"], [])
+
+
+class TestSolverOptions(unittest.TestCase):
+    def test_applied(self):
+        options = SolverOptions.from_dict(
+            {"time_limit": 2, "num_search_workers": 3, "relative_gap_limit": 0.1}
+        )
+        solver = cp_model.CpSolver()
+        with options.applied(solver):
+            self.assertEqual(solver.parameters.max_time_in_seconds, 2)
+            self.assertEqual(solver.parameters.num_search_workers, 3)
+            self.assertAlmostEqual(solver.parameters.relative_gap_limit, 0.1)
+        # The parameters are restored on exit
+        self.assertFalse(solver.parameters.HasField("max_time_in_seconds"))
+        self.assertFalse(solver.parameters.HasField("relative_gap_limit"))
+        solver.parameters.num_search_workers = 1
+        with SolverOptions(log_path=os.devnull).applied(solver):
+            self.assertTrue(solver.parameters.log_search_progress)
+        self.assertEqual(solver.parameters.num_search_workers, 1)
+        self.assertFalse(solver.parameters.log_search_progress)
+
+    def test_invalid(self):
+        self.assertEqual(
+            SolverOptions.from_dict({"time_limit": 1, "relative_gap_limit": None}),
+            SolverOptions(time_limit=1),
+        )
+        for data in (
+            {"time_limit": "x"},
+            {"num_search_workers": 1.5},
+            {"num_search_workers": True},
+            {"deterministic": 1},
+            {"log_path": 1},
+            [1],
+        ):
+            with self.assertRaises(ValueError, msg=data):
+                SolverOptions.from_dict(data)
+
+    def test_deterministic(self):
+        options = SolverOptions(
+            time_limit=1, num_search_workers=2, deterministic=True, random_seed=3
+        )
+        results = [
+            solve_shift_scheduling(3, DAYS, CONSTRAINTS, BOOKINGS, options=options)
+            for _ in range(2)
+        ]
+        self.assertEqual(results[0], results[1])
+
+
+def count_changes(days, other_days):
+    changes = 0
+    for day, other_day in zip(days, other_days):
+        for worker, other_worker in zip(day["workers"], other_day["workers"]):
+            changes += len(set(worker["hours"]) ^ set(other_worker["hours"]))
+    return changes
+
+
+class TestStop(unittest.TestCase):
+    def test_stop(self):
+        days = [{"hours": 12, "minutes": 0} for _ in range(5)]
+        constraints = [{"weekly": {}, "daily": {}} for _ in range(8)]
+        stop = threading.Event()
+        solutions = []
+
+        def on_solution(solution):
+            solutions.append(solution)
+            stop.set()
+
+        start = time.time()
+        success, _ = solve_shift_scheduling(
+            8, days, constraints, [], on_solution=on_solution, stop=stop
+        )
+        self.assertTrue(success)
+        self.assertLess(time.time() - start, 4)
+        self.assertGreaterEqual(solutions[0]["objective"], solutions[0]["bound"])
+
+
+def get_hard_request():
+    """Request whose optimum, 3, CP-SAT doesn't prove within seconds."""
+    request = to_arguments(generate_request(1, 6, 5, booking_density=0.5))
+    for employee_constraints in request["constraints"]:
+        employee_constraints.pop("weekly", None)
+    return request
+
+
+class TestTermination(unittest.TestCase):
+    def test_lower_bound(self):
+        options = SolverOptions(time_limit=20)
+        start = time.time()
+        success, res = solve_shift_scheduling(**get_hard_request(), options=options)
+        self.assertTrue(success)
+        self.assertLess(time.time() - start, 10)
+        termination = res["termination"]
+        self.assertEqual(termination["reason"], STOP_LOWER_BOUND)
+        self.assertEqual(termination["objective"], 3)
+        self.assertEqual(termination["lower_bound"], 3)
+
+    def test_no_improvement(self):
+        options = SolverOptions(
+            time_limit=20, no_improvement_time=0.3, stop_at_lower_bound=False
+        )
+        start = time.time()
+        cache = ModelCache()
+        success, res = solve_shift_scheduling(
+            **get_hard_request(), options=options, cache=cache
+        )
+        self.assertTrue(success)
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(res["termination"]["reason"], STOP_NO_IMPROVEMENT)
+        # A later request may wait longer for a better schedule
+        self.assertEqual(cache.results, {})
+
+    def test_stop(self):
+        stop = threading.Event()
+        threading.Timer(0.5, stop.set).start()
+        options = SolverOptions(time_limit=20, stop_at_lower_bound=False)
+        start = time.time()
+        cache = ModelCache()
+        success, res = solve_shift_scheduling(
+            **get_hard_request(), options=options, stop=stop, cache=cache
+        )
+        self.assertTrue(success)
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(res["termination"]["reason"], STOP_REQUESTED)
+        # e.g. a /stream client leaving, the partial schedule isn't cached
+        self.assertEqual(cache.results, {})
+
+
+class TestHints(unittest.TestCase):
+    def test_hint_is_kept(self):
+        _, res = solve_shift_scheduling(3, DAYS, CONSTRAINTS, BOOKINGS)
+        _, hinted = solve_shift_scheduling(
+            3, DAYS, CONSTRAINTS, BOOKINGS, hint=res["days"], stability=100
+        )
+        self.assertEqual(count_changes(res["days"], hinted["days"]), 0)
+
+    def test_stability(self):
+        _, res = solve_shift_scheduling(3, DAYS, CONSTRAINTS, BOOKINGS)
+        bookings = BOOKINGS + [(0, 7, 2)]
+        success, repaired = solve_shift_scheduling(
+            3, DAYS, CONSTRAINTS, bookings, hint=res["days"], stability=1
+        )
+        self.assertTrue(success)
+        workers = repaired["days"][0]["workers"]
+        self.assertGreaterEqual(sum(7 in w["hours"] for w in workers), 2)
+        _, resolved = solve_shift_scheduling(3, DAYS, CONSTRAINTS, bookings)
+        self.assertLessEqual(
+            count_changes(res["days"], repaired["days"]),
+            count_changes(res["days"], resolved["days"]),
+        )
+
+
+class TestStrengthening(unittest.TestCase):
+    def test_large_weekly_deficit(self):
+        # 24 hours at most, 16 below soft_min
+        weekly = {"hard_min": 0, "soft_min": 40, "soft_max": 45, "hard_max": 50}
+        days = [{"hours": 8, "minutes": 0} for _ in range(3)]
+        demand = get_demand(days, [])
+        model, _, _ = build_model(1, days, [{"weekly": weekly, "daily": {}}], demand)
+        solver = cp_model.CpSolver()
+        self.assertEqual(solver.Solve(model), cp_model.OPTIMAL)
+        self.assertGreaterEqual(solver.ObjectiveValue(), 16)
+
+    def test_identical_employees(self):
+        constraints = [
+            {"weekly": WEEKLY, "daily": {}},
+            {"weekly": WEEKLY, "daily": {"1": {"hard_max": 0}}},
+            {"weekly": dict(WEEKLY), "daily": {"0": {"hard_min": 6, "hard_max": 9}}},
+            {"weekly": WEEKLY, "daily": {}, "ward": "b"},
+        ]
+        self.assertEqual(get_identical_employees(constraints, DAYS), [[0, 2, 3]])
+
+    def test_lexicographic_constraint(self):
+        model = cp_model.CpModel()
+        first = [model.NewBoolVar("") for _ in range(3)]
+        second = [model.NewBoolVar("") for _ in range(3)]
+        add_lexicographic_constraint(model, first, second)
+        solver = cp_model.CpSolver()
+        solver.parameters.enumerate_all_solutions = True
+        collector = Collector(first + second)
+        solver.Solve(model, collector)
+        # Half of the 64 pairs which differ, and the 8 equal ones
+        self.assertEqual(len(collector.assignments), 36)
+        for values in collector.assignments:
+            self.assertGreaterEqual(values[:3], values[3:])
+
+    def test_symmetry_same_optimum(self):
+        constraints = [{"weekly": WEEKLY, "daily": {}} for _ in range(3)]
+        demand = get_demand(DAYS, BOOKINGS)
+        objectives = []
+        for symmetry in (False, True):
+            model, _, _ = build_model(3, DAYS, constraints, demand, symmetry=symmetry)
+            solver = cp_model.CpSolver()
+            self.assertEqual(solver.Solve(model), cp_model.OPTIMAL)
+            objectives.append(solver.ObjectiveValue())
+        self.assertEqual(objectives[0], objectives[1])
+
+    def test_sorted_hint(self):
+        constraints = [{"weekly": WEEKLY, "daily": {}} for _ in range(2)]
+        model, work, _ = build_model(2, DAYS, constraints, get_demand(DAYS, []))
+        hint = [
+            {
+                "id": 0,
+                "workers": [{"id": 0, "hours": [4, 5]}, {"id": 1, "hours": [0, 1]}],
+            }
+        ]
+        index = get_work_index(work, 2, DAYS)
+        hinted = sort_hinted_values(get_hinted_values(hint, work), index, [[0, 1]])
+        self.assertEqual(hinted[0, 0, 0], 1)
+        self.assertEqual(hinted[1, 0, 4], 1)
+        self.assertEqual(hinted[0, 0, 4], 0)
+        # The same from the work variables of the lean mode
+        _, lean_work, _ = build_model(
+            2, DAYS, constraints, get_demand(DAYS, []), lean=True
+        )
+        index = get_work_index(lean_work, 2, DAYS)
+        self.assertEqual(
+            sort_hinted_values(get_hinted_values(hint, lean_work), index, [[0, 1]]),
+            hinted,
+        )
+
+
+class Collector(cp_model.CpSolverSolutionCallback):
+    def __init__(self, variables):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.variables = variables
+        self.assignments = set()
+
+    def on_solution_callback(self):
+        self.assignments.add(tuple(self.Value(x) for x in self.variables))
+
+
+if __name__ == "__main__":
+    unittest.main()